@@ -14,3 +14,8 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'litreview.settings')
 
 application = get_asgi_application()
+
+# Build the availability Bloom filter before the first signup check needs it
+from users.bloom import availability_filter  # noqa: E402
+
+availability_filter.warm()
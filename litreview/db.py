@@ -0,0 +1,42 @@
+"""Per-connection database tuning for the profiles in settings.py.
+
+- SQLite: ``settings.SQLITE_PRAGMAS`` are applied to every new connection
+  (``connection_created``), so WAL, ``synchronous``, mmap and the busy
+  timeout hold for request, command and worker connections alike.
+- Persistent connections: for databases with ``CONN_HEALTH_CHECKS`` set,
+  each request starts by checking reused connections and dropping dead ones
+  (e.g. after a server restart or pooler failover), instead of failing the
+  first query. Django 4.1+ does this itself, so the hook only runs on 4.0.
+
+Connected from ``ReviewsConfig.ready``.
+"""
+
+import django
+from django.conf import settings
+from django.core.signals import request_started
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+
+@receiver(connection_created, dispatch_uid="litreview_sqlite_pragmas")
+def apply_sqlite_pragmas(sender, connection, **kwargs):
+    if connection.vendor != "sqlite":
+        return
+    pragmas = getattr(settings, "SQLITE_PRAGMAS", {})
+    if not pragmas:
+        return
+    with connection.cursor() as cursor:
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name} = {value}")
+
+
+@receiver(request_started, dispatch_uid="litreview_db_health_checks")
+def check_persistent_connections(**kwargs):
+    if django.VERSION >= (4, 1):
+        return
+    for conn in connections.all():
+        if not conn.settings_dict.get("CONN_HEALTH_CHECKS") or conn.connection is None:
+            continue
+        if not conn.is_usable():
+            conn.close()
@@ -0,0 +1,191 @@
+"""Project-level middleware."""
+
+import json
+import logging
+import mimetypes
+import os
+import random
+import re
+import time
+from collections import Counter
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed, SuspiciousFileOperation
+from django.db import connections
+from django.http import FileResponse
+from django.utils._os import safe_join
+from django.utils.http import http_date
+
+from litreview import routers
+
+logger = logging.getLogger("litreview.queries")
+
+_STRING_RE = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_RE = re.compile(r"\b\d+(?:\.\d+)?\b")
+_IN_LIST_RE = re.compile(r"\bIN\s*\((?:\s*\?\s*,?)+\)", re.IGNORECASE)
+_WS_RE = re.compile(r"\s+")
+# ManifestStaticFilesStorage names: "style.3f2a9c1e7b4d.css"
+_HASHED_NAME_RE = re.compile(r"\.[0-9a-f]{12}\.[^/]+$")
+
+
+def fingerprint(sql):
+    """Normalize SQL so queries differing only in literals compare equal."""
+    sql = _STRING_RE.sub("?", sql)
+    sql = _NUMBER_RE.sub("?", sql)
+    sql = sql.replace("%s", "?")
+    sql = _IN_LIST_RE.sub("IN (...)", sql)
+    return _WS_RE.sub(" ", sql).strip()
+
+
+class _QueryRecorder:
+    """``connection.execute_wrapper`` hook collecting SQL and timings."""
+
+    def __init__(self):
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append((sql, time.perf_counter() - start))
+
+
+class QueryProfilerMiddleware:
+    """Record per-request query count, DB time and repeated SQL.
+
+    Opt-in: only active when ``settings.QUERY_PROFILER_ENABLED`` is true.
+    Adds ``X-Query-Count``, ``X-Query-Time-Ms``, ``X-Query-Duplicates`` and
+    ``X-Query-N-Plus-One`` headers and logs one JSON line per request to the
+    ``litreview.queries`` logger (WARNING when an N+1 pattern is suspected).
+
+    A fingerprint executed ``QUERY_PROFILER_N1_THRESHOLD`` times or more in a
+    single request is reported as a likely N+1 (a lazy load inside a loop).
+    Queries issued while a streaming response is consumed are not counted.
+    """
+
+    def __init__(self, get_response):
+        if not getattr(settings, "QUERY_PROFILER_ENABLED", False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.threshold = getattr(settings, "QUERY_PROFILER_N1_THRESHOLD", 5)
+
+    def __call__(self, request):
+        recorder = _QueryRecorder()
+        with ExitStack() as stack:
+            for conn in connections.all():
+                stack.enter_context(conn.execute_wrapper(recorder))
+            response = self.get_response(request)
+
+        counts = Counter(fingerprint(sql) for sql, _ in recorder.queries)
+        duplicates = {sql: n for sql, n in counts.items() if n > 1}
+        suspects = {sql: n for sql, n in duplicates.items() if n >= self.threshold}
+        total_ms = sum(duration for _, duration in recorder.queries) * 1000
+
+        response["X-Query-Count"] = str(len(recorder.queries))
+        response["X-Query-Time-Ms"] = f"{total_ms:.1f}"
+        response["X-Query-Duplicates"] = str(sum(n - 1 for n in duplicates.values()))
+        response["X-Query-N-Plus-One"] = str(len(suspects))
+
+        match = getattr(request, "resolver_match", None)
+        record = {
+            "view": match.view_name if match else None,
+            "method": request.method,
+            "path": request.path,
+            "status": response.status_code,
+            "queries": len(recorder.queries),
+            "db_ms": round(total_ms, 1),
+            "duplicates": duplicates,
+            "n_plus_one": sorted(suspects),
+        }
+        level = logging.WARNING if suspects else logging.INFO
+        logger.log(level, json.dumps(record))
+        return response
+
+
+class ReplicaRoutingMiddleware:
+    """Send a request's reads to a replica unless it writes or just wrote.
+
+    GET/HEAD/OPTIONS requests read from one randomly chosen replica in
+    ``settings.DATABASE_REPLICAS`` (see ``litreview.routers``). Any other
+    method pins the client to the primary for ``REPLICA_STICKY_SECONDS``
+    through a cookie, so the pages after a POST show its result. Disabled
+    when no replicas are configured.
+    """
+
+    SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+
+    def __init__(self, get_response):
+        if not routers.replicas():
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        alias = None
+        if request.method in self.SAFE_METHODS and routers.sticky_until(request) < time.time():
+            alias = random.choice(routers.replicas())
+        with routers.read_from(alias):
+            response = self.get_response(request)
+        if request.method not in self.SAFE_METHODS:
+            response.set_cookie(
+                routers.REPLICA_STICKY_COOKIE, str(int(time.time() + routers.REPLICA_STICKY_SECONDS)),
+                max_age=routers.REPLICA_STICKY_SECONDS, httponly=True, samesite="Lax",
+                secure=request.is_secure(),
+            )
+        return response
+
+
+class PrecompressedStaticMiddleware:
+    """Serve collected static files, preferring their precompressed siblings.
+
+    Active when ``settings.STATIC_PIPELINE`` is on (see ``litreview.storage``).
+    GET/HEAD requests under ``STATIC_URL`` for files in ``STATIC_ROOT`` get
+    the ``.br`` or ``.gz`` copy the client accepts, ``Vary: Accept-Encoding``
+    and, for content-hashed names, a one-year immutable ``Cache-Control``.
+    Unhashed names (the originals, kept for direct links) are cached briefly.
+    Missing files fall through to the rest of the stack. The Host header is
+    validated first, as CommonMiddleware would for any other path.
+    """
+
+    IMMUTABLE = "public, max-age=31536000, immutable"
+    SHORT = "public, max-age=300"
+    ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+
+    def __init__(self, get_response):
+        if not (getattr(settings, "STATIC_PIPELINE", False) and settings.STATIC_ROOT):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.root = os.fspath(settings.STATIC_ROOT)
+        self.prefix = "/" + settings.STATIC_URL.lstrip("/")
+
+    def __call__(self, request):
+        if request.method not in ("GET", "HEAD") or not request.path_info.startswith(self.prefix):
+            return self.get_response(request)
+        request.get_host()  # DisallowedHost -> 400, like every other page
+        try:
+            path = safe_join(self.root, request.path_info[len(self.prefix):])
+        except (SuspiciousFileOperation, ValueError):
+            return self.get_response(request)
+        if not os.path.isfile(path):
+            return self.get_response(request)
+
+        accepted = {
+            part.split(";")[0].strip() for part in request.headers.get("Accept-Encoding", "").split(",")
+        }
+        served, encoding = path, None
+        for name, extension in self.ENCODINGS:
+            if name in accepted and os.path.isfile(path + extension):
+                served, encoding = path + extension, name
+                break
+        content_type, _ = mimetypes.guess_type(path)
+        response = FileResponse(
+            open(served, "rb"), filename=os.path.basename(path),
+            content_type=content_type or "application/octet-stream",
+        )
+        if encoding:
+            response["Content-Encoding"] = encoding
+        response["Vary"] = "Accept-Encoding"
+        response["Last-Modified"] = http_date(os.stat(path).st_mtime)
+        response["Cache-Control"] = self.IMMUTABLE if _HASHED_NAME_RE.search(path) else self.SHORT
+        return response
@@ -0,0 +1,36 @@
+"""Small helpers shared by the benchmark and load-replay commands."""
+
+import json
+import math
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list (0 when empty)."""
+    if not sorted_values:
+        return 0.0
+    rank = max(math.ceil(pct / 100.0 * len(sorted_values)) - 1, 0)
+    return sorted_values[min(rank, len(sorted_values) - 1)]
+
+
+def summarize(latencies_ms):
+    """Return count/mean/p50/p95/p99/max for a list of latencies in ms."""
+    values = sorted(latencies_ms)
+    return {
+        "count": len(values),
+        "mean_ms": round(sum(values) / len(values), 2) if values else 0.0,
+        "p50_ms": round(percentile(values, 50), 2),
+        "p95_ms": round(percentile(values, 95), 2),
+        "p99_ms": round(percentile(values, 99), 2),
+        "max_ms": round(values[-1], 2) if values else 0.0,
+    }
+
+
+def load_json(path):
+    with open(path, encoding="utf-8") as fh:
+        return json.load(fh)
+
+
+def save_json(path, data):
+    with open(path, "w", encoding="utf-8") as fh:
+        json.dump(data, fh, indent=2, sort_keys=True)
+        fh.write("\n")
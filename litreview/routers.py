@@ -0,0 +1,74 @@
+"""Read-replica routing.
+
+``settings.DATABASE_REPLICAS`` lists read-only aliases kept in sync with
+``default`` (PostgreSQL streaming replication, or ``manage.py sync_replica``
+for the local ``sqlite-replica`` profile). ``ReplicaRouter`` sends reads to
+a replica only while ``litreview.middleware.ReplicaRoutingMiddleware`` has
+marked the current request as replica-safe: a GET/HEAD from a client that
+has not written recently. Everything else (writes, reads inside a
+transaction on the primary, management commands, task workers) uses
+``default``.
+
+After a non-safe request (POST, ...) the middleware sets a cookie that
+pins that client's reads to the primary for ``REPLICA_STICKY_SECONDS``, so
+people see their own writes while the replicas catch up.
+
+Enabled through ``settings.DATABASE_ROUTERS``/``MIDDLEWARE``; with no
+replicas configured both are no-ops.
+"""
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+REPLICA_STICKY_SECONDS = getattr(settings, "REPLICA_STICKY_SECONDS", 15)
+REPLICA_STICKY_COOKIE = getattr(settings, "REPLICA_STICKY_COOKIE", "primary_until")
+
+# Replica alias the current request reads from, or None for the primary
+_read_alias = ContextVar("replica_read_alias", default=None)
+
+
+def replicas():
+    return list(getattr(settings, "DATABASE_REPLICAS", []))
+
+
+class ReplicaRouter:
+    """Reads go to the request's replica when allowed; writes to ``default``."""
+
+    def db_for_read(self, model, **hints):
+        alias = _read_alias.get()
+        if alias is None or connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            # Reads inside a transaction on the primary must see its writes
+            return DEFAULT_DB_ALIAS
+        return alias
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same rows as the primary
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas get their schema from the primary
+        return db == DEFAULT_DB_ALIAS
+
+
+@contextmanager
+def read_from(alias):
+    """Route reads to replica ``alias`` (None: the primary) inside the block."""
+    token = _read_alias.set(alias)
+    try:
+        yield
+    finally:
+        _read_alias.reset(token)
+
+
+def sticky_until(request):
+    """Time until which ``request``'s client reads from the primary."""
+    try:
+        return float(request.COOKIES.get(REPLICA_STICKY_COOKIE, 0))
+    except ValueError:
+        return 0.0
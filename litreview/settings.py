@@ -10,8 +10,11 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/4.0/ref/settings/
 """
 
+import os
 from pathlib import Path
 
+from django.core.exceptions import ImproperlyConfigured
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -43,14 +46,22 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'litreview.middleware.PrecompressedStaticMiddleware',
+    'litreview.middleware.ReplicaRoutingMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
-    'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'users.middleware.CachedAuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'litreview.middleware.QueryProfilerMiddleware',
 ]
 
+# Per-request query profiling (headers + JSON log line); opt in with
+# LITREVIEW_QUERY_PROFILER=1. The middleware is a no-op when disabled.
+QUERY_PROFILER_ENABLED = os.environ.get('LITREVIEW_QUERY_PROFILER') == '1'
+QUERY_PROFILER_N1_THRESHOLD = 5
+
 ROOT_URLCONF = 'litreview.urls'
 
 TEMPLATES = [
@@ -77,13 +88,143 @@ WSGI_APPLICATION = 'litreview.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/4.0/ref/settings/#databases
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+#
+# LITREVIEW_DB_PROFILE picks one of:
+# - "sqlite" (default): the local db.sqlite3 file, rollback journal, a new
+#   connection per request.
+# - "sqlite-wal": the same file in WAL mode with synchronous=NORMAL, mmap and
+#   a busy timeout (PRAGMAs applied per connection by litreview/db.py), and
+#   persistent connections.
+# - "sqlite-replica": "sqlite-wal" plus a read replica in a second file
+#   (LITREVIEW_SQLITE_REPLICA_PATH), refreshed by `manage.py sync_replica`;
+#   a local stand-in for a replicated deployment.
+# - "postgres": PostgreSQL from the LITREVIEW_DB_* variables (needs
+#   psycopg2), with persistent connections and health checks. Set
+#   LITREVIEW_DB_REPLICA_HOSTS (comma-separated) to add read replicas.
+#
+# Replica aliases are listed in DATABASE_REPLICAS; safe requests read from
+# them and clients stick to the primary for REPLICA_STICKY_SECONDS after a
+# write (litreview/routers.py).
+
+DB_PROFILE = os.environ.get('LITREVIEW_DB_PROFILE', 'sqlite')
+SQLITE_PATH = os.environ.get('LITREVIEW_SQLITE_PATH', BASE_DIR / 'db.sqlite3')
+SQLITE_REPLICA_PATH = os.environ.get('LITREVIEW_SQLITE_REPLICA_PATH', BASE_DIR / 'db.replica.sqlite3')
+
+if DB_PROFILE == 'postgres':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.environ.get('LITREVIEW_DB_NAME', 'litreview'),
+            'USER': os.environ.get('LITREVIEW_DB_USER', ''),
+            'PASSWORD': os.environ.get('LITREVIEW_DB_PASSWORD', ''),
+            'HOST': os.environ.get('LITREVIEW_DB_HOST', ''),
+            'PORT': os.environ.get('LITREVIEW_DB_PORT', ''),
+            'CONN_MAX_AGE': int(os.environ.get('LITREVIEW_DB_CONN_MAX_AGE', 60)),
+            # Native from Django 4.1; litreview/db.py emulates it on 4.0
+            'CONN_HEALTH_CHECKS': True,
+            'OPTIONS': {'connect_timeout': 5},
+        }
+    }
+    replica_hosts = os.environ.get('LITREVIEW_DB_REPLICA_HOSTS', '')
+    for n, host in enumerate(filter(None, replica_hosts.split(',')), start=1):
+        DATABASES[f'replica_{n}'] = {
+            **DATABASES['default'],
+            'HOST': host.strip(),
+            'TEST': {'MIRROR': 'default'},
+        }
+    SQLITE_PRAGMAS = {}
+elif DB_PROFILE in ('sqlite-wal', 'sqlite-replica'):
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': SQLITE_PATH,
+            'CONN_MAX_AGE': 60,
+        }
+    }
+    if DB_PROFILE == 'sqlite-replica':
+        DATABASES['replica'] = {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': SQLITE_REPLICA_PATH,
+            'CONN_MAX_AGE': 60,
+            'TEST': {'MIRROR': 'default'},
+        }
+    SQLITE_PRAGMAS = {
+        'journal_mode': 'WAL',         # readers no longer block on the writer
+        'synchronous': 'NORMAL',       # fsync at checkpoints, not every commit
+        'mmap_size': 256 * 1024 ** 2,  # read pages through the OS page cache
+        'busy_timeout': 5000,          # ms a writer waits for the lock
+        'temp_store': 'MEMORY',
+        'cache_size': -32000,          # KiB
+    }
+elif DB_PROFILE == 'sqlite':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': SQLITE_PATH,
+        }
     }
+    # No per-connection PRAGMAs. journal_mode persists in the file: after
+    # using a WAL profile, switch it back once with `manage.py sqlite_journal delete`
+    SQLITE_PRAGMAS = {}
+else:
+    raise ImproperlyConfigured(f"Unknown LITREVIEW_DB_PROFILE {DB_PROFILE!r}")
+
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias != 'default']
+DATABASE_ROUTERS = ['litreview.routers.ReplicaRouter']
+REPLICA_STICKY_SECONDS = int(os.environ.get('LITREVIEW_REPLICA_STICKY_SECONDS', 15))
+
+
+# Caches
+# https://docs.djangoproject.com/en/4.0/topics/cache/
+# "default" holds the follow-graph sets, review windows and (when enabled)
+# sessions and request users; "fragments" holds rendered review cards (see
+# reviews/fragments.py). The local-memory backend is per process and evicts
+# least recently used entries past MAX_ENTRIES. Set LITREVIEW_REDIS_URL
+# (e.g. redis://127.0.0.1:6379/0, needs the redis package) to share the
+# default cache between workers.
+
+REDIS_URL = os.environ.get('LITREVIEW_REDIS_URL')
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'litreview-default',
+        'OPTIONS': {
+            # Django's default of 300 thrashes with more than a few active users
+            'MAX_ENTRIES': 50000,
+        },
+    },
+    'fragments': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'litreview-fragments',
+        'TIMEOUT': 24 * 3600,
+        'OPTIONS': {
+            'MAX_ENTRIES': 5000,
+        },
+    },
 }
 
+if REDIS_URL:
+    CACHES['default'] = {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': REDIS_URL,
+    }
+# Whether every worker sees the same default cache
+SHARED_CACHE = bool(REDIS_URL)
+
+FRAGMENT_CACHE_ALIAS = 'fragments'
+
+
+# Bloom filter for username/email availability checks (users/bloom.py).
+# Set LITREVIEW_BLOOM_PATH to warm-start from a file written by
+# `manage.py availability_filter save`.
+AVAILABILITY_BLOOM_PATH = os.environ.get('LITREVIEW_BLOOM_PATH') or None
+
+
+# Background tasks (reviews/tasks.py). Eager mode runs jobs inline instead of
+# queueing them for `manage.py run_tasks`; on by default while DEBUG is.
+TASKS_EAGER = os.environ.get('LITREVIEW_TASKS_EAGER', '1' if DEBUG else '0') == '1'
+
 
 # Password validation
 # https://docs.djangoproject.com/en/4.0/ref/settings/#auth-password-validators
@@ -108,6 +249,33 @@ LOGIN_URL = 'login'
 LOGIN_REDIRECT_URL = 'home'
 LOGOUT_REDIRECT_URL = 'login'
 
+# Sessions: LITREVIEW_SESSION_PROFILE picks
+# - "db" (default without a shared cache): Django's database sessions.
+# - "cached_db" (default with LITREVIEW_REDIS_URL): sessions read from the
+#   shared default cache, written through to the database.
+# - "signed_cookies": the session lives in a signed cookie, no lookups at all
+#   (logging out cannot revoke a copied cookie before it expires).
+# cached_db needs the shared cache: with a per-process one, a logout in one
+# worker would leave the session valid in the others until it expired.
+SESSION_PROFILE = os.environ.get('LITREVIEW_SESSION_PROFILE', 'cached_db' if SHARED_CACHE else 'db')
+SESSION_ENGINES = {
+    'cached_db': 'django.contrib.sessions.backends.cached_db',
+    'signed_cookies': 'django.contrib.sessions.backends.signed_cookies',
+    'db': 'django.contrib.sessions.backends.db',
+}
+if SESSION_PROFILE not in SESSION_ENGINES:
+    raise ImproperlyConfigured(f"Unknown LITREVIEW_SESSION_PROFILE {SESSION_PROFILE!r}")
+if SESSION_PROFILE == 'cached_db' and not SHARED_CACHE:
+    raise ImproperlyConfigured("cached_db sessions need a shared cache; set LITREVIEW_REDIS_URL")
+SESSION_ENGINE = SESSION_ENGINES[SESSION_PROFILE]
+
+# Request users served from the default cache (users/auth_cache.py). Like
+# cached_db sessions this is only safe with a shared cache: the entry holds
+# the password hash the session check compares against.
+USER_CACHE_ENABLED = os.environ.get('LITREVIEW_USER_CACHE', '1' if SHARED_CACHE else '0') == '1'
+if USER_CACHE_ENABLED and not SHARED_CACHE:
+    raise ImproperlyConfigured("LITREVIEW_USER_CACHE needs a shared cache; set LITREVIEW_REDIS_URL")
+
 MEDIA_URL = '/media/'
 MEDIA_ROOT =  'media/'
 
@@ -135,10 +303,38 @@ STATICFILES_DIRS = [
     BASE_DIR / 'static',
 ]
 
-# (Optional for production) where 'collectstatic' will gather files
-# STATIC_ROOT = BASE_DIR / 'staticfiles'
+# Where 'collectstatic' gathers files
+STATIC_ROOT = os.environ.get('LITREVIEW_STATIC_ROOT', BASE_DIR / 'staticfiles')
+
+# Minified, content-hashed, precompressed static files (see litreview/storage.py),
+# served with far-future cache headers by PrecompressedStaticMiddleware. Needs
+# 'collectstatic' to have run, so it is off by default under DEBUG.
+STATIC_PIPELINE = os.environ.get('LITREVIEW_STATIC_PIPELINE', '0' if DEBUG else '1') == '1'
+if STATIC_PIPELINE:
+    STATICFILES_STORAGE = 'litreview.storage.PrecompressedManifestStaticFilesStorage'
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/4.0/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+
+# Logging
+# https://docs.djangoproject.com/en/4.0/topics/logging/
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'litreview.queries': {
+            'handlers': ['console'],
+            'level': 'INFO',
+            'propagate': False,
+        },
+    },
+}
@@ -0,0 +1,216 @@
+"""Static files storage for ``collectstatic``: minified, hashed, precompressed.
+
+``PrecompressedManifestStaticFilesStorage`` extends Django's
+``ManifestStaticFilesStorage`` (content-hashed names such as
+``style.3f2a9c1e7b4d.css`` plus ``staticfiles.json``):
+
+1. the project's own ``.css``/``.js`` files (``STATICFILES_DIRS``) are
+   minified before they are hashed, so the hash covers what is served;
+   assets shipped by apps (the admin's) are left as published;
+2. every hashed text asset gets ``.gz`` and, when the optional ``brotli``
+   package is installed, ``.br`` siblings.
+
+``litreview.middleware.PrecompressedStaticMiddleware`` serves those files.
+The minifiers are deliberately conservative: they drop comments and
+whitespace only, and JS keeps its line breaks so automatic semicolon
+insertion is unaffected. Nested template literals are not supported.
+"""
+
+import gzip
+import os
+import re
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.core.files.base import ContentFile
+
+try:
+    import brotli
+except ImportError:  # optional: only .gz siblings are written
+    brotli = None
+
+MINIFIED_EXTENSIONS = (".css", ".js")
+COMPRESSED_EXTENSIONS = (".css", ".js", ".svg", ".json", ".txt", ".xml", ".html", ".map", ".ico")
+# Smaller files are not worth an encoded copy
+COMPRESS_MIN_SIZE = 256
+
+_CSS_TOKEN_RE = re.compile(
+    r"""("(?:[^"\\]|\\.)*"|'(?:[^'\\]|\\.)*')|(/\*.*?\*/)|(\s+)|([^"'/\s]+|/)""",
+    re.DOTALL,
+)
+# No whitespace is needed next to these (after ":" only; "a :hover" differs from "a:hover")
+_CSS_TIGHT = "{};,"
+
+_JS_REGEX_PRECEDERS = set("(,=:[!&|?{};+-*%<>~^")
+_JS_REGEX_KEYWORDS = {"return", "typeof", "case", "do", "else", "in", "of", "void", "yield", "await", "delete", "new"}
+_JS_WHITESPACE_RE = re.compile(r"[ \t]*\n[ \t\n]*")
+
+
+def minify_css(text):
+    """Drop comments and the whitespace that is not significant."""
+    out = []
+    space = False
+    for string, comment, whitespace, other in _CSS_TOKEN_RE.findall(text):
+        if comment or whitespace:
+            space = True
+            continue
+        token = string or other.replace(";}", "}")
+        if out and not out[-1].startswith(("'", '"')):
+            if token[0] == "}" and out[-1].endswith(";"):
+                out[-1] = out[-1][:-1]
+            elif space and out[-1][-1] not in _CSS_TIGHT + ":" and token[0] not in _CSS_TIGHT:
+                out.append(" ")
+        elif space and out and token[0] not in _CSS_TIGHT:
+            out.append(" ")
+        out.append(token)
+        space = False
+    return "".join(out)
+
+
+def _quoted_end(text, start):
+    """Index just past the string or template literal starting at ``start``."""
+    quote = text[start]
+    index = start + 1
+    while index < len(text):
+        char = text[index]
+        if char == "\\":
+            index += 2
+            continue
+        if char == quote:
+            return index + 1
+        if char == "\n" and quote != "`":
+            break  # unterminated; leave the rest alone
+        index += 1
+    return len(text)
+
+
+def _regex_end(text, start):
+    """Index just past the regex literal at ``start``, or None if it is not one."""
+    index = start + 1
+    in_class = False
+    while index < len(text):
+        char = text[index]
+        if char == "\\":
+            index += 2
+            continue
+        if char == "\n":
+            return None
+        if char == "[":
+            in_class = True
+        elif char == "]":
+            in_class = False
+        elif char == "/" and not in_class:
+            index += 1
+            while index < len(text) and text[index].isalpha():
+                index += 1
+            return index
+        index += 1
+    return None
+
+
+def _regex_allowed(code):
+    stripped = code.rstrip()
+    if not stripped:
+        return True
+    if stripped[-1] in _JS_REGEX_PRECEDERS:
+        return True
+    word = re.search(r"(\w+)$", stripped)
+    return bool(word) and word.group(1) in _JS_REGEX_KEYWORDS
+
+
+def minify_js(text):
+    """Drop comments, indentation and blank lines; strings and regexes stay intact."""
+    chunks = []  # (is_code, text)
+    code = []
+    index = 0
+
+    def flush():
+        if code:
+            chunks.append((True, "".join(code)))
+            code.clear()
+
+    while index < len(text):
+        char = text[index]
+        following = text[index + 1] if index + 1 < len(text) else ""
+        if char in "'\"`":
+            end = _quoted_end(text, index)
+            flush()
+            chunks.append((False, text[index:end]))
+            index = end
+        elif char == "/" and following == "/":
+            newline = text.find("\n", index)
+            index = len(text) if newline == -1 else newline
+        elif char == "/" and following == "*":
+            end = text.find("*/", index + 2)
+            end = len(text) if end == -1 else end + 2
+            code.append("\n" if "\n" in text[index:end] else " ")
+            index = end
+        elif char == "/" and _regex_allowed("".join(code) or (chunks[-1][1] if chunks else "")):
+            end = _regex_end(text, index)
+            if end is None:
+                code.append(char)
+                index += 1
+            else:
+                flush()
+                chunks.append((False, text[index:end]))
+                index = end
+        else:
+            code.append(char)
+            index += 1
+    flush()
+    out = "".join(_JS_WHITESPACE_RE.sub("\n", chunk) if is_code else chunk for is_code, chunk in chunks)
+    return out.strip() + "\n"
+
+
+def compress(data):
+    """Return {extension: encoded bytes} for the encodings worth keeping."""
+    encoded = {".gz": gzip.compress(data, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        encoded[".br"] = brotli.compress(data, quality=11)
+    return {ext: blob for ext, blob in encoded.items() if len(blob) < len(data)}
+
+
+class PrecompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """Manifest storage that minifies CSS/JS first and precompresses the results."""
+
+    def post_process(self, paths, dry_run=False, **options):
+        if dry_run:
+            yield from super().post_process(paths, dry_run, **options)
+            return
+        project_dirs = {
+            os.path.abspath(entry[1] if isinstance(entry, (list, tuple)) else entry)
+            for entry in settings.STATICFILES_DIRS
+        }
+        paths = dict(paths)
+        for path, (storage, source) in list(paths.items()):
+            location = os.path.abspath(getattr(storage, "location", ""))
+            if path.endswith(MINIFIED_EXTENSIONS) and ".min." not in path and location in project_dirs:
+                self._minify(path)
+                # Hash (and copy) the minified file rather than the source
+                paths[path] = (self, path)
+        yield from super().post_process(paths, dry_run, **options)
+        for path in paths:
+            hashed = self.hashed_files.get(self.hash_key(self.clean_name(path)))
+            if hashed and hashed.endswith(COMPRESSED_EXTENSIONS):
+                self._compress(hashed)
+
+    def _replace(self, name, content):
+        if self.exists(name):
+            self.delete(name)
+        self._save(name, ContentFile(content))
+
+    def _minify(self, name):
+        with self.open(name) as fh:
+            original = fh.read().decode("utf-8")
+        minify = minify_css if name.endswith(".css") else minify_js
+        minified = minify(original)
+        if len(minified) < len(original):
+            self._replace(name, minified.encode("utf-8"))
+
+    def _compress(self, name):
+        with self.open(name) as fh:
+            data = fh.read()
+        if len(data) < COMPRESS_MIN_SIZE:
+            return
+        for extension, blob in compress(data).items():
+            self._replace(name + extension, blob)
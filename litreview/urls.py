@@ -30,8 +30,16 @@ urlpatterns = [
     path("signup/", users.views.signup_page, name="signup"),
     path("ajax/username-available/", users.views.username_available, name="username_available"),
     path("ajax/email-available/", users.views.email_available, name="email_available"),
+    path("ajax/availability-metrics/", users.views.availability_metrics, name="availability_metrics"),
+    path("ajax/follows/", users.views.follow_batch, name="follow_batch"),
+    path("ajax/follows/status/", users.views.follow_status, name="follow_status"),
+    path("ajax/follows/mutual/", users.views.follow_mutual, name="follow_mutual"),
+    path("ajax/follows/suggestions/", users.views.follow_suggestions, name="follow_suggestions"),
     path("", reviews.views.home, name="home"),
     path("recent-reviews/", reviews.views.recent_reviews, name="recent_reviews"),
+    path("recommended/", reviews.views.recommended, name="recommended"),
+    path("leaderboards/", reviews.views.leaderboard, name="leaderboard_index"),
+    path("leaderboards/<slug:board>/", reviews.views.leaderboard, name="leaderboard"),
     path("search/", reviews.views.search, name="search"),
     path('books/<int:book_id>/', reviews.views.book_detail, name='book_detail'),
     path('books/add/', reviews.views.book_create, name='book_create'),
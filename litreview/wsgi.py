@@ -14,3 +14,8 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'litreview.settings')
 
 application = get_wsgi_application()
+
+# Build the availability Bloom filter before the first signup check needs it
+from users.bloom import availability_filter  # noqa: E402
+
+availability_filter.warm()
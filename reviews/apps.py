@@ -4,3 +4,9 @@ from django.apps import AppConfig
 class ReviewsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'reviews'
+
+    def ready(self):
+        # Register signal receivers for derived data (feeds, search index, ...)
+        from . import signals  # noqa: F401
+        # Project-wide database hooks (SQLite PRAGMAs, connection health checks)
+        import litreview.db  # noqa: F401
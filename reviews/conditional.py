@@ -0,0 +1,125 @@
+"""Conditional GET (ETag) for the book and profile pages.
+
+Each page's validators come from a couple of cheap, indexed reads instead of
+the full render:
+
+- book page: the book row, ``MAX(updated)``/``COUNT(*)`` of its reviews and
+  the id of its latest stored similarity rows (changes on every
+  recommendations rebuild);
+- another user's profile: that user's row and counters, ``MAX(updated)``/
+  ``COUNT(*)`` of their reviews, and the cached follow-graph sets of the
+  profile user and the viewer (which drive the lists and follow buttons).
+
+The ETag also covers who is asking (user id and CSRF cookie, since pages
+embed per-session forms and links), and responses carry ``Vary: Cookie`` and
+``Cache-Control: private, no-cache`` so browsers revalidate and shared caches
+never serve one reader's page to another. Your own profile (live user
+search, suggestions) is always rendered in full.
+
+There is deliberately no Last-Modified: no single timestamp moves when a
+review is deleted, a book is edited, similarities are rebuilt or a
+different reader asks, and ``condition`` would answer 304 to a bare
+If-Modified-Since.
+"""
+
+import hashlib
+from functools import wraps
+
+from django.conf import settings
+from django.db.models import Count, Max
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.views.decorators.http import condition
+
+from users import follow_graph
+from users.models import User
+
+from .models import Book, BookSimilarity, Review
+
+_SAFE_METHODS = ("GET", "HEAD")
+
+
+def _memoized(request, key, compute):
+    state = request.__dict__.setdefault("_conditional_state", {})
+    if key not in state:
+        state[key] = compute()
+    return state[key]
+
+
+def _digest(*parts):
+    return hashlib.blake2b(repr(parts).encode("utf-8"), digest_size=16).hexdigest()
+
+
+def _viewer(request):
+    user_id = request.user.pk if request.user.is_authenticated else 0
+    return user_id, request.COOKIES.get(settings.CSRF_COOKIE_NAME, "")
+
+
+def _book_state(request, book_id):
+    def compute():
+        book = (
+            Book.objects.filter(pk=book_id)
+            .values_list("title", "description", "image", "image_variants", "review_count", "rating_sum", "created")
+            .first()
+        )
+        if book is None:
+            return None
+        reviews = Review.objects.filter(book_id=book_id).aggregate(last=Max("updated"), count=Count("id"))
+        similar = BookSimilarity.objects.filter(book_id=book_id).aggregate(version=Max("id"))
+        return _digest(book, reviews, similar["version"])
+
+    return _memoized(request, ("book", book_id), compute)
+
+
+def _profile_state(request, username):
+    def compute():
+        profile = (
+            User.objects.filter(username=username)
+            .values_list("pk", "username", "first_name", "last_name", "email",
+                         "review_count", "followers_count", "following_count", "date_joined")
+            .first()
+        )
+        if profile is None or profile[0] == request.user.pk:
+            return None
+        user_id = profile[0]
+        reviews = Review.objects.filter(user_id=user_id).aggregate(last=Max("updated"), count=Count("id"))
+        graph = (
+            sorted(follow_graph.following_ids(user_id)),
+            sorted(follow_graph.follower_ids(user_id)),
+            sorted(request.user.following_ids),
+        )
+        return _digest(profile, reviews, graph)
+
+    return _memoized(request, ("profile", username), compute)
+
+
+def _etag(state_func):
+    def etag(request, *args, **kwargs):
+        if request.method not in _SAFE_METHODS:
+            return None
+        state = state_func(request, *args, **kwargs)
+        if state is None:
+            return None
+        return _digest(state, _viewer(request))
+    return etag
+
+
+def _conditional_page(state_func):
+    """Decorator: 304s for unchanged pages, plus the per-reader cache headers."""
+    check = condition(etag_func=_etag(state_func))
+
+    def decorator(view):
+        checked = check(view)
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            response = checked(request, *args, **kwargs)
+            if response.has_header("ETag"):
+                patch_cache_control(response, private=True, no_cache=True)
+            patch_vary_headers(response, ("Cookie",))
+            return response
+        return wrapper
+    return decorator
+
+
+book_page = _conditional_page(lambda request, book_id: _book_state(request, book_id))
+profile_page = _conditional_page(lambda request, username: _profile_state(request, username))
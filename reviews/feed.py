@@ -0,0 +1,78 @@
+"""Fan-out-on-write following feed.
+
+Each review is copied into the ``FeedEntry`` inbox of every follower of its
+author when it is created. Following someone backfills their most recent
+reviews; unfollowing removes them. Reading a feed page is then a keyset range
+scan over the reader's own inbox instead of a join across everyone they follow.
+
+Fan-out and backfill run as background tasks (``reviews.tasks``); both read
+the follow graph when they run, so edges changed in between are respected.
+"""
+
+from django.conf import settings
+
+from users.models import User
+
+from . import tasks
+from .models import FeedEntry, Review
+from .pagination import keyset_page
+
+FEED_PAGE_SIZE = getattr(settings, "FEED_PAGE_SIZE", 20)
+# How many of a followee's latest reviews are copied in when you follow them
+FEED_BACKFILL_LIMIT = getattr(settings, "FEED_BACKFILL_LIMIT", 200)
+_BATCH_SIZE = 500
+
+
+def fan_out_review(review):
+    """Write ``review`` into the inbox of every follower of its author."""
+    follower_ids = review.user.followers.values_list("id", flat=True).iterator()
+    batch = []
+    for owner_id in follower_ids:
+        batch.append(FeedEntry(owner_id=owner_id, review=review, created=review.created))
+        if len(batch) >= _BATCH_SIZE:
+            FeedEntry.objects.bulk_create(batch, ignore_conflicts=True)
+            batch = []
+    if batch:
+        FeedEntry.objects.bulk_create(batch, ignore_conflicts=True)
+
+
+def backfill(owner_id, followee_ids):
+    """Copy the latest reviews of ``followee_ids`` into ``owner_id``'s inbox."""
+    for followee_id in followee_ids:
+        recent = (
+            Review.objects.filter(user_id=followee_id)
+            .order_by("-created", "-id")
+            .values_list("id", "created")[:FEED_BACKFILL_LIMIT]
+        )
+        FeedEntry.objects.bulk_create(
+            [FeedEntry(owner_id=owner_id, review_id=pk, created=created) for pk, created in recent],
+            ignore_conflicts=True,
+        )
+
+
+@tasks.task("feed.fan_out")
+def fan_out_task(payload):
+    review = Review.objects.select_related("user").filter(pk=payload["review_id"]).first()
+    if review is not None:
+        fan_out_review(review)
+
+
+@tasks.task("feed.backfill")
+def backfill_task(payload):
+    # Skip followees that were unfollowed before the job ran
+    still_followed = User.following.through.objects.filter(
+        from_user_id=payload["owner_id"], to_user_id__in=payload["followee_ids"],
+    ).values_list("to_user_id", flat=True)
+    backfill(payload["owner_id"], list(still_followed))
+
+
+def remove(owner_id, followee_ids):
+    """Drop reviews by ``followee_ids`` from ``owner_id``'s inbox."""
+    FeedEntry.objects.filter(owner_id=owner_id, review__user_id__in=followee_ids).delete()
+
+
+def following_page(user, before=None, page_size=FEED_PAGE_SIZE):
+    """Return ``(reviews, next_cursor)`` for one page of ``user``'s feed."""
+    entries = FeedEntry.objects.filter(owner=user).select_related("review__book", "review__user")
+    rows, next_cursor = keyset_page(entries, before, page_size, id_field="review_id")
+    return [entry.review for entry in rows], next_cursor
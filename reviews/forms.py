@@ -5,7 +5,7 @@ from reviews.models import Book, Review
 class BookForm(forms.ModelForm):
     class Meta:
         model = Book
-        fields = '__all__'
+        fields = ['title', 'image', 'description']
 
 class ReviewForm(forms.ModelForm):
     class Meta:
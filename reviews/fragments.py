@@ -0,0 +1,64 @@
+"""Per-review fragment cache for feed cards.
+
+A rendered card depends only on the review plus the book title and cover and
+the author's username, so the key is ``review.id``, ``review.updated`` and a
+digest of those fields (see ``card_key``). Any edit changes the key instead
+of relying on deletes, which a per-process cache could not deliver to other
+workers; superseded cards simply age out. Feeds fetch every card of a page
+with one ``get_many`` and render only the misses.
+
+The cache alias is ``settings.FRAGMENT_CACHE_ALIAS`` (a local-memory cache by
+default, which evicts least recently used entries past ``MAX_ENTRIES``).
+"""
+
+import hashlib
+
+from django.conf import settings
+from django.core.cache import caches
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+from . import stars
+
+CARD_TEMPLATE = "reviews/partials/review_card.html"
+FRAGMENT_CACHE_ALIAS = getattr(settings, "FRAGMENT_CACHE_ALIAS", "default")
+
+
+def _cache():
+    return caches[FRAGMENT_CACHE_ALIAS]
+
+
+def card_key(review):
+    """Cache key covering everything the card prints; needs ``book`` and ``user`` loaded."""
+    version = int(review.updated.timestamp() * 1_000_000)
+    book, variants = review.book, review.book.image_variants or {}
+    related = "\0".join([
+        book.title, book.image.name or "", variants.get("source", ""), variants.get("hash", ""),
+        review.user.username,
+    ])
+    digest = hashlib.md5(related.encode(), usedforsecurity=False).hexdigest()[:12]
+    return f"review_card:{review.id}:{version}:{digest}"
+
+
+def render_cards(reviews):
+    """Return the concatenated card HTML for ``reviews``, using the cache."""
+    reviews = list(reviews)
+    keys = [card_key(review) for review in reviews]
+    cache = _cache()
+    cached = cache.get_many(keys)
+    # Cards print review.stars; fill it for the ones about to be rendered
+    stars.annotate_stars(
+        review for key, review in zip(keys, reviews) if key not in cached and not hasattr(review, "stars")
+    )
+    missing = {}
+    parts = []
+    for key, review in zip(keys, reviews):
+        html = cached.get(key)
+        if html is None:
+            html = render_to_string(CARD_TEMPLATE, {"review": review})
+            missing[key] = html
+        parts.append(html)
+    if missing:
+        cache.set_many(missing)
+    return mark_safe("".join(parts))
+
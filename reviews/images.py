@@ -0,0 +1,95 @@
+"""Cover image pipeline: resized JPEG/WebP variants for ``Book.image``.
+
+When a book is saved with a new cover, ``schedule`` queues an
+``images.process_cover`` task (see ``reviews.tasks``), so the upload request
+returns right away. The task:
+
+- applies the EXIF orientation, then re-encodes without the source's
+  EXIF/GPS metadata, ICC profile or comments;
+- crops to fixed 2:3 sizes (see ``VARIANTS``) in JPEG and WebP;
+- stores them under content-hashed names (``covers/<sha>-<width>.<ext>``),
+  which never change for the same upload and can be cached forever;
+- records the result in ``Book.image_variants``.
+
+The task usually runs in a ``run_tasks`` worker, whose local caches are not
+the web processes'. Feed cards are keyed on the variant hash (see
+``reviews.fragments``), so every process renders the variants once they are
+recorded; cached review windows follow within ``REVIEW_WINDOW_TTL``.
+
+Templates use the ``{% cover_img %}`` tag, which emits a ``<picture>`` with a
+WebP ``srcset`` and a JPEG fallback, or the original file until the variants
+exist.
+"""
+
+import hashlib
+import io
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps
+
+from . import tasks, windows
+from .models import Book
+
+# name -> (width, height); 2:3 book-cover crops at 1x/2x/4x of the 160px card
+VARIANTS = {
+    "thumb": (160, 240),
+    "card": (320, 480),
+    "large": (640, 960),
+}
+FORMATS = {"jpeg": ("JPEG", "jpg"), "webp": ("WEBP", "webp")}
+QUALITY = 82
+
+
+def needs_processing(book):
+    return bool(book.image) and (book.image_variants or {}).get("source") != book.image.name
+
+
+def schedule(book):
+    """Queue processing of ``book``'s cover as a background task."""
+    tasks.enqueue("images.process_cover", {"book_id": book.pk}, key=f"book:{book.pk}")
+
+
+@tasks.task("images.process_cover", max_attempts=3)
+def process_cover_task(payload):
+    process_cover(payload["book_id"])
+
+
+def render_variants(data):
+    """Return {(variant, fmt): bytes} for the source image bytes ``data``."""
+    with Image.open(io.BytesIO(data)) as source:
+        source = ImageOps.exif_transpose(source)
+        pixels = source.convert("RGB")
+    outputs = {}
+    for name, size in VARIANTS.items():
+        resized = ImageOps.fit(pixels, size, method=Image.Resampling.LANCZOS)
+        resized.info = {}  # no EXIF, ICC or comments carried into the output
+        for fmt, (pil_format, _ext) in FORMATS.items():
+            buffer = io.BytesIO()
+            resized.save(buffer, pil_format, quality=QUALITY, optimize=True)
+            outputs[(name, fmt)] = buffer.getvalue()
+    return outputs
+
+
+def process_cover(book_id):
+    """Generate and store all variants for one book; returns the variants dict."""
+    book = Book.objects.filter(pk=book_id).first()
+    if book is None or not book.image:
+        return None
+    source_name = book.image.name
+    with book.image.open("rb") as fh:
+        data = fh.read()
+    digest = hashlib.sha256(data).hexdigest()[:16]
+    variants = {"source": source_name, "hash": digest}
+    for (name, fmt), payload in render_variants(data).items():
+        width = VARIANTS[name][0]
+        path = f"covers/{digest}-{width}.{FORMATS[fmt][1]}"
+        if not default_storage.exists(path):
+            path = default_storage.save(path, ContentFile(payload))
+        variants.setdefault(name, {})[fmt] = path
+    # Only record the result if the cover was not replaced meanwhile
+    if Book.objects.filter(pk=book_id, image=source_name).update(image_variants=variants):
+        # Cached cards are keyed on the variant hash. Windows are dropped here
+        # when the default cache is shared, else they refresh within their TTL.
+        windows.invalidate()
+    return variants
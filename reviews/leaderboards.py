@@ -0,0 +1,177 @@
+"""Materialized leaderboards: top-rated books, most-reviewed books, most
+active reviewers.
+
+Scores live in ``LeaderboardEntry`` rows, one per (board, book/user), and
+pages are keyset range reads over ``(board, -score, -object_id)``: page N
+costs the same as page 1 however large the catalogue.
+
+- ``top_rated_books``: Bayesian average ``(C·m + Σratings) / (C + n)``,
+  where ``m`` is the catalogue-wide mean rating (the board's
+  ``prior_mean``) and ``C`` is ``LEADERBOARD_PRIOR_WEIGHT`` pseudo-reviews,
+  so a single 5-star review doesn't top the chart.
+- ``most_reviewed_books``: ``Book.review_count``.
+- ``most_active_reviewers``: ``User.review_count``.
+
+Review saves/deletes rescore the affected book and author from the stored
+aggregates (``review_changed``, run by the coalescing
+``leaderboards.rescore`` task). The prior mean only moves on a full
+``refresh`` (``manage.py refresh_leaderboards``), which recomputes every
+score; run it periodically.
+"""
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q, Sum
+from django.utils import timezone
+
+from users.models import User
+
+from . import tasks
+from .models import Book, Leaderboard, LeaderboardEntry
+
+LEADERBOARD_PRIOR_WEIGHT = getattr(settings, "LEADERBOARD_PRIOR_WEIGHT", 10)
+LEADERBOARD_PAGE_SIZE = getattr(settings, "LEADERBOARD_PAGE_SIZE", 25)
+_BATCH_SIZE = 5000
+
+TOP_RATED_BOOKS = "top_rated_books"
+MOST_REVIEWED_BOOKS = "most_reviewed_books"
+MOST_ACTIVE_REVIEWERS = "most_active_reviewers"
+
+BOARDS = {
+    TOP_RATED_BOOKS: {"title": "Top Rated Books", "model": Book},
+    MOST_REVIEWED_BOOKS: {"title": "Most Reviewed Books", "model": Book},
+    MOST_ACTIVE_REVIEWERS: {"title": "Most Active Reviewers", "model": User},
+}
+
+
+def bayesian_score(rating_sum, review_count, prior_mean):
+    return (LEADERBOARD_PRIOR_WEIGHT * prior_mean + rating_sum) / (LEADERBOARD_PRIOR_WEIGHT + review_count)
+
+
+def prior_mean():
+    """Mean rating stored for the top-rated board (0 before the first refresh)."""
+    board = Leaderboard.objects.filter(name=TOP_RATED_BOOKS).values_list("prior_mean", flat=True).first()
+    return board or 0.0
+
+
+def _book_scores(rows, mean):
+    for book_id, review_count, rating_sum in rows:
+        if review_count:
+            yield TOP_RATED_BOOKS, book_id, bayesian_score(rating_sum, review_count, mean)
+            yield MOST_REVIEWED_BOOKS, book_id, float(review_count)
+
+
+def _set_scores(board_ids, scores):
+    """Replace entries of ``board_ids`` [(board, object_id)] by ``scores``."""
+    keyed = {(board, object_id): score for board, object_id, score in scores}
+    for board, object_id in board_ids:
+        score = keyed.get((board, object_id))
+        entries = LeaderboardEntry.objects.filter(board=board, object_id=object_id)
+        if score is None:
+            entries.delete()
+        elif not entries.update(score=score):
+            LeaderboardEntry.objects.create(board=board, object_id=object_id, score=score)
+
+
+def review_changed(book_ids, user_ids):
+    """Rescore books and reviewers after their stored aggregates changed."""
+    book_ids = [pk for pk in book_ids if pk is not None]
+    user_ids = [pk for pk in user_ids if pk is not None]
+    mean = prior_mean()
+    rows = Book.objects.filter(pk__in=book_ids).values_list("pk", "review_count", "rating_sum")
+    scores = list(_book_scores(rows, mean))
+    users = User.objects.filter(pk__in=user_ids).values_list("pk", "review_count")
+    scores += [(MOST_ACTIVE_REVIEWERS, pk, float(n)) for pk, n in users if n]
+    targets = [(board, pk) for pk in book_ids for board in (TOP_RATED_BOOKS, MOST_REVIEWED_BOOKS)]
+    targets += [(MOST_ACTIVE_REVIEWERS, pk) for pk in user_ids]
+    _set_scores(targets, scores)
+
+
+@tasks.task("leaderboards.rescore", batch=True)
+def rescore_task(payloads):
+    book_ids, user_ids = set(), set()
+    for payload in payloads:
+        book_ids.update(payload.get("book_ids", ()))
+        user_ids.update(payload.get("user_ids", ()))
+    review_changed(book_ids, user_ids)
+
+
+def refresh(boards=None):
+    """Recompute every score of ``boards`` (default: all); return row counts."""
+    boards = list(boards or BOARDS)
+    totals = Book.objects.aggregate(reviews=Sum("review_count"), ratings=Sum("rating_sum"))
+    mean = (totals["ratings"] or 0) / totals["reviews"] if totals["reviews"] else 0.0
+    counts = {}
+    with transaction.atomic():
+        Leaderboard.objects.filter(name__in=boards).delete()
+        LeaderboardEntry.objects.filter(board__in=boards).delete()
+        if TOP_RATED_BOOKS in boards or MOST_REVIEWED_BOOKS in boards:
+            rows = (
+                Book.objects.filter(review_count__gt=0)
+                .values_list("pk", "review_count", "rating_sum")
+                .iterator(chunk_size=_BATCH_SIZE)
+            )
+            scores = (score for score in _book_scores(rows, mean) if score[0] in boards)
+            _bulk_insert(scores, counts)
+        if MOST_ACTIVE_REVIEWERS in boards:
+            rows = (
+                User.objects.filter(review_count__gt=0)
+                .values_list("pk", "review_count")
+                .iterator(chunk_size=_BATCH_SIZE)
+            )
+            _bulk_insert(((MOST_ACTIVE_REVIEWERS, pk, float(n)) for pk, n in rows), counts)
+        now = timezone.now()
+        Leaderboard.objects.bulk_create([
+            Leaderboard(name=name, prior_mean=mean if name == TOP_RATED_BOOKS else 0, refreshed=now)
+            for name in boards
+        ])
+    return {board: counts.get(board, 0) for board in boards}
+
+
+def _bulk_insert(scores, counts):
+    batch = []
+    for board, object_id, score in scores:
+        batch.append(LeaderboardEntry(board=board, object_id=object_id, score=score))
+        counts[board] = counts.get(board, 0) + 1
+        if len(batch) >= _BATCH_SIZE:
+            LeaderboardEntry.objects.bulk_create(batch)
+            batch = []
+    LeaderboardEntry.objects.bulk_create(batch)
+
+
+def forget(board_names, object_id):
+    LeaderboardEntry.objects.filter(board__in=board_names, object_id=object_id).delete()
+
+
+def _encode(entry, position):
+    return f"{entry.score!r}:{entry.object_id}:{position}"
+
+
+def _decode(value):
+    try:
+        score, object_id, position = value.split(":")
+        return float(score), int(object_id), int(position)
+    except (AttributeError, ValueError):
+        return None
+
+
+def page(board, after=None, page_size=LEADERBOARD_PAGE_SIZE):
+    """Return ``(rows, next_cursor)``; rows are (rank, object, score) tuples."""
+    entries = LeaderboardEntry.objects.filter(board=board)
+    cursor = _decode(after)
+    position = 0
+    if cursor is not None:
+        score, object_id, position = cursor
+        entries = entries.filter(Q(score__lt=score) | Q(score=score, object_id__lt=object_id))
+    entries = list(entries.order_by("-score", "-object_id")[:page_size + 1])
+    next_cursor = None
+    if len(entries) > page_size:
+        entries = entries[:page_size]
+        next_cursor = _encode(entries[-1], position + page_size)
+    objects = BOARDS[board]["model"].objects.in_bulk([entry.object_id for entry in entries])
+    rows = [
+        (position + n, objects[entry.object_id], entry.score)
+        for n, entry in enumerate(entries, start=1)
+        if entry.object_id in objects
+    ]
+    return rows, next_cursor
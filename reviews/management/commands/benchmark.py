@@ -0,0 +1,138 @@
+import time
+import timeit
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from litreview.perf import load_json, save_json, summarize
+from reviews import stars
+from reviews.models import Book
+from users.models import User
+
+
+class Command(BaseCommand):
+    help = (
+        "Drive the main views through the Django test client and report latency "
+        "percentiles and query counts, optionally diffing against a saved baseline."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--iterations", type=int, default=50, help="Requests per scenario.")
+        parser.add_argument("--warmup", type=int, default=3, help="Untimed requests per scenario.")
+        parser.add_argument("--only", nargs="*", help="Run only these scenario names.")
+        parser.add_argument("--save", metavar="PATH", help="Write results as a JSON baseline.")
+        parser.add_argument("--baseline", metavar="PATH", help="Compare against a saved baseline.")
+        parser.add_argument(
+            "--fail-over", type=float, metavar="PCT",
+            help="Exit non-zero if any p95 or query count regresses by more than PCT%% vs the baseline.",
+        )
+        parser.add_argument(
+            "--star-bars", action="store_true",
+            help="Also time the star-bar lookup tables against the original arithmetic.",
+        )
+
+    def scenarios(self):
+        """Return {name: (url, viewer)} built from the current data."""
+        viewer = User.objects.order_by("-following_count").first()
+        target = User.objects.order_by("-review_count").first()
+        book = Book.objects.order_by("-review_count").first()
+        if viewer is None or book is None:
+            raise CommandError("No data to benchmark; run generate_dataset first.")
+        term = book.title.split()[0][:4]
+        return {
+            "home_guest": (reverse("home"), None),
+            "home_following": (reverse("home") + "?feed=following", viewer),
+            "home_recent": (reverse("home") + "?feed=recent", viewer),
+            "recent_reviews": (reverse("recent_reviews"), viewer),
+            "search": (reverse("search") + f"?q={term}", viewer),
+            "search_guest": (reverse("search") + f"?q={term}", None),
+            "book_detail": (reverse("book_detail", args=[book.id]), None),
+            "user_profile": (reverse("user_profile", args=[target.username]), viewer),
+            "user_profile_stream": (reverse("user_profile", args=[target.username]) + "?stream=1", viewer),
+            "username_available": (reverse("username_available") + f"?username={viewer.username}x", None),
+            "email_available": (reverse("email_available") + f"?email=new-{viewer.email}", None),
+        }
+
+    @override_settings(ALLOWED_HOSTS=["*"], QUERY_PROFILER_ENABLED=False)
+    def handle(self, *args, **options):
+        if options["star_bars"]:
+            self.star_bars()
+        scenarios = self.scenarios()
+        if options["only"]:
+            unknown = set(options["only"]) - set(scenarios)
+            if unknown:
+                raise CommandError(f"Unknown scenario(s): {', '.join(sorted(unknown))}")
+            scenarios = {name: scenarios[name] for name in options["only"]}
+
+        results = {}
+        for name, (url, viewer) in scenarios.items():
+            client = Client()
+            if viewer is not None:
+                client.force_login(viewer)
+            for _ in range(options["warmup"]):
+                self.fetch(client, url)
+            latencies, queries = [], []
+            for _ in range(options["iterations"]):
+                with CaptureQueriesContext(connection) as captured:
+                    start = time.perf_counter()
+                    status = self.fetch(client, url)
+                    latencies.append((time.perf_counter() - start) * 1000)
+                queries.append(len(captured))
+                if status >= 400:
+                    raise CommandError(f"{name}: {url} returned {status}")
+            results[name] = {**summarize(latencies), "queries": max(queries)}
+
+        baseline = load_json(options["baseline"]) if options["baseline"] else {}
+        regressions = self.report(results, baseline, options["fail_over"])
+        if options["save"]:
+            save_json(options["save"], results)
+            self.stdout.write(f"Saved baseline to {options['save']}")
+        if regressions:
+            raise CommandError(f"Regressions over {options['fail_over']}%: {', '.join(regressions)}")
+
+    def star_bars(self):
+        """Time one feed page of bars: whole review ratings plus a few book averages."""
+        ratings = [n % 6 for n in range(90)] + [n / 7 for n in range(10)]
+
+        def best(func):
+            return min(timeit.repeat(lambda: [func(r) for r in ratings], number=200, repeat=5)) / 200 * 1000
+
+        tables, arithmetic = best(stars.stars), best(stars.arithmetic_stars)
+        self.stdout.write(
+            f"star bars (100 per page): tables {tables:.3f} ms, arithmetic {arithmetic:.3f} ms "
+            f"({arithmetic / tables:.1f}x)"
+        )
+
+    def fetch(self, client, url):
+        response = client.get(url)
+        if response.streaming:
+            for _ in response.streaming_content:
+                pass
+        return response.status_code
+
+    def report(self, results, baseline, fail_over):
+        header = f"{'scenario':<22}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'queries':>9}"
+        if baseline:
+            header += f"{'Δp95':>9}{'Δqueries':>10}"
+        self.stdout.write(header)
+        regressions = []
+        for name, row in results.items():
+            line = f"{name:<22}{row['p50_ms']:>9.2f}{row['p95_ms']:>9.2f}{row['p99_ms']:>9.2f}{row['queries']:>9}"
+            base = baseline.get(name)
+            if base:
+                p95_delta = _pct(row["p95_ms"], base["p95_ms"])
+                query_delta = _pct(row["queries"], base["queries"])
+                line += f"{p95_delta:>+8.1f}%{query_delta:>+9.1f}%"
+                if fail_over is not None and max(p95_delta, query_delta) > fail_over:
+                    regressions.append(name)
+            self.stdout.write(line)
+        return regressions
+
+
+def _pct(current, previous):
+    if not previous:
+        return 0.0 if not current else 100.0
+    return (current - previous) / previous * 100.0
@@ -0,0 +1,140 @@
+import json
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections
+from django.test import Client, override_settings
+from django.urls import reverse
+
+from litreview.perf import summarize
+from reviews.models import Book, Review
+from users.models import User
+
+# Reviews written by the benchmark carry this headline and are removed afterwards
+MARKER = "benchmark_mixed write"
+
+
+class Command(BaseCommand):
+    help = (
+        "Mixed read/write load (book pages, home feed, review posts) from concurrent "
+        "threads; reports throughput, latency and lock errors for the current database "
+        "profile, or compares several profiles with --profiles."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--duration", type=float, default=10.0, help="Seconds of load.")
+        parser.add_argument("--threads", type=int, default=8)
+        parser.add_argument("--write-ratio", type=float, default=0.2, help="Share of requests that post a review.")
+        parser.add_argument("--seed", type=int, default=7)
+        parser.add_argument(
+            "--profiles", nargs="+", metavar="PROFILE",
+            help="Run once per LITREVIEW_DB_PROFILE (e.g. sqlite sqlite-wal) and compare.",
+        )
+        parser.add_argument("--json", action="store_true", help="Print the result as one JSON line.")
+
+    def handle(self, *args, **options):
+        if options["profiles"]:
+            return self.compare(options)
+        result = self.run(options)
+        if options["json"]:
+            self.stdout.write(json.dumps(result))
+        else:
+            self.report({settings.DB_PROFILE: result})
+
+    def run(self, options):
+        users = list(User.objects.filter(is_active=True).order_by("?")[:max(options["threads"] * 4, 20)])
+        book_ids = list(Book.objects.order_by("?").values_list("id", flat=True)[:500])
+        if not users or not book_ids:
+            raise CommandError("No data to benchmark; run generate_dataset first.")
+        latencies = {"read": [], "write": []}
+        errors = {"read": 0, "write": 0}
+        lock = threading.Lock()
+        deadline = time.perf_counter() + options["duration"]
+
+        def worker(index):
+            rng = random.Random(options["seed"] + index)
+            clients = []
+            for user in users[index::options["threads"]] or users[:1]:
+                client = Client()
+                client.force_login(user)
+                clients.append(client)
+            while time.perf_counter() < deadline:
+                client = rng.choice(clients)
+                book_id = rng.choice(book_ids)
+                kind = "write" if rng.random() < options["write_ratio"] else "read"
+                start = time.perf_counter()
+                try:
+                    if kind == "write":
+                        response = client.post(
+                            reverse("review_create", args=[book_id]),
+                            {"headline": MARKER, "body": "Mixed load test.", "rating": rng.randint(0, 5)},
+                        )
+                        ok = response.status_code == 302
+                    else:
+                        url = reverse("book_detail", args=[book_id]) if rng.random() < 0.5 else reverse("home")
+                        ok = client.get(url).status_code == 200
+                except Exception:  # "database is locked" and friends
+                    ok = False
+                elapsed = (time.perf_counter() - start) * 1000
+                with lock:
+                    if ok:
+                        latencies[kind].append(elapsed)
+                    else:
+                        errors[kind] += 1
+            close_old_connections()
+
+        started = time.perf_counter()
+        with override_settings(ALLOWED_HOSTS=["*"], QUERY_PROFILER_ENABLED=False):
+            threads = [threading.Thread(target=worker, args=(i,)) for i in range(options["threads"])]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        wall = time.perf_counter() - started
+        Review.objects.filter(headline=MARKER).delete()
+
+        completed = len(latencies["read"]) + len(latencies["write"])
+        return {
+            "ops_per_s": round(completed / wall, 1),
+            "reads": summarize(latencies["read"]),
+            "writes": summarize(latencies["write"]),
+            "read_errors": errors["read"],
+            "write_errors": errors["write"],
+        }
+
+    def compare(self, options):
+        manage_py = os.path.join(settings.BASE_DIR, "manage.py")
+        results = {}
+        for profile in options["profiles"]:
+            command = [
+                sys.executable, manage_py, "benchmark_mixed", "--json",
+                "--duration", str(options["duration"]),
+                "--threads", str(options["threads"]),
+                "--write-ratio", str(options["write_ratio"]),
+                "--seed", str(options["seed"]),
+            ]
+            env = {**os.environ, "LITREVIEW_DB_PROFILE": profile}
+            self.stdout.write(f"Running profile {profile}...")
+            proc = subprocess.run(command, env=env, capture_output=True, text=True)
+            if proc.returncode != 0:
+                raise CommandError(f"Profile {profile} failed:\n{proc.stderr}")
+            results[profile] = json.loads(proc.stdout.strip().splitlines()[-1])
+        self.report(results)
+
+    def report(self, results):
+        self.stdout.write(
+            f"{'profile':<12}{'ops/s':>8}{'read p50':>10}{'read p95':>10}"
+            f"{'write p50':>11}{'write p95':>11}{'errors':>8}"
+        )
+        for profile, row in results.items():
+            self.stdout.write(
+                f"{profile:<12}{row['ops_per_s']:>8.1f}{row['reads']['p50_ms']:>10.2f}"
+                f"{row['reads']['p95_ms']:>10.2f}{row['writes']['p50_ms']:>11.2f}"
+                f"{row['writes']['p95_ms']:>11.2f}{row['read_errors'] + row['write_errors']:>8}"
+            )
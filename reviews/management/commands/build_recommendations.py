@@ -0,0 +1,27 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from reviews import recommendations
+
+
+class Command(BaseCommand):
+    help = (
+        "Compute item-item book similarities and per-reader recommendations from "
+        "the review matrix and store the top-K lists."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--incremental", action="store_true",
+            help="Only recompute books flagged stale by new reviews (and their readers).",
+        )
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        stats = recommendations.build(incremental=options["incremental"])
+        elapsed = time.perf_counter() - start
+        self.stdout.write(self.style.SUCCESS(
+            f"Updated neighbours for {stats['books']} book(s) and recommendations "
+            f"for {stats['users']} reader(s) in {elapsed:.1f}s."
+        ))
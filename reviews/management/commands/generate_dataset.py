@@ -0,0 +1,155 @@
+import random
+import time
+from datetime import timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from reviews.bulk import manual_timestamps
+from reviews.models import Book, Review
+from users.models import User
+
+# Bulk inserts skip signals; leaderboards read the rebuilt aggregates, so they come after them
+REBUILD_COMMANDS = (
+    "rebuild_book_ratings", "reconcile_user_counters", "rebuild_search_index", "rebuild_feeds",
+    "refresh_leaderboards", "build_recommendations",
+)
+
+WORDS = (
+    "night river empire glass garden silent winter shadow crown stone letter "
+    "ocean memory iron summer house secret road fire song city storm wild "
+    "last forgotten hidden golden broken little lost dark bright distant"
+).split()
+
+
+def zipf_weights(n, alpha):
+    """Cumulative weights for a power-law choice over ``n`` ranked items."""
+    total, cumulative = 0.0, []
+    for rank in range(1, n + 1):
+        total += 1.0 / rank ** alpha
+        cumulative.append(total)
+    return cumulative
+
+
+class Command(BaseCommand):
+    help = (
+        "Generate a synthetic dataset (users, books, reviews, power-law follow graph) "
+        "for benchmarking, then rebuild all derived tables."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=1000)
+        parser.add_argument("--books", type=int, default=2000)
+        parser.add_argument("--reviews", type=int, default=20000)
+        parser.add_argument("--avg-follows", type=int, default=20, help="Mean followees per user.")
+        parser.add_argument("--alpha", type=float, default=1.1, help="Power-law exponent for popularity.")
+        parser.add_argument("--seed", type=int, default=42)
+        parser.add_argument("--batch-size", type=int, default=5000)
+        parser.add_argument("--password", default="benchmark1", help="Password set on every generated user.")
+        parser.add_argument(
+            "--force", action="store_true",
+            help="Add a dataset even if the database already has users.",
+        )
+
+    def handle(self, *args, **options):
+        if User.objects.exists() and not options["force"]:
+            raise CommandError("Database already has users; use --force to add a dataset on top.")
+        self.rng = random.Random(options["seed"])
+        self.batch = options["batch_size"]
+        started = time.perf_counter()
+        with transaction.atomic():
+            user_ids = self.create_users(options["users"], options["password"])
+            book_ids = self.create_books(options["books"])
+            self.create_follows(user_ids, options["avg_follows"], options["alpha"])
+            self.create_reviews(user_ids, book_ids, options["reviews"], options["alpha"])
+        self.stdout.write("Rebuilding derived data...")
+        for command in REBUILD_COMMANDS:
+            call_command(command, stdout=self.stdout)
+        self.stdout.write(self.style.SUCCESS(f"Dataset generated in {time.perf_counter() - started:.1f}s."))
+
+    def _bulk(self, model, rows):
+        model.objects.bulk_create(rows, batch_size=self.batch)
+
+    def create_users(self, count, password):
+        hashed = make_password(password)
+        offset = User.objects.count()
+        rows = []
+        for n in range(offset, offset + count):
+            rows.append(User(
+                username=f"reader{n}",
+                first_name=self.rng.choice(WORDS).title(),
+                last_name=f"{self.rng.choice(WORDS).title()}{n}",
+                email=f"reader{n}@example.com",
+                password=hashed,
+            ))
+            if len(rows) >= self.batch:
+                self._bulk(User, rows)
+                rows = []
+        self._bulk(User, rows)
+        self.stdout.write(f"{count} users")
+        return list(User.objects.order_by("id").values_list("id", flat=True)[offset:])
+
+    def create_books(self, count):
+        first_id = (Book.objects.order_by("-id").values_list("id", flat=True).first() or 0) + 1
+        rows = []
+        for _ in range(count):
+            title = " ".join(self.rng.choice(WORDS) for _ in range(self.rng.randint(1, 4))).title()
+            description = " ".join(self.rng.choice(WORDS) for _ in range(30))
+            rows.append(Book(title=title, description=description))
+            if len(rows) >= self.batch:
+                self._bulk(Book, rows)
+                rows = []
+        self._bulk(Book, rows)
+        self.stdout.write(f"{count} books")
+        return list(Book.objects.filter(id__gte=first_id).order_by("id").values_list("id", flat=True))
+
+    def create_follows(self, user_ids, avg_follows, alpha):
+        """Preferential follow graph: a few users attract most followers."""
+        Follow = User.following.through
+        popularity = user_ids[:]
+        self.rng.shuffle(popularity)
+        weights = zipf_weights(len(popularity), alpha)
+        rows, total = [], 0
+        for follower in user_ids:
+            # Out-degree is itself heavy-tailed around the requested mean
+            degree = min(int(self.rng.paretovariate(2.0) * avg_follows / 2), len(user_ids) - 1)
+            followees = set(self.rng.choices(popularity, cum_weights=weights, k=degree))
+            followees.discard(follower)
+            rows.extend(Follow(from_user_id=follower, to_user_id=followee) for followee in followees)
+            if len(rows) >= self.batch:
+                Follow.objects.bulk_create(rows, batch_size=self.batch, ignore_conflicts=True)
+                total += len(rows)
+                rows = []
+        Follow.objects.bulk_create(rows, batch_size=self.batch, ignore_conflicts=True)
+        total += len(rows)
+        self.stdout.write(f"{total} follow edges")
+
+    def create_reviews(self, user_ids, book_ids, count, alpha):
+        authors = user_ids[:]
+        books = book_ids[:]
+        self.rng.shuffle(authors)
+        self.rng.shuffle(books)
+        author_weights = zipf_weights(len(authors), alpha)
+        book_weights = zipf_weights(len(books), alpha)
+        now = timezone.now()
+        rows = []
+        with manual_timestamps(Review, "created", "updated"):
+            for _ in range(count):
+                created = now - timedelta(seconds=self.rng.randint(0, 365 * 24 * 3600))
+                rows.append(Review(
+                    headline=" ".join(self.rng.choice(WORDS) for _ in range(5)).capitalize(),
+                    body=" ".join(self.rng.choice(WORDS) for _ in range(self.rng.randint(20, 120))),
+                    rating=min(5, max(0, int(self.rng.gauss(3.6, 1.1) + 0.5))),
+                    user_id=self.rng.choices(authors, cum_weights=author_weights)[0],
+                    book_id=self.rng.choices(books, cum_weights=book_weights)[0],
+                    created=created,
+                    updated=created,
+                ))
+                if len(rows) >= self.batch:
+                    self._bulk(Review, rows)
+                    rows = []
+            self._bulk(Review, rows)
+        self.stdout.write(f"{count} reviews")
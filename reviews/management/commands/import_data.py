@@ -0,0 +1,74 @@
+import time
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+
+from reviews import bulk
+
+REBUILD_COMMANDS = ("rebuild_book_ratings", "reconcile_user_counters", "rebuild_search_index", "rebuild_feeds", "refresh_leaderboards")
+
+
+class Command(BaseCommand):
+    help = (
+        "Import users, books, reviews and follow edges from NDJSON/CSV files written by "
+        "export_data, in batches, then rebuild derived data."
+    )
+
+    def add_arguments(self, parser):
+        for entity in bulk.ENTITIES:
+            parser.add_argument(f"--{entity}", metavar="PATH", help=f"{entity.title()} file to import.")
+        parser.add_argument("--format", choices=bulk.FORMATS, help="Defaults to csv for *.csv files, else ndjson.")
+        parser.add_argument("--batch-size", type=int, default=5000, help="Rows per bulk insert and transaction.")
+        parser.add_argument(
+            "--update", action="store_true",
+            help="Update name/email/active on users that already exist instead of skipping them.",
+        )
+        parser.add_argument(
+            "--id-map", metavar="PATH",
+            help="JSON file mapping exported usernames and book ids to local ids. Read first and "
+                 "rewritten after each file, so reviews and follows can be imported in a later run.",
+        )
+        parser.add_argument(
+            "--trust-ids", action="store_true",
+            help="Resolve usernames and book ids missing from the id map against existing local rows. "
+                 "Only correct for an export of this same database.",
+        )
+        parser.add_argument(
+            "--skip-rebuild", action="store_true",
+            help="Do not rebuild ratings, counters, search index and feeds afterwards.",
+        )
+
+    def handle(self, *args, **options):
+        paths = {entity: options[entity] for entity in bulk.ENTITIES if options[entity]}
+        if not paths:
+            raise CommandError("Nothing to import; pass at least one of --users/--books/--reviews/--follows.")
+        id_map_path = options["id_map"]
+        try:
+            id_map = bulk.load_id_map(id_map_path) if id_map_path else None
+            importer = bulk.Importer(
+                options["batch_size"], options["update"], progress=self.stdout.write,
+                id_map=id_map, trust_ids=options["trust_ids"],
+            )
+        except (OSError, ValueError, RuntimeError) as exc:
+            raise CommandError(str(exc))
+
+        started = time.perf_counter()
+        for entity, path in paths.items():
+            fmt = options["format"] or bulk.detect_format(path)
+            try:
+                with open(path, encoding="utf-8", newline="") as fh:
+                    imported, skipped, elapsed = importer.run(entity, bulk.read_rows(fh, fmt))
+            except (OSError, ValueError) as exc:
+                raise CommandError(f"{path}: {exc}")
+            if id_map_path:
+                bulk.save_id_map(id_map_path, importer.id_map)
+            self.stdout.write(self.style.SUCCESS(
+                f"{entity}: imported {imported}, skipped {skipped} in {elapsed:.1f}s "
+                f"({imported / elapsed if elapsed else 0:.0f} rows/s)"
+            ))
+
+        if not options["skip_rebuild"]:
+            self.stdout.write("Rebuilding derived data...")
+            for command in REBUILD_COMMANDS:
+                call_command(command, stdout=self.stdout)
+        self.stdout.write(self.style.SUCCESS(f"Import finished in {time.perf_counter() - started:.1f}s."))
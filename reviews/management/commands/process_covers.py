@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from reviews import images
+from reviews.models import Book
+
+
+class Command(BaseCommand):
+    help = "Build thumbnail/WebP variants for book covers that do not have them yet."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--all", action="store_true", help="Reprocess every cover, not just missing ones.")
+
+    def handle(self, *args, **options):
+        done = failed = 0
+        for book in Book.objects.exclude(image="").exclude(image__isnull=True).iterator():
+            if not options["all"] and not images.needs_processing(book):
+                continue
+            try:
+                images.process_cover(book.id)
+                done += 1
+            except Exception as exc:  # missing file, unreadable image, ...
+                failed += 1
+                self.stderr.write(f"Book {book.id}: {exc}")
+        self.stdout.write(self.style.SUCCESS(f"Processed {done} cover(s), {failed} failed."))
@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from reviews.models import Book
+from reviews.ratings import RATING_FIELDS, computed_aggregates
+
+FIELDS = ["review_count", "rating_sum"] + RATING_FIELDS
+
+
+class Command(BaseCommand):
+    help = "Recompute the rating aggregates stored on Book from its reviews and report drift."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--check", action="store_true",
+            help="Only report books whose stored aggregates drifted; exit non-zero if any.",
+        )
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        empty = dict.fromkeys(FIELDS, 0)
+        expected = computed_aggregates()
+        drifted = []
+        with transaction.atomic():
+            books = Book.objects.only("id", *FIELDS).select_for_update().iterator(chunk_size=options["batch_size"])
+            for book in books:
+                values = expected.get(book.id, empty)
+                if any(getattr(book, f) != values[f] for f in FIELDS):
+                    for field, value in values.items():
+                        setattr(book, field, value)
+                    drifted.append(book)
+            if drifted and not options["check"]:
+                Book.objects.bulk_update(drifted, FIELDS, batch_size=options["batch_size"])
+
+        if options["check"]:
+            for book in drifted[:20]:
+                self.stdout.write(f"Drift on book {book.id}")
+            if drifted:
+                raise CommandError(f"{len(drifted)} book(s) have drifted aggregates.")
+            self.stdout.write(self.style.SUCCESS("No drift."))
+        else:
+            self.stdout.write(self.style.SUCCESS(f"Rebuilt aggregates; fixed {len(drifted)} book(s)."))
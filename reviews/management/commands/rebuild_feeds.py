@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from reviews import feed
+from reviews.models import FeedEntry
+from users.models import User
+
+
+class Command(BaseCommand):
+    help = "Rebuild every user's following-feed inbox from the follow graph."
+
+    def handle(self, *args, **options):
+        Follow = User.following.through
+        with transaction.atomic():
+            FeedEntry.objects.all().delete()
+            edges = 0
+            rows = Follow.objects.order_by("from_user_id").values_list("from_user_id", "to_user_id")
+            owner_id, followees = None, []
+            for from_id, to_id in rows.iterator(chunk_size=5000):
+                if from_id != owner_id and followees:
+                    feed.backfill(owner_id, followees)
+                    followees = []
+                owner_id = from_id
+                followees.append(to_id)
+                edges += 1
+            if followees:
+                feed.backfill(owner_id, followees)
+        self.stdout.write(self.style.SUCCESS(
+            f"Rebuilt feeds from {edges} follow edges ({FeedEntry.objects.count()} entries)."
+        ))
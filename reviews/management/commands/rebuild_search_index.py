@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from reviews import search
+from reviews.models import Book, Review
+from users.models import User
+
+
+class Command(BaseCommand):
+    help = "Rebuild the full-text search index for books, users and reviews."
+
+    def handle(self, *args, **options):
+        backend = search.get_backend(connection)
+        if backend is None:
+            self.stdout.write(f"No search index for the '{connection.vendor}' backend; nothing to do.")
+            return
+        counts = {}
+        with transaction.atomic(), connection.cursor() as cursor:
+            backend.clear(cursor)
+            for kind, model in (("book", Book), ("user", User), ("review", Review)):
+                counts[kind] = 0
+                for obj in model.objects.all().iterator(chunk_size=2000):
+                    title, body = search.document_for(kind, obj)
+                    backend.index(cursor, kind, obj.pk, title, body)
+                    counts[kind] += 1
+        summary = ", ".join(f"{n} {kind}s" for kind, n in counts.items())
+        self.stdout.write(self.style.SUCCESS(f"Indexed {summary}."))
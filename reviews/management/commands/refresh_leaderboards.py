@@ -0,0 +1,18 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from reviews import leaderboards
+
+
+class Command(BaseCommand):
+    help = "Recompute leaderboard scores (and the Bayesian prior mean) from the stored aggregates."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--board", action="append", choices=list(leaderboards.BOARDS), help="Only this board (repeatable).")
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        counts = leaderboards.refresh(options["board"])
+        summary = ", ".join(f"{board}: {n}" for board, n in counts.items())
+        self.stdout.write(self.style.SUCCESS(f"Refreshed leaderboards ({summary}) in {time.perf_counter() - start:.1f}s."))
@@ -0,0 +1,183 @@
+import json
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client, override_settings
+from django.urls import Resolver404, resolve
+
+from litreview.perf import summarize
+from users.models import User
+
+
+def parse_timestamp(value):
+    """Accept epoch seconds or an ISO 8601 string; return epoch seconds or None."""
+    if value is None:
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    try:
+        return datetime.fromisoformat(str(value).replace("Z", "+00:00")).timestamp()
+    except ValueError:
+        return None
+
+
+def url_name(path):
+    """Name of the ``litreview.urls`` pattern serving ``path`` (or a fallback)."""
+    try:
+        match = resolve(urllib.parse.urlsplit(path).path)
+    except Resolver404:
+        return "<unresolved>"
+    return match.view_name or match.url_name or "<unnamed>"
+
+
+class Command(BaseCommand):
+    help = (
+        "Replay a JSON-lines request capture against the app (in-process or over HTTP) "
+        "and report throughput, latency percentiles and errors per URL pattern."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("logfile", help=(
+            "JSON lines; each line needs 'path' and may have 'method', 'ts'/'timestamp' "
+            "(epoch seconds or ISO 8601), 'data' (form fields) and 'user' (username)."
+        ))
+        parser.add_argument("--base-url", help="Replay over HTTP against this server instead of in-process.")
+        parser.add_argument("--concurrency", type=int, default=8)
+        parser.add_argument("--rate", type=float, help="Fixed requests/second instead of the captured timing.")
+        parser.add_argument("--speed", type=float, default=1.0, help="Time compression for captured timing (2 = twice as fast).")
+        parser.add_argument("--limit", type=int, help="Replay at most this many requests.")
+        parser.add_argument("--timeout", type=float, default=30.0, help="HTTP timeout in seconds.")
+
+    def handle(self, *args, **options):
+        entries, skipped = self.load(options["logfile"], options["limit"])
+        if not entries:
+            raise CommandError(f"No replayable requests in {options['logfile']} ({skipped} lines skipped).")
+        if skipped:
+            self.stdout.write(f"Skipped {skipped} line(s) without a request path.")
+
+        offsets = self.schedule(entries, options["rate"], options["speed"])
+        self.base_url = options["base_url"]
+        self.timeout = options["timeout"]
+        self._local = threading.local()
+        results = defaultdict(list)
+        lock = threading.Lock()
+
+        def run(entry):
+            name = url_name(entry["path"])
+            start = time.perf_counter()
+            try:
+                status = self.send(entry)
+            except Exception:  # network errors, view crashes
+                status = None
+            elapsed = (time.perf_counter() - start) * 1000
+            with lock:
+                results[name].append((elapsed, status))
+
+        with override_settings(ALLOWED_HOSTS=["*"]):
+            started = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=options["concurrency"]) as pool:
+                for entry, offset in zip(entries, offsets):
+                    delay = offset - (time.perf_counter() - started)
+                    if delay > 0:
+                        time.sleep(delay)
+                    pool.submit(run, entry)
+            wall = time.perf_counter() - started
+        self.report(results, wall)
+
+    def load(self, path, limit):
+        entries, skipped = [], 0
+        with open(path, encoding="utf-8") as fh:
+            for line in fh:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    skipped += 1
+                    continue
+                if not isinstance(record, dict) or not str(record.get("path", "")).startswith("/"):
+                    skipped += 1
+                    continue
+                record["method"] = str(record.get("method", "GET")).upper()
+                record["_ts"] = parse_timestamp(record.get("ts", record.get("timestamp")))
+                entries.append(record)
+                if limit and len(entries) >= limit:
+                    break
+        return entries, skipped
+
+    def schedule(self, entries, rate, speed):
+        """Start offsets (seconds from replay start) for each entry."""
+        if rate:
+            return [i / rate for i in range(len(entries))]
+        stamps = [entry["_ts"] for entry in entries]
+        if any(ts is None for ts in stamps):
+            self.stdout.write("Capture has no usable timestamps; replaying as fast as possible.")
+            return [0.0] * len(entries)
+        first = min(stamps)
+        return [(ts - first) / speed for ts in stamps]
+
+    def send(self, entry):
+        if self.base_url:
+            return self.send_http(entry)
+        return self.send_in_process(entry)
+
+    def send_in_process(self, entry):
+        # Django's test client is not thread-safe: one client per worker and user
+        clients = getattr(self._local, "clients", None)
+        if clients is None:
+            clients = self._local.clients = {}
+        username = entry.get("user")
+        client = clients.get(username)
+        if client is None:
+            client = clients[username] = Client()
+            if username:
+                user = User.objects.filter(username=username).first()
+                if user is not None:
+                    client.force_login(user)
+        method = getattr(client, entry["method"].lower())
+        response = method(entry["path"], entry.get("data") or {})
+        if response.streaming:
+            for _ in response.streaming_content:
+                pass
+        return response.status_code
+
+    def send_http(self, entry):
+        # Captured POSTs will be rejected by CSRF protection over HTTP
+        url = urllib.parse.urljoin(self.base_url, entry["path"])
+        data = None
+        if entry["method"] != "GET" and entry.get("data"):
+            data = urllib.parse.urlencode(entry["data"]).encode()
+        request = urllib.request.Request(url, data=data, method=entry["method"])
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                response.read()
+                return response.status
+        except urllib.error.HTTPError as exc:
+            return exc.code
+
+    def report(self, results, wall):
+        total = sum(len(rows) for rows in results.values())
+        self.stdout.write(
+            f"{total} requests in {wall:.2f}s ({total / wall if wall else 0:.1f} req/s)\n"
+        )
+        self.stdout.write(
+            f"{'url name':<24}{'count':>7}{'req/s':>8}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'4xx':>6}{'errors':>8}"
+        )
+        for name in sorted(results, key=lambda n: -len(results[n])):
+            rows = results[name]
+            stats = summarize([elapsed for elapsed, _ in rows])
+            client_errors = sum(1 for _, status in rows if status is not None and 400 <= status < 500)
+            errors = sum(1 for _, status in rows if status is None or status >= 500)
+            self.stdout.write(
+                f"{name:<24}{len(rows):>7}{len(rows) / wall if wall else 0:>8.1f}"
+                f"{stats['p50_ms']:>9.2f}{stats['p95_ms']:>9.2f}{stats['p99_ms']:>9.2f}"
+                f"{client_errors:>6}{errors:>8}"
+            )
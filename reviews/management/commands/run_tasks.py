@@ -0,0 +1,86 @@
+import multiprocessing
+import signal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+# reviews.tasks is imported inside functions: worker processes are spawned
+# fresh and import this module before Django is set up.
+
+
+def _worker_process(stop, burst, limit, poll):
+    import django
+
+    signal.signal(signal.SIGINT, signal.SIG_IGN)  # the parent asks us to stop via ``stop``
+    django.setup()
+    from reviews import tasks
+
+    tasks.work(burst=burst, limit=limit, poll=poll, should_stop=stop.is_set)
+
+
+class Command(BaseCommand):
+    help = (
+        "Run background task workers: claim queued jobs, run them with retries and "
+        "coalescing, until interrupted (or until the queue is empty with --burst)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--processes", type=int, default=2, help="Worker processes (1 runs in this process).")
+        parser.add_argument("--burst", action="store_true", help="Exit once no job is ready.")
+        parser.add_argument("--batch-size", type=int, default=None, help="Jobs claimed at a time per worker.")
+        parser.add_argument("--poll", type=float, default=1.0, help="Seconds to sleep when the queue is empty.")
+        parser.add_argument("--stats", action="store_true", help="Print job counts by status and task, then exit.")
+
+    def handle(self, *args, **options):
+        from reviews import tasks
+
+        if options["stats"]:
+            counts = tasks.stats()
+            if not counts:
+                self.stdout.write("No jobs.")
+            for status, names in counts.items():
+                for name, count in names.items():
+                    self.stdout.write(f"{status:<8}{name:<28}{count:>8}")
+            return
+        if options["processes"] < 1:
+            raise CommandError("--processes must be at least 1.")
+        limit = options["batch_size"] or tasks.TASKS_BATCH_SIZE
+        if options["processes"] == 1:
+            try:
+                processed = tasks.work(burst=options["burst"], limit=limit, poll=options["poll"])
+            except KeyboardInterrupt:
+                return
+            self.stdout.write(self.style.SUCCESS(f"Processed {processed} job(s)."))
+            return
+
+        # Spawned (not forked) children each open their own database connections
+        connections.close_all()
+        context = multiprocessing.get_context("spawn")
+        stop = context.Event()
+        workers = [
+            context.Process(
+                target=_worker_process, args=(stop, options["burst"], limit, options["poll"]),
+                name=f"task-worker-{n}",
+            )
+            for n in range(options["processes"])
+        ]
+        for worker in workers:
+            worker.start()
+        self.stdout.write(f"Started {len(workers)} worker process(es).")
+
+        def request_stop(signum, frame):
+            stop.set()
+
+        signal.signal(signal.SIGTERM, request_stop)
+        try:
+            for worker in workers:
+                worker.join()
+        except KeyboardInterrupt:
+            self.stdout.write("Stopping workers after their current jobs...")
+            stop.set()
+            for worker in workers:
+                worker.join()
+        failed = [worker.name for worker in workers if worker.exitcode]
+        if failed:
+            raise CommandError(f"Worker(s) exited with an error: {', '.join(failed)}")
+        self.stdout.write(self.style.SUCCESS("Workers stopped."))
@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+MODES = ("delete", "wal", "truncate", "persist")
+
+
+class Command(BaseCommand):
+    help = (
+        "Show or set the journal mode stored in the primary SQLite file. It persists across "
+        "connections, so run it once (e.g. 'delete' after using the sqlite-wal profile)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("mode", nargs="?", choices=MODES, help="New journal mode (default: show it).")
+
+    def handle(self, *args, **options):
+        connection = connections[DEFAULT_DB_ALIAS]
+        if connection.vendor != "sqlite":
+            raise CommandError("sqlite_journal only applies to SQLite databases.")
+        with connection.cursor() as cursor:
+            if options["mode"]:
+                cursor.execute(f"PRAGMA journal_mode = {options['mode'].upper()}")
+            else:
+                cursor.execute("PRAGMA journal_mode")
+            mode = cursor.fetchone()[0]
+        if options["mode"] and mode.lower() != options["mode"]:
+            raise CommandError(f"SQLite kept journal mode {mode!r} (is another connection open?).")
+        self.stdout.write(f"journal_mode = {mode}")
@@ -0,0 +1,49 @@
+# Generated by Django 4.0.5 on 2026-10-18 17:02
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def backfill_feeds(apps, schema_editor):
+    """Populate inboxes from the existing follow graph."""
+    User = apps.get_model('users', 'User')
+    Review = apps.get_model('reviews', 'Review')
+    FeedEntry = apps.get_model('reviews', 'FeedEntry')
+    Follow = User.following.through
+    for edge in Follow.objects.all().iterator():
+        reviews = Review.objects.filter(user_id=edge.to_user_id).order_by('-created')[:200]
+        FeedEntry.objects.bulk_create(
+            [FeedEntry(owner_id=edge.from_user_id, review_id=r.id, created=r.created) for r in reviews],
+            ignore_conflicts=True,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('reviews', '0002_initial'),
+        ('users', '0002_alter_user_following'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FeedEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created', models.DateTimeField()),
+                ('owner', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='feed_entries', to=settings.AUTH_USER_MODEL)),
+                ('review', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='reviews.review')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='feedentry',
+            index=models.Index(fields=['owner', '-created', '-review'], name='feed_owner_created_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='feedentry',
+            constraint=models.UniqueConstraint(fields=('owner', 'review'), name='unique_feed_entry'),
+        ),
+        migrations.RunPython(backfill_feeds, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,70 @@
+# Creates the full-text search_index table used by reviews.search and fills it.
+# Self-contained on purpose: the row layout and document fields are frozen here
+# as they were at this migration, so later changes to reviews.search can't
+# change what it does.
+
+from django.db import migrations
+
+SQLITE_DDL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS search_index USING fts5("
+    "kind, title, body, tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')",
+]
+POSTGRES_DDL = [
+    "CREATE TABLE IF NOT EXISTS search_index ("
+    "kind varchar(16) NOT NULL, object_id bigint NOT NULL, document tsvector NOT NULL, "
+    "PRIMARY KEY (kind, object_id))",
+    "CREATE INDEX IF NOT EXISTS search_index_document_idx ON search_index USING GIN (document)",
+]
+SQLITE_INSERT = (
+    "INSERT OR REPLACE INTO search_index(rowid, kind, title, body) VALUES (%s, %s, %s, %s)"
+)
+POSTGRES_INSERT = (
+    "INSERT INTO search_index (kind, object_id, document) VALUES (%s, %s, "
+    "setweight(to_tsvector('simple', %s), 'A') || setweight(to_tsvector('simple', %s), 'B')) "
+    "ON CONFLICT (kind, object_id) DO UPDATE SET document = EXCLUDED.document"
+)
+# kind: (app label, model, title fields, body fields, SQLite rowid code)
+DOCUMENTS = {
+    'book': ('reviews', 'Book', ('title',), ('description',), 1),
+    'user': ('users', 'User', ('username', 'first_name', 'last_name'), (), 2),
+    'review': ('reviews', 'Review', ('headline',), ('body',), 3),
+}
+
+
+def _text(obj, fields):
+    return " ".join(str(getattr(obj, f) or "") for f in fields)
+
+
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor not in ('sqlite', 'postgresql'):
+        return
+    with schema_editor.connection.cursor() as cursor:
+        for statement in SQLITE_DDL if vendor == 'sqlite' else POSTGRES_DDL:
+            cursor.execute(statement)
+        for kind, (app_label, model_name, title_fields, body_fields, code) in DOCUMENTS.items():
+            model = apps.get_model(app_label, model_name)
+            for obj in model.objects.all().iterator():
+                title, body = _text(obj, title_fields), _text(obj, body_fields)
+                if vendor == 'sqlite':
+                    cursor.execute(SQLITE_INSERT, [obj.pk * 4 + code, kind, title, body])
+                else:
+                    cursor.execute(POSTGRES_INSERT, [kind, obj.pk, title, body])
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor in ('sqlite', 'postgresql'):
+        with schema_editor.connection.cursor() as cursor:
+            cursor.execute("DROP TABLE IF EXISTS search_index")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0003_feedentry'),
+        ('users', '0002_alter_user_following'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
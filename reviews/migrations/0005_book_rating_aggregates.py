@@ -0,0 +1,68 @@
+# Generated by Django 4.0.5 on 2026-10-18 17:05
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def populate_aggregates(apps, schema_editor):
+    Book = apps.get_model('reviews', 'Book')
+    Review = apps.get_model('reviews', 'Review')
+    rows = Review.objects.values('book_id', 'rating').annotate(n=Count('id')).order_by()
+    for row in rows:
+        n, rating = row['n'], row['rating']
+        Book.objects.filter(pk=row['book_id']).update(
+            review_count=models.F('review_count') + n,
+            rating_sum=models.F('rating_sum') + n * rating,
+            **{f'rating_{rating}': models.F(f'rating_{rating}') + n},
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0004_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='book',
+            name='rating_0',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='book',
+            name='rating_1',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='book',
+            name='rating_2',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='book',
+            name='rating_3',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='book',
+            name='rating_4',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='book',
+            name='rating_5',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='book',
+            name='rating_sum',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='book',
+            name='review_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(populate_aggregates, migrations.RunPython.noop),
+    ]
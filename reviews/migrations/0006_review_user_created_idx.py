@@ -0,0 +1,17 @@
+# Generated by Django 4.0.5 on 2026-10-18 17:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0005_book_rating_aggregates'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(fields=['user', 'created'], name='review_user_created_idx'),
+        ),
+    ]
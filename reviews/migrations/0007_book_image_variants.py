@@ -0,0 +1,18 @@
+# Generated by Django 4.0.5 on 2026-10-18 17:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0006_review_user_created_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='book',
+            name='image_variants',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 4.0.5 on 2026-10-18 17:18
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('reviews', '0007_book_image_variants'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='book',
+            name='recommendations_stale',
+            field=models.BooleanField(db_index=True, default=True, editable=False),
+        ),
+        migrations.CreateModel(
+            name='UserRecommendation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('score', models.FloatField()),
+                ('rank', models.PositiveSmallIntegerField()),
+                ('book', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='reviews.book')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='recommendations', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='BookSimilarity',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('score', models.FloatField()),
+                ('rank', models.PositiveSmallIntegerField()),
+                ('book', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='similarities', to='reviews.book')),
+                ('neighbor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='reviews.book')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='userrecommendation',
+            constraint=models.UniqueConstraint(fields=('user', 'rank'), name='unique_user_recommendation_rank'),
+        ),
+        migrations.AddConstraint(
+            model_name='booksimilarity',
+            constraint=models.UniqueConstraint(fields=('book', 'rank'), name='unique_book_similarity_rank'),
+        ),
+    ]
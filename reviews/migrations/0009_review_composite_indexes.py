@@ -0,0 +1,38 @@
+# Generated by Django 4.0.5 on 2026-10-18 17:24
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('reviews', '0008_recommendations'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='review',
+            name='book',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to='reviews.book'),
+        ),
+        migrations.AlterField(
+            model_name='review',
+            name='user',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(fields=['book', '-created'], name='review_book_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(fields=['-created'], name='review_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(fields=['-rating', '-created'], name='review_rating_created_idx'),
+        ),
+    ]
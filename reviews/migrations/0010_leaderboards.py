@@ -0,0 +1,66 @@
+# Generated by Django 4.0.5 on 2026-10-18 17:26
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Sum
+from django.utils import timezone
+
+
+def populate_leaderboards(apps, schema_editor):
+    Book = apps.get_model('reviews', 'Book')
+    User = apps.get_model('users', 'User')
+    Leaderboard = apps.get_model('reviews', 'Leaderboard')
+    LeaderboardEntry = apps.get_model('reviews', 'LeaderboardEntry')
+    weight = getattr(settings, 'LEADERBOARD_PRIOR_WEIGHT', 10)
+    totals = Book.objects.aggregate(reviews=Sum('review_count'), ratings=Sum('rating_sum'))
+    mean = totals['ratings'] / totals['reviews'] if totals['reviews'] else 0.0
+    entries = []
+    for pk, n, total in Book.objects.filter(review_count__gt=0).values_list('pk', 'review_count', 'rating_sum'):
+        entries.append(LeaderboardEntry(board='top_rated_books', object_id=pk, score=(weight * mean + total) / (weight + n)))
+        entries.append(LeaderboardEntry(board='most_reviewed_books', object_id=pk, score=float(n)))
+    for pk, n in User.objects.filter(review_count__gt=0).values_list('pk', 'review_count'):
+        entries.append(LeaderboardEntry(board='most_active_reviewers', object_id=pk, score=float(n)))
+    LeaderboardEntry.objects.bulk_create(entries, batch_size=5000)
+    now = timezone.now()
+    Leaderboard.objects.bulk_create([
+        Leaderboard(name='top_rated_books', prior_mean=mean, refreshed=now),
+        Leaderboard(name='most_reviewed_books', refreshed=now),
+        Leaderboard(name='most_active_reviewers', refreshed=now),
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0009_review_composite_indexes'),
+        ('users', '0003_user_counters'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Leaderboard',
+            fields=[
+                ('name', models.CharField(max_length=40, primary_key=True, serialize=False)),
+                ('prior_mean', models.FloatField(default=0)),
+                ('refreshed', models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='LeaderboardEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('board', models.CharField(max_length=40)),
+                ('object_id', models.PositiveBigIntegerField()),
+                ('score', models.FloatField()),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='leaderboardentry',
+            index=models.Index(fields=['board', '-score', '-object_id'], name='leaderboard_rank_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='leaderboardentry',
+            constraint=models.UniqueConstraint(fields=('board', 'object_id'), name='unique_leaderboard_entry'),
+        ),
+        migrations.RunPython(populate_leaderboards, migrations.RunPython.noop),
+    ]
@@ -14,12 +14,39 @@ class Book(models.Model):
         blank=False,
     )
     image = models.ImageField(verbose_name="Book cover", null=True, blank=True)
+    # Resized/WebP cover files produced by reviews.images
+    image_variants = models.JSONField(default=dict, blank=True, editable=False)
     description = models.TextField(blank=True)
     created = models.DateTimeField(auto_now_add=True)
 
+    # Rating aggregates maintained by reviews.ratings (see rebuild_book_ratings)
+    review_count = models.PositiveIntegerField(default=0)
+    rating_sum = models.PositiveIntegerField(default=0)
+    rating_0 = models.PositiveIntegerField(default=0)
+    rating_1 = models.PositiveIntegerField(default=0)
+    rating_2 = models.PositiveIntegerField(default=0)
+    rating_3 = models.PositiveIntegerField(default=0)
+    rating_4 = models.PositiveIntegerField(default=0)
+    rating_5 = models.PositiveIntegerField(default=0)
+
+    # Set when the book's reviews change; cleared by build_recommendations
+    recommendations_stale = models.BooleanField(default=True, db_index=True, editable=False)
+
     def __str__(self):
         return f"{Truncator(self.title).chars(30)}"
 
+    @property
+    def avg_rating(self):
+        """Average review rating, or None when the book has no reviews."""
+        if not self.review_count:
+            return None
+        return self.rating_sum / self.review_count
+
+    @property
+    def rating_histogram(self):
+        """Review counts per rating, index 0..5."""
+        return [getattr(self, f"rating_{n}") for n in range(6)]
+
     def __repr__(self):
         return f"<Book {self.id}>"
 
@@ -32,13 +59,172 @@ class Review(models.Model):
     rating = models.PositiveSmallIntegerField(
         validators=[validators.MinValueValidator(0), validators.MaxValueValidator(5)]
     )
-    book = models.ForeignKey("reviews.Book", on_delete=models.CASCADE)
-    user = models.ForeignKey("users.User", on_delete=models.CASCADE)
+    # The composite indexes below lead with these columns, so the FKs need no index of their own
+    book = models.ForeignKey("reviews.Book", on_delete=models.CASCADE, db_index=False)
+    user = models.ForeignKey("users.User", on_delete=models.CASCADE, db_index=False)
     created = models.DateTimeField(auto_now_add=True)
     updated = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        # Hot queries are checked against these in reviews/tests.py (QueryPlanTests)
+        indexes = [
+            # Profile pages: keyset pages of one user's reviews, newest first
+            models.Index(fields=["user", "created"], name="review_user_created_idx"),
+            # Book page: one book's reviews, newest first
+            models.Index(fields=["book", "-created"], name="review_book_created_idx"),
+            # Recent window on the home page
+            models.Index(fields=["-created"], name="review_created_idx"),
+            # Top-rated window (recent_reviews page)
+            models.Index(fields=["-rating", "-created"], name="review_rating_created_idx"),
+        ]
+
     def __str__(self):
         return f"{Truncator(self.headline).chars(30)} (by {self.user.full_name})"
 
     def __repr__(self):
         return f"<Review {self.id}>"
+
+
+class FeedEntry(models.Model):
+    """Fan-out-on-write inbox row: one per (follower, review).
+
+    ``created`` is copied from the review so a user's feed can be read with a
+    single range scan over ``(owner, created, review)``.
+    """
+
+    owner = models.ForeignKey(
+        "users.User", on_delete=models.CASCADE, related_name="feed_entries"
+    )
+    review = models.ForeignKey("reviews.Review", on_delete=models.CASCADE)
+    created = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["owner", "review"], name="unique_feed_entry"),
+        ]
+        indexes = [
+            models.Index(fields=["owner", "-created", "-review"], name="feed_owner_created_idx"),
+        ]
+
+    def __repr__(self):
+        return f"<FeedEntry {self.owner_id}:{self.review_id}>"
+
+
+class BookSimilarity(models.Model):
+    """Precomputed "readers who liked this also liked" neighbour of a book.
+
+    Rows are written by ``build_recommendations``; ``rank`` 0 is the most
+    similar neighbour, so a book's list is one range scan over ``(book, rank)``.
+    """
+
+    book = models.ForeignKey(
+        "reviews.Book", on_delete=models.CASCADE, related_name="similarities"
+    )
+    neighbor = models.ForeignKey(
+        "reviews.Book", on_delete=models.CASCADE, related_name="+"
+    )
+    score = models.FloatField()
+    rank = models.PositiveSmallIntegerField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["book", "rank"], name="unique_book_similarity_rank"),
+        ]
+
+    def __repr__(self):
+        return f"<BookSimilarity {self.book_id}->{self.neighbor_id}>"
+
+
+class UserRecommendation(models.Model):
+    """Precomputed "recommended for you" book, ordered by ``rank``."""
+
+    user = models.ForeignKey(
+        "users.User", on_delete=models.CASCADE, related_name="recommendations"
+    )
+    book = models.ForeignKey("reviews.Book", on_delete=models.CASCADE, related_name="+")
+    score = models.FloatField()
+    rank = models.PositiveSmallIntegerField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["user", "rank"], name="unique_user_recommendation_rank"),
+        ]
+
+    def __repr__(self):
+        return f"<UserRecommendation {self.user_id}->{self.book_id}>"
+
+
+class Leaderboard(models.Model):
+    """One materialized ranking; ``prior_mean`` is the Bayesian prior in use."""
+
+    name = models.CharField(max_length=40, primary_key=True)
+    prior_mean = models.FloatField(default=0)
+    refreshed = models.DateTimeField(null=True, blank=True)
+
+    def __repr__(self):
+        return f"<Leaderboard {self.name}>"
+
+
+class LeaderboardEntry(models.Model):
+    """Score of one book or user on a leaderboard (see reviews.leaderboards).
+
+    Pages are read newest-score-first with a keyset cursor over
+    ``(board, -score, -object_id)``, so any page costs the same.
+    """
+
+    board = models.CharField(max_length=40)
+    object_id = models.PositiveBigIntegerField()
+    score = models.FloatField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["board", "object_id"], name="unique_leaderboard_entry"),
+        ]
+        indexes = [
+            models.Index(fields=["board", "-score", "-object_id"], name="leaderboard_rank_idx"),
+        ]
+
+    def __repr__(self):
+        return f"<LeaderboardEntry {self.board}:{self.object_id}>"
+
+
+class Job(models.Model):
+    """A queued background task (see reviews.tasks).
+
+    ``key`` is an optional idempotency key: while a job with the same name
+    and key is still queued, enqueueing it again is a no-op. Finished jobs
+    are deleted; failed ones stay for inspection.
+    """
+
+    QUEUED = "queued"
+    RUNNING = "running"
+    FAILED = "failed"
+    STATUS_CHOICES = [(QUEUED, "Queued"), (RUNNING, "Running"), (FAILED, "Failed")]
+
+    name = models.CharField(max_length=100)
+    payload = models.JSONField(default=dict, blank=True)
+    key = models.CharField(max_length=200, null=True, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=QUEUED)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    run_after = models.DateTimeField()
+    # Set while a worker holds the job; expired locks are requeued
+    claimed_by = models.CharField(max_length=64, blank=True)
+    locked_until = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    created = models.DateTimeField(auto_now_add=True)
+    updated = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["name", "key"],
+                condition=models.Q(status="queued"),
+                name="unique_queued_job_key",
+            ),
+        ]
+        indexes = [
+            models.Index(fields=["status", "run_after"], name="job_ready_idx"),
+        ]
+
+    def __repr__(self):
+        return f"<Job {self.id} {self.name} {self.status}>"
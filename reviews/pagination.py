@@ -0,0 +1,64 @@
+"""Keyset (cursor) pagination over ``(created, id)``.
+
+A cursor is ``"<microseconds since epoch>.<id>"`` for the last row of the
+previous page. Reading the next page is then a bounded range scan on an index
+that starts with the same columns, regardless of how deep the reader pages.
+"""
+
+from datetime import datetime, timedelta, timezone
+
+from django.db.models import Q
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+# Both cursor parts are bound as 64-bit integers by the database
+_INT64_MIN, _INT64_MAX = -2 ** 63, 2 ** 63 - 1
+
+
+def encode_cursor(created, pk):
+    """Return an opaque cursor string for a ``(created, pk)`` pair."""
+    micros = (created - _EPOCH) // timedelta(microseconds=1)
+    return f"{micros}.{pk}"
+
+
+def decode_cursor(value):
+    """Parse a cursor string; return ``(created, pk)`` or None if malformed."""
+    if not value:
+        return None
+    try:
+        micros, pk = (int(part) for part in value.split(".", 1))
+        if not (_INT64_MIN <= micros <= _INT64_MAX and _INT64_MIN <= pk <= _INT64_MAX):
+            return None
+        return _EPOCH + timedelta(microseconds=micros), pk
+    except (TypeError, ValueError, OverflowError):
+        return None
+
+
+def keyset_page(queryset, before, page_size, created_field="created", id_field="id"):
+    """Return ``(rows, next_cursor)`` for the page strictly older than ``before``.
+
+    Rows are ordered newest first. ``next_cursor`` is None on the last page.
+    Fetches one extra row to know whether another page exists.
+    """
+    cursor = decode_cursor(before)
+    if cursor is not None:
+        created, pk = cursor
+        queryset = queryset.filter(
+            Q(**{f"{created_field}__lt": created}) |
+            Q(**{created_field: created, f"{id_field}__lt": pk})
+        )
+    rows = list(queryset.order_by(f"-{created_field}", f"-{id_field}")[:page_size + 1])
+    next_cursor = None
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        last = rows[-1]
+        next_cursor = encode_cursor(
+            _resolve(last, created_field), _resolve(last, id_field)
+        )
+    return rows, next_cursor
+
+
+def _resolve(obj, path):
+    # Supports "review_id" style attnames as well as plain field names
+    for part in path.split("__"):
+        obj = getattr(obj, part)
+    return obj
@@ -0,0 +1,57 @@
+"""Incremental maintenance of the rating aggregates stored on ``Book``.
+
+Every review insert, rating change or delete applies a +1/-1 delta with
+``F()`` expressions, so concurrent writers never lose updates and readers
+get the average and histogram without touching the review table. Results
+are clamped at 0, so stale aggregates (a raw fixture load, a bulk delete)
+can't fail a later review delete; rebuild_book_ratings repairs them.
+"""
+
+from django.db.models import Count, F
+from django.db.models.functions import Greatest
+
+from .models import Book, Review
+
+RATING_FIELDS = [f"rating_{n}" for n in range(6)]
+
+
+def apply_delta(book_id, rating, sign):
+    """Add (sign=1) or remove (sign=-1) one review of ``rating`` on a book."""
+    Book.objects.filter(pk=book_id).update(
+        review_count=Greatest(F("review_count") + sign, 0),
+        rating_sum=Greatest(F("rating_sum") + sign * rating, 0),
+        **{f"rating_{rating}": Greatest(F(f"rating_{rating}") + sign, 0)},
+    )
+
+
+def snapshot(review):
+    """Return the stored ``(book_id, rating)`` of a review before it is saved."""
+    if review.pk is None:
+        return None
+    return Review.objects.filter(pk=review.pk).values_list("book_id", "rating").first()
+
+
+def review_saved(review, previous):
+    """Apply the delta between ``previous`` (from ``snapshot``) and ``review``."""
+    current = (review.book_id, review.rating)
+    if previous == current:
+        return
+    if previous is not None:
+        apply_delta(previous[0], previous[1], -1)
+    apply_delta(review.book_id, review.rating, 1)
+
+
+def review_deleted(review):
+    apply_delta(review.book_id, review.rating, -1)
+
+
+def computed_aggregates():
+    """Recompute aggregates from the review table: {book_id: {field: value}}."""
+    result = {}
+    rows = Review.objects.values("book_id", "rating").annotate(n=Count("id")).order_by()
+    for row in rows:
+        values = result.setdefault(row["book_id"], dict.fromkeys(["review_count", "rating_sum"] + RATING_FIELDS, 0))
+        values["review_count"] += row["n"]
+        values["rating_sum"] += row["n"] * row["rating"]
+        values[f"rating_{row['rating']}"] += row["n"]
+    return result
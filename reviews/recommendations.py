@@ -0,0 +1,242 @@
+"""Item-item book recommendations computed from the review matrix.
+
+``build_recommendations`` loads every review into a sparse user × book
+matrix of ratings centred on the scale midpoint (so a 1 and a 5 from the same
+reader push two books apart), computes shrunk cosine similarity between book
+columns with SciPy, and stores:
+
+- the top ``RECOMMENDATION_NEIGHBORS`` neighbours per book (``BookSimilarity``),
+  shown as "readers who liked this also liked" on the book page;
+- the top ``RECOMMENDATION_COUNT`` unreviewed books per reader
+  (``UserRecommendation``), scored by their ratings weighted by similarity.
+
+Pages only read those tables; nothing is computed at request time.
+
+Review writes flag their book with ``Book.recommendations_stale``. An
+incremental run recomputes the neighbour lists of the stale books plus every
+book that shares a reader with them or had one as a neighbour (only those
+similarities can have changed), and the recommendations of the stale books'
+readers. Deleted reviewers' lists and other long-tail effects are refreshed
+by the next full run.
+"""
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from scipy import sparse
+
+from .models import Book, BookSimilarity, Review, UserRecommendation
+
+RECOMMENDATION_NEIGHBORS = getattr(settings, "RECOMMENDATION_NEIGHBORS", 20)
+RECOMMENDATION_COUNT = getattr(settings, "RECOMMENDATION_COUNT", 20)
+# Minimum number of shared readers before two books count as similar
+RECOMMENDATION_MIN_SUPPORT = getattr(settings, "RECOMMENDATION_MIN_SUPPORT", 2)
+# Similarity is scaled by support / (support + shrinkage) to damp tiny overlaps
+RECOMMENDATION_SHRINKAGE = getattr(settings, "RECOMMENDATION_SHRINKAGE", 10)
+MIDPOINT = 2.5
+_CHUNK = 512
+_WRITE_BATCH = 5000
+
+
+def mark_stale(book_ids):
+    """Flag books whose reviews changed for the next incremental run."""
+    book_ids = [book_id for book_id in book_ids if book_id is not None]
+    if book_ids:
+        Book.objects.filter(pk__in=book_ids).update(recommendations_stale=True)
+
+
+class RatingMatrix:
+    """Centred ratings as a CSC matrix plus the id <-> index mappings."""
+
+    def __init__(self, user_ids, book_ids, centred):
+        self.user_ids = user_ids
+        self.book_ids = book_ids
+        self.centred = centred.tocsc()
+        self.binary = self.centred.copy()
+        self.binary.data = np.ones_like(self.binary.data)
+        self.norms = np.sqrt(np.asarray(self.centred.multiply(self.centred).sum(axis=0)).ravel())
+        self.book_index = {book_id: i for i, book_id in enumerate(book_ids.tolist())}
+
+    @classmethod
+    def load(cls):
+        rows = Review.objects.order_by().values_list("user_id", "book_id", "rating")
+        data = np.array(list(rows.iterator(chunk_size=10000)), dtype=np.int64).reshape(-1, 3)
+        user_ids, user_idx = np.unique(data[:, 0], return_inverse=True)
+        book_ids, book_idx = np.unique(data[:, 1], return_inverse=True)
+        shape = (len(user_ids), len(book_ids))
+        # A reader with several reviews of one book counts once, at their mean rating
+        totals = sparse.coo_matrix((data[:, 2] - MIDPOINT, (user_idx, book_idx)), shape=shape).tocsr()
+        counts = sparse.coo_matrix((np.ones(len(data)), (user_idx, book_idx)), shape=shape).tocsr()
+        totals.sum_duplicates()
+        counts.sum_duplicates()
+        centred = totals.copy()
+        centred.data = totals.data / counts.data
+        return cls(user_ids, book_ids, centred)
+
+    def indices(self, book_ids):
+        return np.array(sorted(self.book_index[b] for b in book_ids if b in self.book_index), dtype=np.int64)
+
+    def similarity_rows(self, columns):
+        """Sparse (len(columns) × books) matrix of shrunk cosine similarities."""
+        dots = (self.centred[:, columns].T @ self.centred).tocoo()
+        support = (self.binary[:, columns].T @ self.binary).tocsr()
+        shared = np.asarray(support[dots.row, dots.col]).ravel()
+        denom = self.norms[columns][dots.row] * self.norms[dots.col]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            score = np.where(denom > 0, dots.data / denom, 0.0)
+        score *= shared / (shared + RECOMMENDATION_SHRINKAGE)
+        keep = (
+            (score > 0)
+            & (shared >= RECOMMENDATION_MIN_SUPPORT)
+            & (columns[dots.row] != dots.col)
+        )
+        return sparse.csr_matrix(
+            (score[keep], (dots.row[keep], dots.col[keep])),
+            shape=(len(columns), len(self.book_ids)),
+        )
+
+    def co_rated(self, columns):
+        """Book indices sharing at least one reader with ``columns``."""
+        readers = np.unique(self.binary[:, columns].tocoo().row)
+        return np.unique(self.binary.tocsr()[readers].indices)
+
+    def readers(self, columns):
+        return np.unique(self.binary[:, columns].tocoo().row)
+
+
+def _top_k(row_matrix, k):
+    """Yield (row, [(col, score), ...]) best first, for each row of a CSR matrix."""
+    for row in range(row_matrix.shape[0]):
+        start, end = row_matrix.indptr[row], row_matrix.indptr[row + 1]
+        cols = row_matrix.indices[start:end]
+        scores = row_matrix.data[start:end]
+        if len(scores) > k:
+            best = np.argpartition(-scores, k)[:k]
+            cols, scores = cols[best], scores[best]
+        order = np.lexsort((cols, -scores))
+        yield row, list(zip(cols[order].tolist(), scores[order].tolist()))
+
+
+def compute_neighbours(matrix, columns):
+    """Return {book_id: [(neighbor_id, score), ...]} for book ``columns``."""
+    result = {}
+    for start in range(0, len(columns), _CHUNK):
+        chunk = columns[start:start + _CHUNK]
+        for row, best in _top_k(matrix.similarity_rows(chunk), RECOMMENDATION_NEIGHBORS):
+            result[int(matrix.book_ids[chunk[row]])] = [
+                (int(matrix.book_ids[col]), score) for col, score in best
+            ]
+    return result
+
+
+def compute_user_recommendations(matrix, user_rows, neighbours):
+    """Return {user_id: [(book_id, score), ...]} for matrix rows ``user_rows``.
+
+    ``neighbours`` must cover every book those users reviewed.
+    """
+    n_books = len(matrix.book_ids)
+    rows, cols, vals = [], [], []
+    for book_id, items in neighbours.items():
+        i = matrix.book_index.get(book_id)
+        if i is None:
+            continue
+        for neighbor_id, score in items:
+            j = matrix.book_index.get(neighbor_id)
+            if j is not None:
+                rows.append(i)
+                cols.append(j)
+                vals.append(score)
+    similar = sparse.csr_matrix((vals, (rows, cols)), shape=(n_books, n_books))
+    by_user = matrix.centred.tocsr()
+    result = {}
+    for start in range(0, len(user_rows), _CHUNK):
+        chunk = user_rows[start:start + _CHUNK]
+        ratings = by_user[chunk]
+        scores = (ratings @ similar).tocsr()
+        # Drop books the reader already reviewed and anything not positive
+        reviewed = ratings.copy()
+        reviewed.data = np.ones_like(reviewed.data)
+        scores = (scores - scores.multiply(reviewed)).tocsr()
+        scores.data[scores.data < 0] = 0
+        scores.eliminate_zeros()
+        for row, best in _top_k(scores, RECOMMENDATION_COUNT):
+            result[int(matrix.user_ids[chunk[row]])] = [
+                (int(matrix.book_ids[col]), score) for col, score in best
+            ]
+    return result
+
+
+def _stored_neighbours(book_ids):
+    result = {}
+    rows = BookSimilarity.objects.filter(book_id__in=book_ids).order_by("book_id", "rank")
+    for book_id, neighbor_id, score in rows.values_list("book_id", "neighbor_id", "score").iterator():
+        result.setdefault(book_id, []).append((neighbor_id, score))
+    return result
+
+
+def _write(model, owner_field, target_field, results):
+    owners = list(results)
+    for start in range(0, len(owners), _WRITE_BATCH):
+        batch = owners[start:start + _WRITE_BATCH]
+        objs = [
+            model(**{f"{owner_field}_id": owner, f"{target_field}_id": target, "score": score, "rank": rank})
+            for owner in batch
+            for rank, (target, score) in enumerate(results[owner])
+        ]
+        with transaction.atomic():
+            model.objects.filter(**{f"{owner_field}_id__in": batch}).delete()
+            model.objects.bulk_create(objs, batch_size=1000)
+
+
+def build(incremental=False):
+    """Recompute similarities and recommendations; return a stats dict."""
+    if incremental:
+        stale = list(Book.objects.filter(recommendations_stale=True).values_list("pk", flat=True))
+    else:
+        stale = None
+    # Clear the flags first so reviews written during the run mark books again
+    flagged = Book.objects.filter(recommendations_stale=True)
+    if stale is not None:
+        flagged = flagged.filter(pk__in=stale)
+    cleared = list(flagged.values_list("pk", flat=True))
+    flagged.update(recommendations_stale=False)
+    try:
+        return _build(stale)
+    except BaseException:
+        mark_stale(cleared)
+        raise
+
+
+def _build(stale):
+    matrix = RatingMatrix.load()
+    if stale is None:
+        columns = np.arange(len(matrix.book_ids))
+        neighbours = compute_neighbours(matrix, columns)
+        # Books and readers without reviews any more keep no lists
+        BookSimilarity.objects.filter(book__review_count=0).delete()
+        UserRecommendation.objects.filter(user__review_count=0).delete()
+        _write(BookSimilarity, "book", "neighbor", neighbours)
+        user_rows = np.arange(len(matrix.user_ids))
+        recommendations = compute_user_recommendations(matrix, user_rows, neighbours)
+    else:
+        if not stale:
+            return {"books": 0, "users": 0}
+        stale_columns = matrix.indices(stale)
+        previous_owners = set(
+            BookSimilarity.objects.filter(neighbor_id__in=stale).values_list("book_id", flat=True)
+        )
+        affected = np.union1d(
+            matrix.co_rated(stale_columns) if len(stale_columns) else np.array([], dtype=np.int64),
+            matrix.indices(previous_owners),
+        ).astype(np.int64)
+        neighbours = compute_neighbours(matrix, affected)
+        # Stale books that lost all their reviews drop out of the matrix
+        gone = (set(stale) | previous_owners) - set(neighbours)
+        BookSimilarity.objects.filter(book_id__in=gone).delete()
+        _write(BookSimilarity, "book", "neighbor", neighbours)
+        user_rows = matrix.readers(stale_columns) if len(stale_columns) else np.array([], dtype=np.int64)
+        reviewed = np.unique(matrix.binary.tocsr()[user_rows].indices) if len(user_rows) else []
+        lookup = _stored_neighbours(matrix.book_ids[reviewed].tolist())
+        recommendations = compute_user_recommendations(matrix, user_rows, lookup)
+    _write(UserRecommendation, "user", "book", recommendations)
+    return {"books": len(neighbours), "users": len(recommendations)}
@@ -0,0 +1,199 @@
+"""Full-text search over books, users and reviews.
+
+Documents live in a ``search_index`` table created by migration
+``0004_search_index``:
+
+- SQLite: an FTS5 virtual table. The rowid encodes ``(kind, object id)`` so
+  updates and deletes are primary-key operations, and results are ranked
+  with ``bm25`` (title weighted over body).
+- PostgreSQL: a regular table with a GIN-indexed ``tsvector`` column, ranked
+  with ``ts_rank``.
+- Any other engine falls back to ``icontains`` filters through the ORM.
+
+The index is kept in sync by the save/delete receivers in ``reviews.signals``
+(saves are reindexed by the coalescing ``search.index`` task, deletes inline);
+``manage.py rebuild_search_index`` repopulates it from scratch.
+"""
+
+import re
+
+from django.apps import apps
+from django.conf import settings
+from django.db import connection, connections
+from django.db.models import Q
+
+from . import tasks
+
+SEARCH_PAGE_SIZE = getattr(settings, "SEARCH_PAGE_SIZE", 20)
+# Deeper pages are empty; also keeps the OFFSET within a 64-bit integer
+SEARCH_MAX_PAGE = getattr(settings, "SEARCH_MAX_PAGE", 500)
+
+# Fields that make up each document: (title fields, body fields)
+DOCUMENT_FIELDS = {
+    "book": (("title",), ("description",)),
+    "user": (("username", "first_name", "last_name"), ()),
+    "review": (("headline",), ("body",)),
+}
+_KIND_CODES = {"book": 1, "user": 2, "review": 3}
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def kind_for(instance):
+    """Return the document kind for a model instance (or None if not indexed)."""
+    return instance._meta.model_name if instance._meta.model_name in DOCUMENT_FIELDS else None
+
+
+def document_for(kind, instance):
+    """Return the ``(title, body)`` text indexed for ``instance``."""
+    title_fields, body_fields = DOCUMENT_FIELDS[kind]
+    title = " ".join(str(getattr(instance, f) or "") for f in title_fields)
+    body = " ".join(str(getattr(instance, f) or "") for f in body_fields)
+    return title, body
+
+
+def _tokens(query):
+    return _TOKEN_RE.findall(query.lower())
+
+
+class SQLiteBackend:
+    """FTS5 virtual table; rowid = object_id * 4 + kind code."""
+
+    def index(self, cursor, kind, pk, title, body):
+        cursor.execute(
+            "INSERT OR REPLACE INTO search_index(rowid, kind, title, body) VALUES (%s, %s, %s, %s)",
+            [pk * 4 + _KIND_CODES[kind], kind, title, body],
+        )
+
+    def remove(self, cursor, kind, pk):
+        cursor.execute("DELETE FROM search_index WHERE rowid = %s", [pk * 4 + _KIND_CODES[kind]])
+
+    def clear(self, cursor):
+        cursor.execute("DELETE FROM search_index")
+
+    def search_ids(self, cursor, kind, query, limit, offset, exclude_pk=None):
+        # Prefix-match every token so results update while the user types
+        terms = " ".join(f'"{token}"*' for token in _tokens(query))
+        if not terms:
+            return []
+        sql = "SELECT rowid FROM search_index WHERE search_index MATCH %s"
+        params = [f'kind:{kind} AND {{title body}}: ({terms})']
+        if exclude_pk is not None:
+            sql += " AND rowid != %s"
+            params.append(exclude_pk * 4 + _KIND_CODES[kind])
+        sql += " ORDER BY bm25(search_index, 0.0, 10.0, 1.0) LIMIT %s OFFSET %s"
+        cursor.execute(sql, params + [limit, offset])
+        return [rowid // 4 for (rowid,) in cursor.fetchall()]
+
+
+class PostgresBackend:
+    """Weighted tsvector per document with a GIN index."""
+
+    _VECTOR = "setweight(to_tsvector('simple', %s), 'A') || setweight(to_tsvector('simple', %s), 'B')"
+
+    def index(self, cursor, kind, pk, title, body):
+        cursor.execute(
+            "INSERT INTO search_index (kind, object_id, document) VALUES (%s, %s, " + self._VECTOR + ") "
+            "ON CONFLICT (kind, object_id) DO UPDATE SET document = EXCLUDED.document",
+            [kind, pk, title, body],
+        )
+
+    def remove(self, cursor, kind, pk):
+        cursor.execute("DELETE FROM search_index WHERE kind = %s AND object_id = %s", [kind, pk])
+
+    def clear(self, cursor):
+        cursor.execute("TRUNCATE search_index")
+
+    def search_ids(self, cursor, kind, query, limit, offset, exclude_pk=None):
+        terms = " & ".join(f"{token}:*" for token in _tokens(query))
+        if not terms:
+            return []
+        sql = (
+            "SELECT object_id FROM search_index, to_tsquery('simple', %s) q "
+            "WHERE kind = %s AND document @@ q"
+        )
+        params = [terms, kind]
+        if exclude_pk is not None:
+            sql += " AND object_id <> %s"
+            params.append(exclude_pk)
+        sql += " ORDER BY ts_rank(document, q) DESC, object_id LIMIT %s OFFSET %s"
+        cursor.execute(sql, params + [limit, offset])
+        return [pk for (pk,) in cursor.fetchall()]
+
+
+_BACKENDS = {"sqlite": SQLiteBackend, "postgresql": PostgresBackend}
+
+
+def get_backend(conn=connection):
+    """Return the index backend for ``conn`` or None when only LIKE is available."""
+    backend = _BACKENDS.get(conn.vendor)
+    return backend() if backend else None
+
+
+def index_instance(instance, using="default"):
+    """Insert or refresh the search document for ``instance``."""
+    backend = get_backend(connections[using])
+    kind = kind_for(instance)
+    if backend is None or kind is None:
+        return
+    title, body = document_for(kind, instance)
+    with connections[using].cursor() as cursor:
+        backend.index(cursor, kind, instance.pk, title, body)
+
+
+@tasks.task("search.index", batch=True)
+def index_task(payloads):
+    """Reindex the objects named by ``payloads`` ({"model", "id"}), one query per model."""
+    ids_by_model = {}
+    for payload in payloads:
+        ids_by_model.setdefault(payload["model"], set()).add(payload["id"])
+    for label, ids in ids_by_model.items():
+        # Deleted objects were already removed from the index
+        for instance in apps.get_model(label).objects.filter(pk__in=ids):
+            index_instance(instance)
+
+
+def remove_instance(instance, using="default"):
+    """Drop the search document for ``instance``."""
+    backend = get_backend(connections[using])
+    kind = kind_for(instance)
+    if backend is None or kind is None:
+        return
+    with connections[using].cursor() as cursor:
+        backend.remove(cursor, kind, instance.pk)
+
+
+def ranked(queryset, query, page=1, page_size=SEARCH_PAGE_SIZE, exclude_pk=None):
+    """Return ``(objects, has_next)`` for one page of ranked matches.
+
+    ``queryset`` selects the model (and any select_related/annotations to
+    apply to the page); only the page's rows are loaded from it. Pages past
+    ``SEARCH_MAX_PAGE`` are empty.
+    """
+    if page > SEARCH_MAX_PAGE:
+        return [], False
+    kind = queryset.model._meta.model_name
+    offset = (max(page, 1) - 1) * page_size
+    conn = connections[queryset.db]
+    backend = get_backend(conn)
+    if backend is None:
+        objects, has_next = _like_page(queryset, kind, query, offset, page_size, exclude_pk)
+    else:
+        with conn.cursor() as cursor:
+            ids = backend.search_ids(cursor, kind, query, page_size + 1, offset, exclude_pk)
+        has_next = len(ids) > page_size
+        ids = ids[:page_size]
+        by_id = queryset.in_bulk(ids)
+        objects = [by_id[pk] for pk in ids if pk in by_id]
+    return objects, has_next and page < SEARCH_MAX_PAGE
+
+
+def _like_page(queryset, kind, query, offset, page_size, exclude_pk):
+    title_fields, body_fields = DOCUMENT_FIELDS[kind]
+    condition = Q()
+    for field in title_fields + body_fields:
+        condition |= Q(**{f"{field}__icontains": query})
+    queryset = queryset.filter(condition)
+    if exclude_pk is not None:
+        queryset = queryset.exclude(pk=exclude_pk)
+    rows = list(queryset.order_by(title_fields[0], "pk")[offset:offset + page_size + 1])
+    return rows[:page_size], len(rows) > page_size
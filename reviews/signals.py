@@ -0,0 +1,150 @@
+"""Signal receivers that keep derived review data in sync.
+
+Connected in ``ReviewsConfig.ready``. Cheap bookkeeping (aggregates, cache
+invalidation, index deletes) runs inline; feed fan-out, search indexing,
+leaderboard rescoring and cover processing are queued as background tasks
+(``reviews.tasks``).
+"""
+
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from users.models import User
+
+from . import feed, images, leaderboards, ratings, recommendations, search, tasks, windows
+from .models import Book, FeedEntry, Review
+
+
+@receiver(post_save, sender=Review, dispatch_uid="reviews_feed_fan_out")
+def fan_out_new_review(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        tasks.enqueue("feed.fan_out", {"review_id": instance.pk}, key=f"review:{instance.pk}")
+
+
+@receiver(post_save, sender=Review, dispatch_uid="reviews_windows_saved")
+@receiver(post_delete, sender=Review, dispatch_uid="reviews_windows_deleted")
+def invalidate_review_windows(sender, **kwargs):
+    windows.invalidate()
+
+
+@receiver(pre_save, sender=Review, dispatch_uid="reviews_ratings_snapshot")
+def snapshot_rating(sender, instance, raw=False, **kwargs):
+    if not raw:
+        instance._rating_previous = ratings.snapshot(instance)
+
+
+@receiver(post_save, sender=Review, dispatch_uid="reviews_ratings_saved")
+def update_book_ratings(sender, instance, raw=False, **kwargs):
+    # Fixtures are loaded raw; run rebuild_book_ratings afterwards
+    if not raw:
+        ratings.review_saved(instance, getattr(instance, "_rating_previous", None))
+
+
+@receiver(post_delete, sender=Review, dispatch_uid="reviews_ratings_deleted")
+def remove_book_rating(sender, instance, **kwargs):
+    ratings.review_deleted(instance)
+
+
+@receiver(post_save, sender=Review, dispatch_uid="reviews_recommendations_saved")
+def flag_recommendations_saved(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    previous = getattr(instance, "_rating_previous", None)
+    if previous != (instance.book_id, instance.rating):
+        recommendations.mark_stale({instance.book_id, previous[0] if previous else None})
+
+
+@receiver(post_delete, sender=Review, dispatch_uid="reviews_recommendations_deleted")
+def flag_recommendations_deleted(sender, instance, **kwargs):
+    recommendations.mark_stale([instance.book_id])
+
+
+@receiver(post_save, sender=Review, dispatch_uid="reviews_leaderboards_saved")
+def rescore_leaderboards_saved(sender, instance, created, raw=False, **kwargs):
+    # Runs after the rating aggregates and users' review counters were updated
+    if raw:
+        return
+    previous = getattr(instance, "_rating_previous", None)
+    if created or previous != (instance.book_id, instance.rating):
+        book_ids = sorted({instance.book_id, previous[0] if previous else instance.book_id})
+        tasks.enqueue("leaderboards.rescore", {"book_ids": book_ids, "user_ids": [instance.user_id]})
+
+
+@receiver(post_delete, sender=Review, dispatch_uid="reviews_leaderboards_deleted")
+def rescore_leaderboards_deleted(sender, instance, **kwargs):
+    tasks.enqueue("leaderboards.rescore", {"book_ids": [instance.book_id], "user_ids": [instance.user_id]})
+
+
+@receiver(post_delete, sender=Book, dispatch_uid="reviews_leaderboards_book_deleted")
+def drop_book_from_leaderboards(sender, instance, **kwargs):
+    leaderboards.forget([leaderboards.TOP_RATED_BOOKS, leaderboards.MOST_REVIEWED_BOOKS], instance.pk)
+
+
+@receiver(post_delete, sender=User, dispatch_uid="reviews_leaderboards_user_deleted")
+def drop_user_from_leaderboards(sender, instance, **kwargs):
+    leaderboards.forget([leaderboards.MOST_ACTIVE_REVIEWERS], instance.pk)
+
+
+@receiver(m2m_changed, sender=User.following.through, dispatch_uid="reviews_feed_follow")
+def sync_feed_on_follow(sender, instance, action, reverse, pk_set, **kwargs):
+    """Backfill or prune inboxes when follow edges change.
+
+    ``reverse`` is True when the change was made through ``user.followers``,
+    in which case ``instance`` is the followee and ``pk_set`` the followers.
+    """
+    if action == "post_add":
+        if reverse:
+            for owner_id in pk_set:
+                tasks.enqueue("feed.backfill", {"owner_id": owner_id, "followee_ids": [instance.pk]})
+        else:
+            tasks.enqueue("feed.backfill", {"owner_id": instance.pk, "followee_ids": sorted(pk_set)})
+    elif action == "post_remove":
+        if reverse:
+            for owner_id in pk_set:
+                feed.remove(owner_id, [instance.pk])
+        else:
+            feed.remove(instance.pk, pk_set)
+    elif action == "pre_clear":
+        if reverse:
+            FeedEntry.objects.filter(review__user=instance).delete()
+        else:
+            FeedEntry.objects.filter(owner=instance).delete()
+
+
+@receiver(post_save, sender=Book, dispatch_uid="reviews_search_index_book")
+@receiver(post_save, sender=Review, dispatch_uid="reviews_search_index_review")
+@receiver(post_save, sender=User, dispatch_uid="reviews_search_index_user")
+def update_search_index(sender, instance, update_fields=None, **kwargs):
+    # Logins only touch last_login; nothing searchable changed
+    if update_fields and set(update_fields) <= {"last_login", "password"}:
+        return
+    label = instance._meta.label_lower
+    tasks.enqueue("search.index", {"model": label, "id": instance.pk}, key=f"{label}:{instance.pk}")
+
+
+@receiver(post_delete, sender=Book, dispatch_uid="reviews_search_remove_book")
+@receiver(post_delete, sender=Review, dispatch_uid="reviews_search_remove_review")
+@receiver(post_delete, sender=User, dispatch_uid="reviews_search_remove_user")
+def remove_from_search_index(sender, instance, using="default", **kwargs):
+    search.remove_instance(instance, using=using)
+
+
+@receiver(post_save, sender=Book, dispatch_uid="reviews_windows_book")
+def invalidate_book_windows(sender, instance, created, raw=False, **kwargs):
+    # Windows hold reviews with their book; cached cards are keyed on the book fields they show
+    if not created and not raw:
+        windows.invalidate()
+
+
+@receiver(post_save, sender=User, dispatch_uid="reviews_windows_user")
+def invalidate_user_windows(sender, instance, created, raw=False, update_fields=None, **kwargs):
+    # Windows hold reviews with their author, whose username the cards show
+    if created or raw or (update_fields and "username" not in update_fields):
+        return
+    windows.invalidate()
+
+
+@receiver(post_save, sender=Book, dispatch_uid="reviews_cover_variants")
+def process_cover_image(sender, instance, raw=False, **kwargs):
+    if not raw and images.needs_processing(instance):
+        images.schedule(instance)
@@ -0,0 +1,96 @@
+"""Star-bar strings from precomputed lookup tables.
+
+A bar has ``2 * max_stars + 1`` possible shapes (every half step from 0 to
+``max_stars``), so each ``(max_stars, glyph set)`` gets a tuple of all of
+them, built once; rendering a rating is then a clamp, a round and an index.
+Whole-number ratings with the default glyphs (every review card) skip even
+that and index the default table directly.
+
+``annotate_stars`` fills a whole page of reviews or books in one pass, so
+templates can print ``{{ review.stars }}`` instead of calling the tag per
+row.
+"""
+
+from functools import lru_cache
+
+FILLED_STAR = "★"
+HALF_STAR = "½"
+EMPTY_STAR = "☆"
+DEFAULT_MAX_STARS = 5
+
+
+@lru_cache(maxsize=64)
+def star_table(max_stars=DEFAULT_MAX_STARS, filled_star=FILLED_STAR, half_star=HALF_STAR, empty_star=EMPTY_STAR):
+    """Every bar for ``max_stars``, indexed by the rating in half steps."""
+    table = []
+    for halves in range(2 * max_stars + 1):
+        full, has_half = divmod(halves, 2)
+        empty = max_stars - full - has_half
+        table.append(filled_star * full + (half_star if has_half else "") + empty_star * empty)
+    return tuple(table)
+
+
+_DEFAULT_TABLE = star_table()
+# Whole-number ratings 0..5 with the default glyphs
+_WHOLE = {rating: _DEFAULT_TABLE[2 * rating] for rating in range(DEFAULT_MAX_STARS + 1)}
+
+
+def _half_steps(rating, max_stars):
+    if type(rating) is int and 0 <= rating <= max_stars:
+        return 2 * rating
+    try:
+        value = float(rating)
+    except (TypeError, ValueError):
+        return 0
+    if not value > 0:  # negative or NaN
+        return 0
+    if value > max_stars:
+        return 2 * max_stars
+    # Nearest half step; ties round to even like the original arithmetic
+    return round(value * 2)
+
+
+def stars(rating, max_stars=DEFAULT_MAX_STARS, filled_star=FILLED_STAR, half_star=HALF_STAR, empty_star=EMPTY_STAR):
+    """Star bar for ``rating`` (clamped to 0..max_stars, nearest half step)."""
+    if (
+        type(rating) is int
+        and max_stars == DEFAULT_MAX_STARS
+        and filled_star == FILLED_STAR and half_star == HALF_STAR and empty_star == EMPTY_STAR
+    ):
+        bar = _WHOLE.get(rating)
+        if bar is not None:
+            return bar
+    table = star_table(max_stars, filled_star, half_star, empty_star)
+    return table[_half_steps(rating, max_stars)]
+
+
+def annotate_stars(objects, source="rating", target="stars", max_stars=DEFAULT_MAX_STARS,
+                   filled_star=FILLED_STAR, half_star=HALF_STAR, empty_star=EMPTY_STAR):
+    """Set ``obj.<target>`` to the star bar of ``obj.<source>`` for every object.
+
+    Evaluates ``objects`` once (a queryset page, list of reviews or books)
+    and returns the objects as a list.
+    """
+    objects = list(objects)
+    table = star_table(max_stars, filled_star, half_star, empty_star)
+    for obj in objects:
+        setattr(obj, target, table[_half_steps(getattr(obj, source), max_stars)])
+    return objects
+
+
+def arithmetic_stars(rating, max_stars=DEFAULT_MAX_STARS, filled_star=FILLED_STAR, half_star=HALF_STAR,
+                     empty_star=EMPTY_STAR):
+    """The original per-call arithmetic: the reference the tables are tested and benchmarked against."""
+    try:
+        value = float(rating)
+    except (TypeError, ValueError):
+        value = 0.0
+    if value < 0:
+        value = 0.0
+    if value > max_stars:
+        value = float(max_stars)
+    halves = round(value * 2) / 2.0
+    full = int(halves)
+    has_half = 1 if (halves - full) == 0.5 else 0
+    empty = max_stars - full - has_half
+    return (filled_star * full) + (half_star if has_half else "") + (empty_star * empty)
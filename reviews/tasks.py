@@ -0,0 +1,230 @@
+"""Database-backed background tasks for post-write side effects.
+
+Write paths call ``enqueue`` (usually from a signal receiver), which inserts
+a ``Job`` row inside the current transaction, so a job exists exactly when
+the write it belongs to commits. ``manage.py run_tasks`` runs worker
+processes that claim ready jobs, run them and delete them.
+
+- Idempotency: ``enqueue(..., key=...)`` is a no-op while a job with the
+  same name and key is still queued (a partial unique index backs this).
+- Coalescing: tasks registered with ``batch=True`` receive the payloads of
+  every claimed job of that name in one call, so a burst of "reindex this"
+  or "rescore that" jobs becomes one pass.
+- Retries: a failing job is requeued with exponential backoff
+  (``TASKS_RETRY_DELAY`` seconds, doubled per attempt) until
+  ``TASKS_MAX_ATTEMPTS``, then kept with status ``failed``. Losing a
+  database lock race to another worker requeues the job immediately
+  without using up an attempt. Jobs whose worker died are requeued once
+  their lock expires.
+
+With ``TASKS_EAGER`` (the default when ``DEBUG`` is on) jobs run inline
+instead, so development and tests need no worker. Failures are logged.
+
+Handlers are registered with the ``task`` decorator in the modules that own
+the work (``reviews.feed``, ``reviews.search``, ...); they are imported by
+``reviews.signals`` at startup.
+"""
+
+import logging
+import time
+import traceback
+import uuid
+from collections import namedtuple
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import DatabaseError, IntegrityError, OperationalError, transaction
+from django.db.models import Count, F
+from django.utils import timezone
+
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+TASKS_MAX_ATTEMPTS = getattr(settings, "TASKS_MAX_ATTEMPTS", 5)
+TASKS_RETRY_DELAY = getattr(settings, "TASKS_RETRY_DELAY", 10)
+TASKS_BATCH_SIZE = getattr(settings, "TASKS_BATCH_SIZE", 100)
+# How long a claimed job may run before another worker takes it over
+TASKS_LOCK_SECONDS = getattr(settings, "TASKS_LOCK_SECONDS", 300)
+
+Task = namedtuple("Task", "name func batch max_attempts")
+
+_registry = {}
+
+
+def task(name, batch=False, max_attempts=None):
+    """Register ``func(payload)`` (or ``func(payloads)`` with ``batch``) as ``name``."""
+    def decorator(func):
+        _registry[name] = Task(name, func, batch, max_attempts or TASKS_MAX_ATTEMPTS)
+        return func
+    return decorator
+
+
+def registered():
+    return dict(_registry)
+
+
+def enqueue(name, payload=None, key=None, delay=0):
+    """Queue task ``name``; return the new Job, or None if merged or run eagerly."""
+    if name not in _registry:
+        raise ValueError(f"Unknown task {name!r}")
+    payload = payload or {}
+    if getattr(settings, "TASKS_EAGER", False):
+        _run_eager(_registry[name], payload)
+        return None
+    job = Job(name=name, payload=payload, key=key, run_after=timezone.now() + timedelta(seconds=delay))
+    if key is None:
+        job.save()
+        return job
+    if Job.objects.filter(name=name, key=key, status=Job.QUEUED).exists():
+        return None
+    try:
+        with transaction.atomic():
+            job.save()
+    except IntegrityError:  # queued concurrently
+        return None
+    return job
+
+
+def _run_eager(task_, payload):
+    try:
+        with transaction.atomic():
+            task_.func([payload] if task_.batch else payload)
+    except Exception:
+        logger.exception("Task %s failed", task_.name)
+
+
+# Worker side
+
+def requeue_stale():
+    """Put jobs whose worker's lock expired back in the queue."""
+    stale = Job.objects.filter(status=Job.RUNNING, locked_until__lt=timezone.now())
+    for job in stale:
+        try:
+            with transaction.atomic():
+                Job.objects.filter(pk=job.pk, claimed_by=job.claimed_by).update(
+                    status=Job.QUEUED, claimed_by="", locked_until=None,
+                )
+        except IntegrityError:  # the same key was queued again meanwhile
+            Job.objects.filter(pk=job.pk).delete()
+
+
+def claim(limit=TASKS_BATCH_SIZE):
+    """Mark up to ``limit`` ready jobs as running for this caller; return them."""
+    now = timezone.now()
+    ids = list(
+        Job.objects.filter(status=Job.QUEUED, run_after__lte=now)
+        .order_by("run_after", "id")
+        .values_list("id", flat=True)[:limit]
+    )
+    if not ids:
+        return []
+    token = uuid.uuid4().hex
+    # The status guard makes a concurrent claim of the same rows a no-op
+    Job.objects.filter(pk__in=ids, status=Job.QUEUED).update(
+        status=Job.RUNNING, claimed_by=token, attempts=F("attempts") + 1,
+        locked_until=now + timedelta(seconds=TASKS_LOCK_SECONDS), updated=now,
+    )
+    return list(Job.objects.filter(pk__in=ids, claimed_by=token, status=Job.RUNNING).order_by("id"))
+
+
+def run_jobs(jobs):
+    """Run claimed ``jobs``, coalescing batch tasks; return how many succeeded."""
+    groups = {}
+    for job in jobs:
+        groups.setdefault(job.name, []).append(job)
+    succeeded = 0
+    for name, group in groups.items():
+        task_ = _registry.get(name)
+        if task_ is None:
+            _failed(group, f"Unknown task {name!r}", final=True)
+            continue
+        calls = [group] if task_.batch else [[job] for job in group]
+        for call in calls:
+            payloads = [job.payload for job in call]
+            try:
+                with transaction.atomic():
+                    task_.func(payloads if task_.batch else payloads[0])
+            except Exception as exc:
+                if _is_contention(exc):
+                    # Lost a lock race with another writer; not the job's fault
+                    logger.warning("Task %s hit lock contention; requeueing: %s", name, exc)
+                    _contended(call)
+                    continue
+                logger.exception("Task %s failed (jobs %s)", name, [job.pk for job in call])
+                _failed(call, traceback.format_exc(), final=False, max_attempts=task_.max_attempts)
+            else:
+                Job.objects.filter(pk__in=[job.pk for job in call]).delete()
+                succeeded += len(call)
+    return succeeded
+
+
+def _is_contention(exc):
+    if not isinstance(exc, OperationalError):
+        return False
+    message = str(exc).lower()
+    return "locked" in message or "deadlock" in message or "could not serialize" in message
+
+
+def _contended(jobs):
+    # Requeue right away without spending an attempt
+    for job in jobs:
+        try:
+            with transaction.atomic():
+                Job.objects.filter(pk=job.pk).update(
+                    status=Job.QUEUED, claimed_by="", locked_until=None, attempts=F("attempts") - 1,
+                )
+        except IntegrityError:
+            Job.objects.filter(pk=job.pk).delete()
+
+
+def _failed(jobs, error, final, max_attempts=TASKS_MAX_ATTEMPTS):
+    now = timezone.now()
+    for job in jobs:
+        if final or job.attempts >= max_attempts:
+            Job.objects.filter(pk=job.pk).update(
+                status=Job.FAILED, claimed_by="", locked_until=None, last_error=error, updated=now,
+            )
+            continue
+        delay = TASKS_RETRY_DELAY * 2 ** (job.attempts - 1)
+        try:
+            with transaction.atomic():
+                Job.objects.filter(pk=job.pk).update(
+                    status=Job.QUEUED, claimed_by="", locked_until=None, last_error=error,
+                    run_after=now + timedelta(seconds=delay), updated=now,
+                )
+        except IntegrityError:  # a fresh job with the same key is already queued
+            Job.objects.filter(pk=job.pk).delete()
+
+
+def work(burst=False, limit=TASKS_BATCH_SIZE, poll=1.0, should_stop=None):
+    """Claim and run jobs until stopped (or the queue is empty with ``burst``).
+
+    Returns the number of jobs that succeeded.
+    """
+    processed = 0
+    while not (should_stop and should_stop()):
+        try:
+            requeue_stale()
+            jobs = claim(limit)
+            if jobs:
+                processed += run_jobs(jobs)
+        except DatabaseError:
+            # e.g. SQLite "database is locked" while recording results; jobs
+            # left running are requeued when their lock expires
+            logger.warning("Queue bookkeeping failed; retrying", exc_info=True)
+            time.sleep(poll)
+            continue
+        if not jobs:
+            if burst:
+                break
+            time.sleep(poll)
+    return processed
+
+
+def stats():
+    """Job counts as {status: {name: count}}."""
+    counts = {}
+    for row in Job.objects.values("status", "name").annotate(n=Count("id")).order_by("status", "name"):
+        counts.setdefault(row["status"], {})[row["name"]] = row["n"]
+    return counts
@@ -1,5 +1,11 @@
 from django import template
+from django.core.files.storage import default_storage
+from django.utils.html import format_html
 import re
+
+from reviews import fragments, stars
+from reviews.images import VARIANTS
+
 register = template.Library()
 
 @register.simple_tag
@@ -18,23 +24,45 @@ def render_stars(rating, max_stars=5, filled_star='★', half_star='½', empty_s
       filled_star (str): Glyph for a full star.
       half_star (str): Glyph for a half star (text fallback). Swap for a custom span if desired.
       empty_star (str): Glyph for an empty star.
+
+    Bars come from the lookup tables in ``reviews.stars``; for whole pages
+    prefer ``stars.annotate_stars`` in the view.
+    """
+    return stars.stars(rating, max_stars, filled_star, half_star, empty_star)
+
+@register.simple_tag
+def review_cards(reviews):
+    """Render feed cards for ``reviews``, reusing cached fragments.
+
+    See ``reviews.fragments``; cards are keyed on the review, book and author
+    fields they show.
+    """
+    return fragments.render_cards(reviews)
+
+@register.simple_tag
+def cover_img(book, variant="card", css_class="", alt="{title}", sizes=None):
+    """Render a book cover, preferring the processed WebP/JPEG variants.
+
+    ``variant`` picks the JPEG fallback size ("thumb", "card" or "large");
+    the WebP ``srcset`` lists every width so the browser can pick by
+    ``sizes`` (defaults to the variant's width). ``alt`` may use {title}.
+    Falls back to the original upload until the variants have been built.
     """
-    try:
-        value = float(rating)
-    except (TypeError, ValueError):
-        value = 0.0
-    if value < 0:
-        value = 0.0
-    if value > max_stars:
-        value = float(max_stars)
-
-    # Round to nearest half step
-    halves = round(value * 2) / 2.0  # e.g. 4.26 -> 4.5, 4.74 -> 4.5 (Python bankers rounding is fine here)
-    full = int(halves)
-    has_half = 1 if (halves - full) == 0.5 else 0
-    empty = max_stars - full - has_half
-
-    return (filled_star * full) + (half_star if has_half else '') + (empty_star * empty)
+    alt_text = alt.format(title=book.title)
+    variants = book.image_variants or {}
+    if variants.get("source") != getattr(book.image, "name", None) or variant not in variants:
+        return format_html('<img src="{}" class="{}" alt="{}" loading="lazy" />', book.image.url, css_class, alt_text)
+    width, height = VARIANTS[variant]
+    srcset = ", ".join(
+        f"{default_storage.url(variants[name]['webp'])} {VARIANTS[name][0]}w"
+        for name in VARIANTS if name in variants
+    )
+    return format_html(
+        '<picture class="cover-picture"><source type="image/webp" srcset="{}" sizes="{}" />'
+        '<img src="{}" class="{}" alt="{}" width="{}" height="{}" loading="lazy" /></picture>',
+        srcset, sizes or f"{width}px", default_storage.url(variants[variant]["jpeg"]),
+        css_class, alt_text, width, height,
+    )
 
 # Simple heuristic regex to detect any HTML-like tag
 _TAG_RE = re.compile(r'<[^>]+>')
@@ -1,91 +1,154 @@
 """Views for search, home feeds, and CRUD in the reviews app.
 """
 
+from django.conf import settings
 from django.contrib.auth.decorators import login_required
-from django.db.models import Avg, Count, Q
+from django.db import transaction
+from django.http import Http404
 from django.shortcuts import get_object_or_404, redirect, render
 
 from users.models import User
+from reviews import conditional
+from reviews import feed as feed_service
+from reviews import leaderboards
+from reviews import search as search_index
+from reviews import stars
+from reviews import windows
 from reviews.forms import BookForm, ReviewForm
-from .models import Book, Review
+from .models import Book, BookSimilarity, Review, UserRecommendation
+
+SIMILAR_BOOKS_SHOWN = getattr(settings, "SIMILAR_BOOKS_SHOWN", 6)
 
 def search(request):
-    """Search users and books by query string.
+    """Search users, books and reviews by query string.
+
+    Matches come from the full-text index in ``reviews.search``, ranked by
+    relevance and paginated with ?page=N (one page size for all sections).
 
-    - Users: excludes current user when authenticated, annotated with
-      review/follow counts.
-    - Books: annotated with average rating and review count.
+    - Users: excludes current user when authenticated; review/follow
+      counts are the counters stored on User.
+    - Books: average rating and review count come from the aggregates
+      stored on Book (no join).
+    - Reviews: headline/body matches, linked to their book.
     """
     query = request.GET.get('q', '').strip()
-    users = books = None
+    try:
+        page = max(int(request.GET.get('page', 1)), 1)
+    except ValueError:
+        page = 1
+    users = books = reviews = None
+    has_next = False
     if query:
         if request.user.is_authenticated:
-            users = (
-                User.objects.filter(
-                    Q(first_name__icontains=query) |
-                    Q(last_name__icontains=query) |
-                    Q(username__icontains=query)
-                )
-                .exclude(pk=request.user.pk)
-                .annotate(
-                    review_count=Count('review', distinct=True),
-                    followers_count=Count('followers', distinct=True),
-                    following_count=Count('following', distinct=True),
-                )  # aggregated counts
-                .order_by('username')
+            users, more_users = search_index.ranked(
+                User.objects.all(), query, page=page, exclude_pk=request.user.pk,
             )
-        books = (
-            Book.objects.filter(title__icontains=query)
-            .annotate(
-                avg_rating=Avg('review__rating'),
-                review_count=Count('review', distinct=True),
-            )
-            .order_by('title')
+            has_next = has_next or more_users
+        books, more_books = search_index.ranked(Book.objects.all(), query, page=page)
+        reviews, more_reviews = search_index.ranked(
+            Review.objects.select_related('book', 'user'), query, page=page,
         )
-    context = {'users': users, 'books': books, 'query': query}
+        has_next = has_next or more_books or more_reviews
+        books = stars.annotate_stars(books, source='avg_rating')
+        reviews = stars.annotate_stars(reviews)
+    context = {
+        'users': users,
+        'books': books,
+        'reviews': reviews,
+        'query': query,
+        'page': page,
+        'has_next': has_next,
+    }
     return render(request, 'reviews/search.html', context)
 
 def home(request):
     """Render the home feed.
 
     feed can be 'following' or 'recent'; default to following for
-    signed-in users, recent for guests.
+    signed-in users, recent for guests. The following feed is read from
+    the user's fan-out inbox one keyset page at a time; the recent feed is
+    the shared cached window from ``reviews.windows``.
     """
     feed = request.GET.get('feed')
     context = {}
     if request.user.is_authenticated:
         if feed not in ('following', 'recent'):
             feed = 'following'
-        following_users = request.user.following.all()
-        following_reviews = (
-            Review.objects.filter(Q(user__in=following_users))
-            .select_related('book', 'user')
-            .order_by('-created')
-        )
-        recent_reviews = (
-            Review.objects.select_related('book', 'user').order_by('-created')[:10]
-        )
+        if feed == 'following':
+            # Precomputed inbox, paged by (created, id) keyset via ?before=<cursor>
+            following_reviews, next_cursor = feed_service.following_page(
+                request.user, request.GET.get('before')
+            )
+            context['following_reviews'] = following_reviews
+            context['next_cursor'] = next_cursor
+        else:
+            context['recent_reviews'] = windows.recent_reviews()
         context['feed'] = feed
-        context['following_reviews'] = following_reviews
-        context['recent_reviews'] = recent_reviews
     else:
         # guests always see recent reviews
-        recent_reviews = Review.objects.select_related('book', 'user').order_by('-created')[:10]
         context['feed'] = 'recent'
-        context['recent_reviews'] = recent_reviews
+        context['recent_reviews'] = windows.recent_reviews()
     return render(request, "reviews/home.html", context)
 
 @login_required
 def recent_reviews(request):
     """Show top-rated reviews for logged-in users (legacy page)."""
-    reviews = Review.objects.select_related('book', 'user').order_by('-rating', '-created')[:10]
-    return render(request, "reviews/recent_reviews.html", {"reviews": reviews})
+    return render(request, "reviews/recent_reviews.html", {"reviews": windows.top_rated_reviews()})
 
+def leaderboard(request, board=leaderboards.TOP_RATED_BOOKS):
+    """One page of a materialized leaderboard (?after=<cursor> for the next).
+
+    Entries are maintained by reviews.leaderboards; a page is one indexed
+    range read plus one lookup for the listed books or users.
+    """
+    if board not in leaderboards.BOARDS:
+        raise Http404("Unknown leaderboard")
+    rows, next_cursor = leaderboards.page(board, request.GET.get('after'))
+    if leaderboards.BOARDS[board]["model"] is Book:
+        stars.annotate_stars([obj for _, obj, _ in rows], source='avg_rating')
+    context = {
+        "board": board,
+        "boards": leaderboards.BOARDS,
+        "title": leaderboards.BOARDS[board]["title"],
+        "is_book_board": leaderboards.BOARDS[board]["model"] is Book,
+        "rows": rows,
+        "next_cursor": next_cursor,
+    }
+    return render(request, "reviews/leaderboard.html", context)
+
+@conditional.book_page
 def book_detail(request, book_id):
-    """Display book detail and its reviews."""
+    """Display book detail and its reviews.
+
+    Answers 304 when the book, its reviews and the viewer are unchanged
+    (see reviews.conditional).
+    """
     book = get_object_or_404(Book, id=book_id)
-    reviews = book.review_set.select_related('user').all()
-    return render(request, "reviews/book.html", context={"book": book, "reviews": reviews})
+    reviews = book.review_set.select_related('user').order_by('-created')
+    # Precomputed by build_recommendations; one indexed range read
+    similar = BookSimilarity.objects.filter(book=book).select_related('neighbor').order_by('rank')
+    context = {
+        "book": book,
+        "reviews": stars.annotate_stars(reviews),
+        "similar_books": stars.annotate_stars(
+            [row.neighbor for row in similar[:SIMILAR_BOOKS_SHOWN]], source='avg_rating',
+        ),
+    }
+    return render(request, "reviews/book.html", context=context)
+
+@login_required
+def recommended(request):
+    """Books recommended for the signed-in user from readers with similar taste.
+
+    Lists are precomputed by the build_recommendations command.
+    """
+    rows = (
+        UserRecommendation.objects.filter(user=request.user)
+        .select_related('book')
+        .order_by('rank')
+    )
+    books = stars.annotate_stars([row.book for row in rows], source='avg_rating')
+    return render(request, "reviews/recommended.html", {"books": books})
 
 @login_required
 def book_create(request):
@@ -109,7 +172,8 @@ def review_create(request, book_id):
             review = form.save(commit=False)
             review.book = book
             review.user = request.user
-            review.save()
+            with transaction.atomic():  # review + book aggregates together
+                review.save()
             return redirect("book_detail", book_id=book.id)
     else:
         form = ReviewForm()
@@ -123,7 +187,8 @@ def review_edit(request, book_id, review_id):
     if request.method == "POST":
         form = ReviewForm(request.POST, instance=review)
         if form.is_valid():
-            form.save()
+            with transaction.atomic():
+                form.save()
             return redirect("book_detail", book_id=book.id)
     else:
         form = ReviewForm(instance=review)
@@ -138,7 +203,8 @@ def review_delete(request, book_id, review_id):
     book = get_object_or_404(Book, id=book_id)
     review = get_object_or_404(Review, id=review_id, user=request.user, book=book)
     if request.method == "POST":
-        review.delete()
+        with transaction.atomic():
+            review.delete()
         return redirect("book_detail", book_id=book.id)
     else:
         form = ReviewForm(instance=review)
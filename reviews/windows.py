@@ -0,0 +1,84 @@
+"""Process-wide cached windows of recent and top-rated reviews.
+
+The home page (guests and the "recent" feed) and the ``recent_reviews`` page
+show the same few reviews to every visitor, so each window is computed once
+and shared through the default cache.
+
+Entries carry a soft expiry (``REVIEW_WINDOW_TTL`` seconds). Once it passes,
+one caller refreshes the window while concurrent callers keep serving the
+previous value, so an expiry under load costs a single query instead of a
+stampede. Review saves/deletes drop the windows outright (``invalidate``).
+"""
+
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+
+from .models import Review
+
+REVIEW_WINDOW_SIZE = getattr(settings, "REVIEW_WINDOW_SIZE", 10)
+REVIEW_WINDOW_TTL = getattr(settings, "REVIEW_WINDOW_TTL", 30)
+# Stale copies are kept this much longer so refreshes can serve them
+_STALE_GRACE = 10 * REVIEW_WINDOW_TTL
+_REFRESH_LOCK_TIMEOUT = 10
+
+_QUERIES = {
+    "recent": ("-created",),
+    "top_rated": ("-rating", "-created"),
+}
+_local_locks = {name: threading.Lock() for name in _QUERIES}
+
+
+def _key(name):
+    return f"review_window:{name}"
+
+
+def _load(name):
+    ordering = _QUERIES[name]
+    # From the primary: a lagging replica would re-cache a window just invalidated
+    reviews = Review.objects.using(DEFAULT_DB_ALIAS).select_related("book", "user")
+    return list(reviews.order_by(*ordering)[:REVIEW_WINDOW_SIZE])
+
+
+def _store(name, rows):
+    cache.set(_key(name), (time.time() + REVIEW_WINDOW_TTL, rows), REVIEW_WINDOW_TTL + _STALE_GRACE)
+
+
+def get_window(name):
+    """Return the cached list of reviews for window ``name``."""
+    entry = cache.get(_key(name))
+    if entry is not None:
+        fresh_until, rows = entry
+        if time.time() < fresh_until:
+            return rows
+        # Stale: one process wins the refresh lock, everyone else serves stale rows
+        if cache.add(f"{_key(name)}:refresh", 1, _REFRESH_LOCK_TIMEOUT):
+            try:
+                rows = _load(name)
+                _store(name, rows)
+            finally:
+                cache.delete(f"{_key(name)}:refresh")
+        return rows
+    # Cold: let one thread per process do the query, the rest wait for it
+    with _local_locks[name]:
+        entry = cache.get(_key(name))
+        if entry is not None:
+            return entry[1]
+        rows = _load(name)
+        _store(name, rows)
+        return rows
+
+
+def recent_reviews():
+    return get_window("recent")
+
+
+def top_rated_reviews():
+    return get_window("top_rated")
+
+
+def invalidate():
+    cache.delete_many([_key(name) for name in _QUERIES])
@@ -0,0 +1,20 @@
+// Floating Back to Top button logic
+document.addEventListener('DOMContentLoaded', function() {
+  const fab = document.createElement('a');
+  fab.href = '#page-top';
+  fab.className = 'back-to-top-fab';
+  fab.setAttribute('aria-label', 'Back to top');
+  fab.innerHTML = '↑';
+  document.body.appendChild(fab);
+
+  const showAfter = 600; // px scrolled
+  function onScroll() {
+    if (window.scrollY > showAfter) {
+      fab.classList.add('visible');
+    } else {
+      fab.classList.remove('visible');
+    }
+  }
+  window.addEventListener('scroll', onScroll, { passive: true });
+  onScroll();
+});
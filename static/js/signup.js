@@ -0,0 +1,138 @@
+(function() {
+  const form = document.getElementById('signup-form');
+  if (!form) return;
+  const usernameInput = document.getElementById('id_username');
+  const usernameStatus = document.getElementById('username-status');
+  const emailInput = document.getElementById('id_email');
+  const emailStatus = document.getElementById('email-status');
+  const pwd1 = document.getElementById('id_password1');
+  // Email availability debounce
+  let emailTimer;
+  function checkEmail() {
+    const value = emailInput.value.trim();
+    if (!value) {
+      emailStatus.textContent = '';
+      emailStatus.className = 'email-status';
+      return;
+    }
+    // rudimentary format check to avoid useless request
+    if (!/^[^@\s]+@[^@\s]+\.[^@\s]+$/.test(value)) {
+      emailStatus.textContent = 'Enter a valid email format';
+      emailStatus.className = 'email-status error';
+      return;
+    }
+    emailStatus.textContent = 'Checking...';
+    emailStatus.className = 'email-status checking';
+    fetch(`${form.dataset.emailUrl}?email=${encodeURIComponent(value)}`)
+      .then(r => r.json())
+      .then(data => {
+        if (data.email.toLowerCase() !== value.toLowerCase()) return; // stale response
+        if (data.available) {
+          emailStatus.textContent = 'Email is available';
+          emailStatus.className = 'email-status ok';
+        } else {
+          emailStatus.textContent = 'Email is already registered';
+          emailStatus.className = 'email-status error';
+        }
+      })
+      .catch(() => {
+        emailStatus.textContent = 'Could not verify email';
+        emailStatus.className = 'email-status error';
+      });
+  }
+  if (emailInput) {
+    emailInput.addEventListener('input', () => {
+      clearTimeout(emailTimer);
+      emailTimer = setTimeout(checkEmail, 400);
+    });
+  }
+  // Username availability debounce
+  let unameTimer;
+  function checkUsername() {
+    const value = usernameInput.value.trim();
+    if (!value) {
+      usernameStatus.textContent = '';
+      usernameStatus.className = 'username-status';
+      return;
+    }
+    usernameStatus.textContent = 'Checking...';
+    usernameStatus.className = 'username-status checking';
+    fetch(`${form.dataset.usernameUrl}?username=${encodeURIComponent(value)}`)
+      .then(r => r.json())
+      .then(data => {
+        if (data.username.toLowerCase() !== value.toLowerCase()) return; // stale
+        if (data.available) {
+          usernameStatus.textContent = 'Username is available';
+          usernameStatus.className = 'username-status ok';
+        } else {
+          usernameStatus.textContent = 'Username is already taken';
+          usernameStatus.className = 'username-status error';
+        }
+      })
+      .catch(() => {
+        usernameStatus.textContent = 'Could not verify';
+        usernameStatus.className = 'username-status error';
+      });
+  }
+  if (usernameInput) {
+    usernameInput.addEventListener('input', () => {
+      clearTimeout(unameTimer);
+      unameTimer = setTimeout(checkUsername, 400);
+    });
+  }
+  const pwd2 = document.getElementById('id_password2');
+  const submitBtn = document.getElementById('signup-submit');
+  const matchMsg = document.getElementById('password-match-msg');
+  const rules = {
+    length: document.querySelector('[data-rule="length"]'),
+    letter: document.querySelector('[data-rule="letter"]'),
+    number: document.querySelector('[data-rule="number"]')
+  };
+
+  function evaluateRules(value) {
+    toggle(rules.length, value.length >= 8);
+    toggle(rules.letter, /[a-zA-Z]/.test(value));
+    toggle(rules.number, /\d/.test(value));
+  }
+
+  function toggle(li, condition) {
+    if(!li) return;
+    li.classList.toggle('met', condition);
+  }
+
+  function allRulesMet() {
+    return Object.values(rules).every(li => li && li.classList.contains('met'));
+  }
+
+  function checkMatch() {
+    const v1 = pwd1.value;
+    const v2 = pwd2.value;
+    if (!v1 && !v2) {
+      matchMsg.textContent = '';
+      matchMsg.className = 'password-match-msg';
+      submitBtn.disabled = true;
+      return;
+    }
+    if (v2 && v1 === v2) {
+      matchMsg.textContent = 'Passwords match';
+      matchMsg.className = 'password-match-msg ok';
+    } else if (v2) {
+      matchMsg.textContent = 'Passwords do not match';
+      matchMsg.className = 'password-match-msg error';
+    } else {
+      matchMsg.textContent = '';
+      matchMsg.className = 'password-match-msg';
+    }
+    submitBtn.disabled = !(allRulesMet() && v1 && v2 && v1 === v2);
+  }
+
+  if (pwd1) {
+    pwd1.addEventListener('input', () => { evaluateRules(pwd1.value); checkMatch(); });
+    evaluateRules(pwd1.value || '');
+  }
+  if (pwd2) {
+    pwd2.addEventListener('input', checkMatch);
+  }
+  // Initial state
+  checkMatch();
+})();
@@ -0,0 +1,56 @@
+(function(){
+  const group = document.querySelector('.star-rating');
+  if(!group) return;
+  const radios = Array.from(group.querySelectorAll('input[type="radio"]'));
+  const feedback = document.getElementById('rating-feedback');
+  const clearBtn = document.getElementById('clear-rating');
+  const submitBtn = document.getElementById('submit-review');
+
+  function currentValue(){
+    const r = radios.find(r=>r.checked);
+    return r ? r.value : '';
+  }
+  function labelFor(val){
+    switch(val){
+      case '5': return 'Excellent';
+      case '4': return 'Good';
+      case '3': return 'Average';
+      case '2': return 'Fair';
+      case '1': return 'Poor';
+      default: return '';
+    }
+  }
+  function updateFeedback(tempVal){
+    const val = tempVal || currentValue();
+    if(!val){
+      feedback.textContent = 'No rating selected';
+      return;
+    }
+    feedback.textContent = `${val} star${val==='1'?'':'s'} – ${labelFor(val)}`;
+  }
+  radios.forEach(radio => {
+    radio.addEventListener('change', () => updateFeedback());
+    radio.addEventListener('focus', () => updateFeedback(radio.value));
+    radio.addEventListener('mouseenter', () => updateFeedback(radio.value));
+  });
+  group.addEventListener('mouseleave', () => updateFeedback());
+  if(clearBtn){
+    clearBtn.addEventListener('click', ()=>{
+      radios.forEach(r=> r.checked = false);
+      updateFeedback('');
+    });
+  }
+  // Initial
+  updateFeedback();
+  // Prevent submit without rating
+  if(submitBtn){
+    submitBtn.addEventListener('click', (e)=>{
+      if(!currentValue()){
+        e.preventDefault();
+        feedback.textContent = 'Please choose a rating before submitting.';
+        feedback.classList.add('rating-feedback-error');
+        radios[radios.length-1].focus(); // focus lowest star for easy nav
+      }
+    });
+  }
+})();
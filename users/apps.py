@@ -4,3 +4,10 @@ from django.apps import AppConfig
 class UsersConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'users'
+
+    def ready(self):
+        # Register signal receivers for the denormalized counters
+        from . import signals  # noqa: F401
+        # Warm start for the availability Bloom filter (file only, no queries)
+        from .bloom import availability_filter
+        availability_filter.load()
@@ -0,0 +1,93 @@
+"""Cached request users for ``users.middleware.CachedAuthenticationMiddleware``.
+
+Each authenticated request normally loads its ``User`` row (after the
+session). Here the hydrated user and the id set they follow are cached
+together under ``auth_user:<id>:<version>`` in ``USER_CACHE_ALIAS`` for
+``USER_CACHE_TTL`` seconds. ``invalidate`` replaces the user's version
+token, which orphans the old entry at once. It runs when the user row
+changes (saves, deletes, counter updates, follow edges) or their groups or
+permissions change.
+
+The session auth hash is still checked against the cached user on every
+request, so a password change (which saves the user and so changes the
+version) logs out other sessions as before. That only holds if every worker
+sees the same cache, so the middleware uses this module only with
+``settings.USER_CACHE_ENABLED``, which settings.py refuses to turn on
+without a shared cache (``LITREVIEW_REDIS_URL``). Invalidation runs either
+way.
+"""
+
+import uuid
+
+from django.conf import settings
+from django.contrib.auth import BACKEND_SESSION_KEY, HASH_SESSION_KEY, SESSION_KEY, get_user_model, load_backend
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import caches
+from django.utils.crypto import constant_time_compare
+
+from . import follow_graph
+
+USER_CACHE_ALIAS = getattr(settings, "USER_CACHE_ALIAS", "default")
+USER_CACHE_TTL = getattr(settings, "USER_CACHE_TTL", 300)
+
+
+def enabled():
+    return getattr(settings, "USER_CACHE_ENABLED", False)
+
+
+def _cache():
+    return caches[USER_CACHE_ALIAS]
+
+
+def _version_key(user_id):
+    return f"auth_user_version:{user_id}"
+
+
+def _version(user_id):
+    key = _version_key(user_id)
+    version = _cache().get(key)
+    if version is None:
+        _cache().add(key, uuid.uuid4().hex, None)
+        version = _cache().get(key)
+    return version
+
+
+def invalidate(user_ids):
+    """Drop the cached users (and following sets) of ``user_ids``."""
+    _cache().set_many({_version_key(user_id): uuid.uuid4().hex for user_id in user_ids}, None)
+
+
+def load_user(backend, user_id):
+    """Return the backend's user for ``user_id`` with ``following_ids`` filled in."""
+    key = f"auth_user:{user_id}:{_version(user_id)}"
+    entry = _cache().get(key)
+    if entry is not None:
+        user, following = entry
+    else:
+        user = backend.get_user(user_id)
+        if user is None:
+            return None
+        following = follow_graph.following_ids(user.pk)
+        _cache().set(key, (user, following), USER_CACHE_TTL)
+    user.following_ids = following
+    return user
+
+
+def get_user(request):
+    """``django.contrib.auth.get_user`` reading the user through the cache."""
+    user = None
+    try:
+        user_id = get_user_model()._meta.pk.to_python(request.session[SESSION_KEY])
+        backend_path = request.session[BACKEND_SESSION_KEY]
+    except KeyError:
+        pass
+    else:
+        if backend_path in settings.AUTHENTICATION_BACKENDS:
+            user = load_user(load_backend(backend_path), user_id)
+            # Verify the session, as Django does
+            if hasattr(user, "get_session_auth_hash"):
+                session_hash = request.session.get(HASH_SESSION_KEY)
+                if not (session_hash and constant_time_compare(session_hash, user.get_session_auth_hash())):
+                    request.session.flush()
+                    user = None
+    return user or AnonymousUser()
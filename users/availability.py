@@ -0,0 +1,105 @@
+"""Username/email availability lookups for the signup form's AJAX checks.
+
+Lookups compare ``LOWER(column)`` against ``LOWER(value)`` so they hit the
+functional indexes on ``User`` instead of scanning like ``iexact`` does on
+SQLite. Before that, the Bloom filter in ``users.bloom`` answers definite
+"not taken" results without a query. Results (taken or free) are memoized
+per process for ``AVAILABILITY_CACHE_TTL`` seconds; ``users.signals`` drops
+the entries for a user's old and new username and email whenever they are
+saved.
+"""
+
+import threading
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db.models import Value
+from django.db.models.functions import Lower
+
+from .bloom import availability_filter
+from .models import User
+
+AVAILABILITY_CACHE_TTL = getattr(settings, "AVAILABILITY_CACHE_TTL", 30)
+AVAILABILITY_CACHE_SIZE = getattr(settings, "AVAILABILITY_CACHE_SIZE", 10000)
+
+
+class TTLCache:
+    """Tiny thread-safe dict with per-entry expiry and a size cap."""
+
+    def __init__(self, ttl, maxsize):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._data = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            expires, value = entry
+            if expires < time.monotonic():
+                del self._data[key]
+                return None
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            if len(self._data) >= self.maxsize:
+                # Drop the oldest insertion; dicts keep insertion order
+                self._data.pop(next(iter(self._data)))
+            self._data[key] = (time.monotonic() + self.ttl, value)
+
+    def discard(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+cache = TTLCache(AVAILABILITY_CACHE_TTL, AVAILABILITY_CACHE_SIZE)
+
+
+def _key(field, value):
+    return (field, value.lower())
+
+
+def _exists(field, value):
+    return (
+        User.objects.alias(folded=Lower(field))
+        .filter(folded=Lower(Value(value)))
+        .exists()
+    )
+
+
+def is_taken(field, value):
+    """Return True if a user already has ``value`` (case-insensitive) in ``field``."""
+    key = _key(field, value)
+    taken = cache.get(key)
+    if taken is None:
+        taken = availability_filter.might_contain(field, value) and _exists(field, value)
+        cache.set(key, taken)
+    return taken
+
+
+async def ais_taken(field, value):
+    """Async variant of ``is_taken`` for ASGI views."""
+    key = _key(field, value)
+    taken = cache.get(key)
+    if taken is None:
+        # Django 4.0 has no async query methods; run ORM calls off-loop
+        if availability_filter.needs_sync():
+            await sync_to_async(availability_filter.sync)()
+        taken = availability_filter.check(field, value) and await sync_to_async(_exists)(field, value)
+        cache.set(key, taken)
+    return taken
+
+
+def forget(username, email):
+    """Drop cached results for ``username`` and ``email``."""
+    cache.discard(_key("username", username))
+    if email:
+        cache.discard(_key("email", email))
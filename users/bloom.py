@@ -0,0 +1,237 @@
+"""Bloom filter of case-folded usernames and emails.
+
+Most availability checks are for names nobody has, so ``users.availability``
+asks the filter first: a miss is a definite "not taken" and skips the
+database. A hit only means "maybe" and falls through to the indexed query.
+
+The process-wide ``AvailabilityFilter``:
+
+- is loaded from ``AVAILABILITY_BLOOM_PATH`` when the app starts (no
+  query), and otherwise built from the user table when the WSGI/ASGI
+  application starts (``warm``), so no request pays for the build;
+  management commands and migrations skip that and build on first use;
+- adds users created or renamed in this process, and every
+  ``AVAILABILITY_BLOOM_SYNC`` seconds pulls users created elsewhere (other
+  workers) by primary-key high-water mark, so it never has false negatives
+  for new signups;
+- can be written back to disk with ``manage.py availability_filter save``.
+
+Renames done in another process are only picked up by a rebuild; the signup
+form's own uniqueness validation still applies.
+"""
+
+import hashlib
+import logging
+import math
+import os
+import struct
+import threading
+import time
+
+from django.conf import settings
+from django.db import DatabaseError
+
+from .models import User
+
+logger = logging.getLogger(__name__)
+
+_HEADER = struct.Struct(">4sQIQQ")  # magic, bits, hashes, count, high-water user id
+_MAGIC = b"LRBF"
+
+AVAILABILITY_BLOOM_ERROR_RATE = getattr(settings, "AVAILABILITY_BLOOM_ERROR_RATE", 0.01)
+AVAILABILITY_BLOOM_SYNC = getattr(settings, "AVAILABILITY_BLOOM_SYNC", 5)
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter using double hashing over one blake2b digest."""
+
+    def __init__(self, bits, hashes, data=None, count=0):
+        self.bits = bits
+        self.hashes = hashes
+        self.data = bytearray(data) if data is not None else bytearray((bits + 7) // 8)
+        self.count = count
+
+    @classmethod
+    def for_capacity(cls, capacity, error_rate=AVAILABILITY_BLOOM_ERROR_RATE):
+        capacity = max(capacity, 1)
+        bits = max(int(-capacity * math.log(error_rate) / math.log(2) ** 2), 64)
+        hashes = max(int(round(bits / capacity * math.log(2))), 1)
+        return cls(bits, hashes)
+
+    @property
+    def capacity(self):
+        """Item count at which the filter reaches its design error rate."""
+        return int(self.bits * math.log(2) / self.hashes)
+
+    def _positions(self, item):
+        digest = hashlib.blake2b(item.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "big")
+        h2 = int.from_bytes(digest[8:], "big") | 1
+        return ((h1 + i * h2) % self.bits for i in range(self.hashes))
+
+    def add(self, item):
+        """Add ``item``; ``count`` only grows if it was not already present.
+
+        Re-adding an item (a user saved again, or read back by a sync) would
+        otherwise inflate ``estimated_fpr`` and trigger early rebuilds.
+        """
+        added = False
+        for pos in self._positions(item):
+            mask = 1 << (pos & 7)
+            if not self.data[pos >> 3] & mask:
+                self.data[pos >> 3] |= mask
+                added = True
+        if added:
+            self.count += 1
+        return added
+
+    def __contains__(self, item):
+        return all(self.data[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(item))
+
+    @property
+    def estimated_fpr(self):
+        """Expected false-positive rate for the number of items added."""
+        return (1 - math.exp(-self.hashes * self.count / self.bits)) ** self.hashes
+
+    @property
+    def nbytes(self):
+        return len(self.data)
+
+    def to_bytes(self, high_water=0):
+        return _HEADER.pack(_MAGIC, self.bits, self.hashes, self.count, high_water) + bytes(self.data)
+
+    @classmethod
+    def from_bytes(cls, payload):
+        """Return ``(filter, high_water)``; raises ValueError on a bad payload."""
+        if len(payload) < _HEADER.size:
+            raise ValueError("Truncated bloom filter file")
+        magic, bits, hashes, count, high_water = _HEADER.unpack_from(payload)
+        data = payload[_HEADER.size:]
+        if magic != _MAGIC or len(data) != (bits + 7) // 8:
+            raise ValueError("Not a bloom filter file")
+        return cls(bits, hashes, data, count), high_water
+
+
+def _items(username, email):
+    yield f"u:{username.lower()}"
+    if email:
+        yield f"e:{email.lower()}"
+
+
+class AvailabilityFilter:
+    """Process-wide filter over users, kept current by signals and catch-up."""
+
+    def __init__(self, path=None, sync_interval=AVAILABILITY_BLOOM_SYNC):
+        self.path = path
+        self.sync_interval = sync_interval
+        self.filter = None
+        self.high_water = 0
+        self.synced_at = 0.0
+        self.negatives = 0
+        self.maybes = 0
+        self._lock = threading.RLock()
+
+    def needs_sync(self):
+        return self.filter is None or time.monotonic() - self.synced_at > self.sync_interval
+
+    def sync(self):
+        """Load/build the filter if needed and add users created since the last sync."""
+        with self._lock:
+            if self.filter is None and not self._load():
+                self.rebuild()
+                return
+            rows = User.objects.filter(pk__gt=self.high_water).order_by("pk").values_list("pk", "username", "email")
+            for pk, username, email in rows.iterator():
+                for item in _items(username, email):
+                    self.filter.add(item)
+                self.high_water = pk
+            if self.filter.count > self.filter.capacity:
+                self.rebuild()
+                return
+            self.synced_at = time.monotonic()
+
+    def rebuild(self):
+        with self._lock:
+            total = User.objects.count()
+            bloom = BloomFilter.for_capacity(max(4 * total, 10000))
+            high_water = 0
+            rows = User.objects.order_by("pk").values_list("pk", "username", "email")
+            for pk, username, email in rows.iterator(chunk_size=5000):
+                for item in _items(username, email):
+                    bloom.add(item)
+                high_water = pk
+            self.filter, self.high_water = bloom, high_water
+            self.synced_at = time.monotonic()
+
+    def load(self):
+        """Load the filter from ``path`` if there is one; True on success. No queries."""
+        with self._lock:
+            return self._load()
+
+    def warm(self):
+        """Load or build the filter now and catch up with new users."""
+        try:
+            self.sync()
+        except DatabaseError:
+            # e.g. the user table does not exist yet; the first check retries
+            logger.warning("Could not build the availability filter at startup", exc_info=True)
+
+    def _load(self):
+        if not self.path or not os.path.exists(self.path):
+            return False
+        try:
+            with open(self.path, "rb") as fh:
+                self.filter, self.high_water = BloomFilter.from_bytes(fh.read())
+        except (OSError, ValueError):
+            return False
+        return True
+
+    def save(self, path=None):
+        path = path or self.path
+        with self._lock:
+            if self.filter is None:
+                self.sync()
+            tmp = f"{path}.tmp"
+            with open(tmp, "wb") as fh:
+                fh.write(self.filter.to_bytes(self.high_water))
+            os.replace(tmp, path)
+        return path
+
+    def might_contain(self, field, value):
+        """False means definitely not taken; True means ask the database."""
+        if self.needs_sync():
+            self.sync()
+        return self.check(field, value)
+
+    def check(self, field, value):
+        """Membership test without syncing (caller ensures freshness)."""
+        prefix = "u" if field == "username" else "e"
+        found = f"{prefix}:{value.lower()}" in self.filter
+        if found:
+            self.maybes += 1
+        else:
+            self.negatives += 1
+        return found
+
+    def add_user(self, user):
+        with self._lock:
+            if self.filter is None:
+                return  # the first sync will read this user from the table
+            for item in _items(user.username, user.email):
+                self.filter.add(item)
+
+    def stats(self):
+        bloom = self.filter
+        return {
+            "items": bloom.count if bloom else 0,
+            "bits": bloom.bits if bloom else 0,
+            "hashes": bloom.hashes if bloom else 0,
+            "memory_bytes": bloom.nbytes if bloom else 0,
+            "estimated_false_positive_rate": bloom.estimated_fpr if bloom else 0.0,
+            "high_water_user_id": self.high_water,
+            "definite_negatives": self.negatives,
+            "maybe_present": self.maybes,
+        }
+
+
+availability_filter = AvailabilityFilter(getattr(settings, "AVAILABILITY_BLOOM_PATH", None))
@@ -0,0 +1,46 @@
+"""Incremental maintenance of the follow/review counters stored on ``User``."""
+
+from django.db.models import Count, F
+from django.db.models.functions import Greatest
+
+from reviews.models import Review
+
+from . import auth_cache
+from .models import User
+
+COUNTER_FIELDS = ("review_count", "followers_count", "following_count")
+
+
+def bump(user_ids, field, delta):
+    """Add ``delta`` to ``field`` for every user in ``user_ids`` (never below 0)."""
+    if not user_ids or not delta:
+        return
+    User.objects.filter(pk__in=user_ids).update(**{field: Greatest(F(field) + delta, 0)})
+    # Cached request users carry the counters (and, for follows, the following set)
+    auth_cache.invalidate(user_ids)
+
+
+def follows_added(follower_ids, followee_ids):
+    """Record new edges: each follower now follows every followee."""
+    bump(follower_ids, "following_count", len(followee_ids))
+    bump(followee_ids, "followers_count", len(follower_ids))
+
+
+def follows_removed(follower_ids, followee_ids):
+    bump(follower_ids, "following_count", -len(followee_ids))
+    bump(followee_ids, "followers_count", -len(follower_ids))
+
+
+def computed_counters():
+    """Recompute counters from source tables: {user_id: {field: value}}."""
+    Follow = User.following.through
+    result = {}
+    sources = (
+        ("review_count", Review.objects.values_list("user_id")),
+        ("following_count", Follow.objects.values_list("from_user_id")),
+        ("followers_count", Follow.objects.values_list("to_user_id")),
+    )
+    for field, rows in sources:
+        for user_id, n in rows.annotate(n=Count("pk")).order_by():
+            result.setdefault(user_id, dict.fromkeys(COUNTER_FIELDS, 0))[field] = n
+    return result
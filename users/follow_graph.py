@@ -0,0 +1,157 @@
+"""Follow-graph service: cached adjacency sets and bulk follow/unfollow.
+
+Each user's outgoing ("following") and incoming ("followers") id sets are
+cached in ``FOLLOW_GRAPH_CACHE_ALIAS`` for ``FOLLOW_GRAPH_TTL`` seconds and
+loaded for many users at once with ``get_many`` plus one query for the
+misses. Questions like "which of these users do I follow", mutual follows
+and friends-of-friends suggestions are then set operations in Python.
+
+Writes go through ``follow``/``unfollow``, which change any number of edges
+in one transaction via ``user.following.add/remove`` so the existing
+``m2m_changed`` receivers (counters, feed inboxes) still run. The receiver
+in ``users.signals`` drops the affected adjacency sets. With the default
+per-process local-memory cache, other workers see a change once their copy
+expires; point ``FOLLOW_GRAPH_CACHE_ALIAS`` at a shared cache to make it
+immediate.
+"""
+
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS, transaction
+
+from .models import User
+
+Follow = User.following.through
+
+FOLLOW_GRAPH_CACHE_ALIAS = getattr(settings, "FOLLOW_GRAPH_CACHE_ALIAS", "default")
+FOLLOW_GRAPH_TTL = getattr(settings, "FOLLOW_GRAPH_TTL", 300)
+# Followees sampled (most-followed first) when building suggestions
+FOLLOW_GRAPH_SUGGESTION_FANOUT = getattr(settings, "FOLLOW_GRAPH_SUGGESTION_FANOUT", 200)
+
+# direction -> (column holding the cached user, column holding the neighbours)
+_COLUMNS = {
+    "following": ("from_user_id", "to_user_id"),
+    "followers": ("to_user_id", "from_user_id"),
+}
+
+
+def _cache():
+    return caches[FOLLOW_GRAPH_CACHE_ALIAS]
+
+
+def _key(direction, user_id):
+    return f"follow_graph:{direction}:{user_id}"
+
+
+def _neighbours(direction, user_ids):
+    """Return {user_id: frozenset of neighbour ids} for ``user_ids``."""
+    user_ids = list(dict.fromkeys(user_ids))
+    if not user_ids:
+        return {}
+    cache = _cache()
+    keys = {_key(direction, user_id): user_id for user_id in user_ids}
+    cached = cache.get_many(list(keys))
+    result = {keys[key]: value for key, value in cached.items()}
+    missing = [user_id for user_id in user_ids if user_id not in result]
+    if missing:
+        owner, other = _COLUMNS[direction]
+        loaded = {user_id: set() for user_id in missing}
+        # From the primary: a lagging replica would re-cache edges just invalidated
+        rows = Follow.objects.using(DEFAULT_DB_ALIAS).filter(**{f"{owner}__in": missing}).values_list(owner, other)
+        for user_id, neighbour_id in rows.iterator():
+            loaded[user_id].add(neighbour_id)
+        loaded = {user_id: frozenset(ids) for user_id, ids in loaded.items()}
+        cache.set_many({_key(direction, user_id): ids for user_id, ids in loaded.items()}, FOLLOW_GRAPH_TTL)
+        result.update(loaded)
+    return result
+
+
+def following_ids(user_id):
+    """Ids of the users ``user_id`` follows."""
+    return _neighbours("following", [user_id])[user_id]
+
+
+def follower_ids(user_id):
+    """Ids of the users following ``user_id``."""
+    return _neighbours("followers", [user_id])[user_id]
+
+
+def following_among(user_id, candidate_ids):
+    """Subset of ``candidate_ids`` that ``user_id`` follows."""
+    return following_ids(user_id) & set(candidate_ids)
+
+
+def mutual_ids(user_id):
+    """Users that ``user_id`` follows and who follow back."""
+    return following_ids(user_id) & follower_ids(user_id)
+
+
+def suggestions(user_id, limit=10):
+    """Friends-of-friends not yet followed, as [(user_id, score)].
+
+    The score is how many of ``user_id``'s followees follow the candidate.
+    Only the ``FOLLOW_GRAPH_SUGGESTION_FANOUT`` most-followed followees are
+    expanded, so the cost stays bounded for users following thousands.
+    """
+    followees = following_ids(user_id)
+    if not followees:
+        return []
+    sample = list(
+        User.objects.filter(pk__in=followees)
+        .order_by("-followers_count", "pk")
+        .values_list("pk", flat=True)[:FOLLOW_GRAPH_SUGGESTION_FANOUT]
+    )
+    scores = Counter()
+    for ids in _neighbours("following", sample).values():
+        scores.update(ids)
+    for excluded in followees | {user_id}:
+        scores.pop(excluded, None)
+    return sorted(scores.items(), key=lambda item: (-item[1], item[0]))[:limit]
+
+
+def _existing_edges(user_id, target_ids):
+    # Writes check the table, not the cache, so a stale set can't skip an edge
+    return set(
+        Follow.objects.filter(from_user_id=user_id, to_user_id__in=target_ids)
+        .values_list("to_user_id", flat=True)
+    )
+
+
+def follow(user, target_ids):
+    """Follow every user in ``target_ids``; return the ids actually added."""
+    wanted = set(target_ids) - {user.pk}
+    if not wanted:
+        return set()
+    with transaction.atomic():
+        wanted -= _existing_edges(user.pk, wanted)
+        new_ids = set(User.objects.filter(pk__in=wanted).values_list("pk", flat=True))
+        if new_ids:
+            user.following.add(*new_ids)
+    return new_ids
+
+
+def unfollow(user, target_ids):
+    """Unfollow every user in ``target_ids``; return the ids actually removed."""
+    if not target_ids:
+        return set()
+    with transaction.atomic():
+        removed_ids = _existing_edges(user.pk, set(target_ids))
+        if removed_ids:
+            user.following.remove(*removed_ids)
+    return removed_ids
+
+
+def invalidate(followers=(), followees=()):
+    """Drop cached adjacency for both ends of changed edges.
+
+    Runs now (for reads later in the same transaction) and again on commit,
+    in case a concurrent request re-cached the old sets in between.
+    """
+    keys = [_key("following", user_id) for user_id in followers]
+    keys += [_key("followers", user_id) for user_id in followees]
+    if not keys:
+        return
+    _cache().delete_many(keys)
+    transaction.on_commit(lambda: _cache().delete_many(keys))
@@ -0,0 +1,25 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from users.bloom import availability_filter
+
+
+class Command(BaseCommand):
+    help = "Build, persist or inspect the username/email Bloom filter used by availability checks."
+
+    def add_arguments(self, parser):
+        parser.add_argument("action", choices=["stats", "save"])
+        parser.add_argument("--path", help="File to write (defaults to settings.AVAILABILITY_BLOOM_PATH).")
+
+    def handle(self, *args, **options):
+        if options["action"] == "save":
+            path = options["path"] or availability_filter.path
+            if not path:
+                raise CommandError("No --path given and AVAILABILITY_BLOOM_PATH is not set.")
+            availability_filter.rebuild()
+            availability_filter.save(path)
+            self.stdout.write(self.style.SUCCESS(f"Wrote {path}"))
+        else:
+            availability_filter.sync()
+        self.stdout.write(json.dumps(availability_filter.stats(), indent=2))
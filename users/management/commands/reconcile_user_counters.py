@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from users.counters import COUNTER_FIELDS, computed_counters
+from users.models import User
+
+
+class Command(BaseCommand):
+    help = "Recompute review/follower/following counters on User and report drift."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--check", action="store_true",
+            help="Only report users whose stored counters drifted; exit non-zero if any.",
+        )
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        empty = dict.fromkeys(COUNTER_FIELDS, 0)
+        expected = computed_counters()
+        drifted = []
+        with transaction.atomic():
+            users = User.objects.only("id", *COUNTER_FIELDS).select_for_update().iterator(chunk_size=options["batch_size"])
+            for user in users:
+                values = expected.get(user.id, empty)
+                if any(getattr(user, f) != values[f] for f in COUNTER_FIELDS):
+                    for field, value in values.items():
+                        setattr(user, field, value)
+                    drifted.append(user)
+            if drifted and not options["check"]:
+                User.objects.bulk_update(drifted, COUNTER_FIELDS, batch_size=options["batch_size"])
+
+        if options["check"]:
+            for user in drifted[:20]:
+                self.stdout.write(f"Drift on user {user.id}")
+            if drifted:
+                raise CommandError(f"{len(drifted)} user(s) have drifted counters.")
+            self.stdout.write(self.style.SUCCESS("No drift."))
+        else:
+            self.stdout.write(self.style.SUCCESS(f"Reconciled counters; fixed {len(drifted)} user(s)."))
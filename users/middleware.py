@@ -0,0 +1,18 @@
+from django.contrib.auth.middleware import AuthenticationMiddleware
+from django.utils.functional import SimpleLazyObject
+
+from . import auth_cache
+
+
+class CachedAuthenticationMiddleware(AuthenticationMiddleware):
+    """``AuthenticationMiddleware`` serving ``request.user`` from a version-keyed cache.
+
+    Logged-in requests skip the user query (and the following-set lookup,
+    available as ``request.user.following_ids``); see ``users.auth_cache``.
+    Behaves like the stock middleware unless ``settings.USER_CACHE_ENABLED``.
+    """
+
+    def process_request(self, request):
+        super().process_request(request)  # keeps the SessionMiddleware check
+        if auth_cache.enabled():
+            request.user = SimpleLazyObject(lambda: auth_cache.get_user(request))
@@ -0,0 +1,48 @@
+# Generated by Django 4.0.5 on 2026-10-18 17:06
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def populate_counters(apps, schema_editor):
+    User = apps.get_model('users', 'User')
+    Review = apps.get_model('reviews', 'Review')
+    Follow = User.following.through
+
+    def count_of(qs, column):
+        counts = qs.filter(**{column: OuterRef('pk')}).values(column).annotate(n=Count('pk')).values('n')
+        return Coalesce(Subquery(counts), 0)
+
+    User.objects.update(
+        review_count=count_of(Review.objects.order_by(), 'user_id'),
+        following_count=count_of(Follow.objects.order_by(), 'from_user_id'),
+        followers_count=count_of(Follow.objects.order_by(), 'to_user_id'),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0002_alter_user_following'),
+        ('reviews', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='followers_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='following_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='review_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(populate_counters, migrations.RunPython.noop),
+    ]
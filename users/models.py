@@ -1,5 +1,7 @@
 from django.contrib.auth.models import AbstractUser
 from django.db import models
+from django.db.models.functions import Lower
+from django.utils.functional import cached_property
 from django.utils.translation import gettext_lazy as _
 
 
@@ -19,6 +21,25 @@ class User(AbstractUser):
         blank=True,
     )
 
+    # Denormalized counters maintained by users.signals (see reconcile_user_counters)
+    review_count = models.PositiveIntegerField(default=0)
+    followers_count = models.PositiveIntegerField(default=0)
+    following_count = models.PositiveIntegerField(default=0)
+
+    class Meta(AbstractUser.Meta):
+        indexes = [
+            # Case-insensitive availability checks (see users.availability)
+            models.Index(Lower("username"), name="user_username_lower_idx"),
+            models.Index(Lower("email"), name="user_email_lower_idx"),
+        ]
+
     @property
     def full_name(self):
         return f"{self.first_name} {self.last_name}"
+
+    @cached_property
+    def following_ids(self):
+        """Ids this user follows (prefilled for request.user by users.middleware)."""
+        from . import follow_graph
+
+        return follow_graph.following_ids(self.pk)
@@ -0,0 +1,130 @@
+"""Signal receivers that keep the counters on ``User`` and the user caches in sync.
+
+Connected in ``UsersConfig.ready``.
+"""
+
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from reviews.models import Review
+
+from . import auth_cache, availability, counters, follow_graph
+from .bloom import availability_filter
+from .models import User
+
+Follow = User.following.through
+
+
+def _existing_edges(instance, reverse, pk_set):
+    """Return the subset of ``pk_set`` actually linked to ``instance``.
+
+    Django reports the requested ids on remove, not the rows deleted, so the
+    edges are looked up before they go away.
+    """
+    if reverse:
+        edges = Follow.objects.filter(to_user_id=instance.pk)
+        column = "from_user_id"
+    else:
+        edges = Follow.objects.filter(from_user_id=instance.pk)
+        column = "to_user_id"
+    if pk_set is not None:
+        edges = edges.filter(**{f"{column}__in": pk_set})
+    return set(edges.values_list(column, flat=True))
+
+
+@receiver(m2m_changed, sender=Follow, dispatch_uid="users_follow_counters")
+def update_follow_counters(sender, instance, action, reverse, pk_set, **kwargs):
+    if action in ("pre_remove", "pre_clear"):
+        instance._removed_follow_ids = _existing_edges(instance, reverse, pk_set)
+        return
+    if action == "post_add":
+        changed = pk_set
+        update = counters.follows_added
+    elif action in ("post_remove", "post_clear"):
+        changed = getattr(instance, "_removed_follow_ids", set())
+        update = counters.follows_removed
+    else:
+        return
+    if not changed:
+        return
+    if reverse:
+        update(list(changed), [instance.pk])
+    else:
+        update([instance.pk], list(changed))
+
+
+@receiver(m2m_changed, sender=Follow, dispatch_uid="users_follow_graph")
+def invalidate_follow_graph(sender, instance, action, reverse, pk_set, **kwargs):
+    if action == "post_clear":
+        # Set by update_follow_counters on pre_clear
+        pk_set = getattr(instance, "_removed_follow_ids", set())
+    elif action not in ("post_add", "post_remove"):
+        return
+    if not pk_set:
+        return
+    if reverse:
+        follow_graph.invalidate(followers=pk_set, followees=[instance.pk])
+    else:
+        follow_graph.invalidate(followers=[instance.pk], followees=pk_set)
+
+
+@receiver(post_save, sender=Review, dispatch_uid="users_review_count_added")
+def count_new_review(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        counters.bump([instance.user_id], "review_count", 1)
+
+
+@receiver(post_delete, sender=Review, dispatch_uid="users_review_count_removed")
+def count_deleted_review(sender, instance, **kwargs):
+    counters.bump([instance.user_id], "review_count", -1)
+
+
+@receiver(post_save, sender=User, dispatch_uid="users_auth_cache_saved")
+@receiver(post_delete, sender=User, dispatch_uid="users_auth_cache_deleted")
+def invalidate_cached_user(sender, instance, **kwargs):
+    auth_cache.invalidate([instance.pk])
+
+
+@receiver(m2m_changed, sender=User.groups.through, dispatch_uid="users_auth_cache_groups")
+@receiver(m2m_changed, sender=User.user_permissions.through, dispatch_uid="users_auth_cache_permissions")
+def invalidate_cached_user_permissions(sender, instance, action, reverse, pk_set, **kwargs):
+    """Drop cached users whose groups or permissions changed.
+
+    ``reverse`` means the change came from the group/permission side, so
+    ``pk_set`` holds user ids (collected before a clear).
+    """
+    if not reverse:
+        if action.startswith("post_"):
+            auth_cache.invalidate([instance.pk])
+    elif action == "pre_clear":
+        column = f"{instance._meta.model_name}_id"
+        instance._cleared_user_ids = list(
+            sender.objects.filter(**{column: instance.pk}).values_list("user_id", flat=True)
+        )
+    elif action == "post_clear":
+        auth_cache.invalidate(getattr(instance, "_cleared_user_ids", []))
+    elif action.startswith("post_"):
+        auth_cache.invalidate(pk_set)
+
+
+@receiver(pre_save, sender=User, dispatch_uid="users_availability_snapshot")
+def snapshot_identity(sender, instance, raw=False, update_fields=None, **kwargs):
+    # A rename frees the old name; its cached "taken" must go too
+    if raw or instance.pk is None or (update_fields and not {"username", "email"} & set(update_fields)):
+        return
+    instance._identity_previous = User.objects.filter(pk=instance.pk).values_list("username", "email").first()
+
+
+@receiver(post_save, sender=User, dispatch_uid="users_availability_saved")
+@receiver(post_delete, sender=User, dispatch_uid="users_availability_deleted")
+def forget_availability(sender, instance, update_fields=None, **kwargs):
+    if update_fields and not {"username", "email"} & set(update_fields):
+        return
+    availability.forget(instance.username, instance.email)
+    previous = getattr(instance, "_identity_previous", None)
+    if previous:
+        availability.forget(*previous)
+    if kwargs.get("signal") is post_save and (
+        kwargs.get("created") or (previous and previous != (instance.username, instance.email))
+    ):
+        availability_filter.add_user(instance)
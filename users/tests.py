@@ -1,3 +1,290 @@
-from django.test import TestCase
+import os
+import tempfile
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.backends import ModelBackend
+from django.contrib.auth.models import Group, Permission
+from django.core.cache import caches
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from reviews.models import Book, Review
+from users import auth_cache, availability, counters, follow_graph, views
+from users.bloom import AvailabilityFilter, availability_filter
+from users.models import User
+
+
+def make_users(*names):
+    return [User.objects.create_user(name, f"{name}@example.com", "x", first_name=name, last_name="T") for name in names]
+
+
+@override_settings(TASKS_EAGER=True)
+class CounterTests(TestCase):
+    """The counters on User match the follow and review tables after every write."""
+
+    def setUp(self):
+        self.alice, self.bob, self.carol = make_users("alice", "bob", "carol")
+        self.book = Book.objects.create(title="Book")
+
+    def assertCounters(self):
+        expected = counters.computed_counters()
+        for user in User.objects.all():
+            stored = {field: getattr(user, field) for field in counters.COUNTER_FIELDS}
+            self.assertEqual(stored, expected.get(user.pk, dict.fromkeys(counters.COUNTER_FIELDS, 0)), user)
+
+    def test_follows(self):
+        self.alice.following.add(self.bob, self.carol)
+        self.carol.followers.add(self.bob)
+        self.assertCounters()
+        # Removing an edge that doesn't exist changes nothing
+        self.alice.following.remove(self.bob, self.bob)
+        self.carol.following.remove(self.alice)
+        self.assertCounters()
+        self.carol.followers.clear()
+        self.assertCounters()
+        self.assertEqual(User.objects.get(pk=self.carol.pk).followers_count, 0)
+
+    def test_reviews(self):
+        review = Review.objects.create(headline="H", body="B", rating=3, book=self.book, user=self.alice)
+        Review.objects.create(headline="H", body="B", rating=4, book=self.book, user=self.alice)
+        self.assertEqual(User.objects.get(pk=self.alice.pk).review_count, 2)
+        review.delete()
+        self.assertCounters()
+
+    def test_never_negative(self):
+        review = Review.objects.create(headline="H", body="B", rating=3, book=self.book, user=self.alice)
+        User.objects.filter(pk=self.alice.pk).update(review_count=0)
+        review.delete()
+        self.assertEqual(User.objects.get(pk=self.alice.pk).review_count, 0)
+
+
+@override_settings(TASKS_EAGER=True)
+@mock.patch.object(views, "PROFILE_PAGE_SIZE", 3)
+class ProfilePaginationTests(TestCase):
+    """Keyset pages of a profile cover every review once, in order."""
+
+    def setUp(self):
+        self.author, reader = make_users("author", "reader")
+        book = Book.objects.create(title="Book")
+        reviews = [
+            Review.objects.create(headline=f"Review {n}", body="B", rating=3, book=book, user=self.author)
+            for n in range(7)
+        ]
+        # Equal timestamps straddling the first page boundary
+        Review.objects.filter(pk__in=[r.pk for r in reviews[2:5]]).update(created=reviews[2].created)
+        self.url = reverse("user_profile", args=[self.author.username])
+        self.client.force_login(reader)
+
+    def expected(self):
+        return list(Review.objects.filter(user=self.author).order_by("-created", "-id").values_list("pk", flat=True))
+
+    def pages(self):
+        pages, cursor = [], None
+        while True:
+            response = self.client.get(self.url, {"before": cursor} if cursor else {})
+            pages.append([review.pk for review in response.context["reviews"]])
+            cursor = response.context["next_cursor"]
+            if not cursor:
+                return pages
+
+    def test_pages(self):
+        pages = self.pages()
+        self.assertEqual([len(page) for page in pages], [3, 3, 1])
+        self.assertEqual(sum(pages, []), self.expected())
+
+    def test_exact_multiple_has_no_empty_last_page(self):
+        Review.objects.filter(pk=self.expected()[-1]).delete()
+        self.assertEqual([len(page) for page in self.pages()], [3, 3])
+
+    def test_malformed_cursor_starts_over(self):
+        for cursor in ("nonsense", "1", "1.99999999999999999999", "99999999999999999999.1"):
+            response = self.client.get(self.url, {"before": cursor})
+            self.assertEqual([review.pk for review in response.context["reviews"]], self.expected()[:3], cursor)
+
+    def test_stream_has_every_review_in_order(self):
+        response = self.client.get(self.url, {"stream": "1"})
+        content = b"".join(response.streaming_content).decode()
+        headlines = dict(Review.objects.values_list("pk", "headline"))
+        positions = [content.index(headlines[pk]) for pk in self.expected()]
+        self.assertEqual(positions, sorted(positions))
+
+
+class AvailabilityTests(TestCase):
+    """Availability checks are case-insensitive and follow renames and deletes."""
+
+    def setUp(self):
+        (self.alice,) = make_users("alice")
+        availability.cache.clear()
+        availability_filter.rebuild()
+
+    def available(self, field, value):
+        url = reverse(f"{field}_available")
+        return self.client.get(url, {field: value}).json()["available"]
+
+    def test_case_folded(self):
+        self.assertFalse(self.available("username", "ALICE"))
+        self.assertFalse(self.available("email", "Alice@Example.COM"))
+        self.assertTrue(self.available("username", "alicia"))
+        self.assertTrue(self.available("email", "alicia@example.com"))
+        self.assertFalse(self.available("username", ""))
+        self.assertFalse(self.available("email", ""))
+
+    def test_cached_result_dropped_on_rename(self):
+        self.assertFalse(self.available("username", "alice"))
+        self.assertTrue(self.available("username", "alicia"))
+        self.alice.username = "Alicia"
+        self.alice.save()
+        self.assertTrue(self.available("username", "alice"))
+        self.assertFalse(self.available("username", "alicia"))
+
+
+class AvailabilityFilterTests(TestCase):
+    """The Bloom filter never reports a taken name as free and answers misses without queries."""
+
+    def setUp(self):
+        (self.alice,) = make_users("alice")
+        availability.cache.clear()
+        availability_filter.rebuild()
+
+    def taken(self, value):
+        availability.cache.clear()
+        return availability.is_taken("username", value)
+
+    def test_unknown_name_needs_no_query(self):
+        with self.assertNumQueries(0):
+            self.assertFalse(self.taken("nobody-here"))
+
+    def test_signup_rename_and_delete(self):
+        make_users("bob")
+        self.assertTrue(self.taken("BOB"))
+        self.alice.username = "alicia"
+        self.alice.save()
+        self.assertTrue(self.taken("alicia"))
+        # The old name stays in the filter ("maybe") and the query says free
+        self.assertFalse(self.taken("alice"))
+        self.alice.delete()
+        self.assertFalse(self.taken("alicia"))
+
+    def test_count_ignores_repeat_adds(self):
+        count = availability_filter.filter.count
+        self.alice.first_name = "Alice"
+        self.alice.save()
+        self.alice.last_login = timezone.now()
+        self.alice.save(update_fields=["last_login"])
+        availability_filter.sync()
+        self.assertEqual(availability_filter.filter.count, count)
+        make_users("bob")  # one username and one email
+        availability_filter.sync()  # reads bob back from the table
+        self.assertEqual(availability_filter.filter.count, count + 2)
+        self.alice.username = "alicia"
+        self.alice.save()
+        self.assertEqual(availability_filter.filter.count, count + 3)
+
+    def test_warm_and_file_round_trip(self):
+        availability_filter.filter = None
+        availability_filter.warm()
+        self.assertTrue(availability_filter.check("username", "alice"))
+        with tempfile.TemporaryDirectory() as tmp:
+            path = availability_filter.save(os.path.join(tmp, "bloom.bin"))
+            restored = AvailabilityFilter(path)
+            with self.assertNumQueries(0):
+                self.assertTrue(restored.load())
+            self.assertTrue(restored.check("username", "alice"))
+            self.assertFalse(restored.check("username", "nobody-here"))
+
+
+@override_settings(TASKS_EAGER=True)
+class FollowGraphTests(TestCase):
+    """Bulk follow/unfollow keep the cached adjacency sets exact."""
+
+    def setUp(self):
+        caches["default"].clear()
+        self.alice, self.bob, self.carol, self.dave, self.erin = make_users("alice", "bob", "carol", "dave", "erin")
+
+    def test_follow_batch(self):
+        self.client.force_login(self.alice)
+        url = reverse("follow_batch")
+        self.assertEqual(follow_graph.following_ids(self.alice.pk), frozenset())  # cached empty
+        data = self.client.post(url, {"follow": ["bob,carol", "nobody", "alice"]}).json()
+        self.assertEqual((data["followed"], data["following_count"]), (["bob", "carol"], 2))
+        data = self.client.post(url, {"follow": "dave,bob", "unfollow": "carol,erin"}).json()
+        self.assertEqual((data["followed"], data["unfollowed"]), (["dave"], ["carol"]))
+        self.assertEqual(follow_graph.following_ids(self.alice.pk), {self.bob.pk, self.dave.pk})
+        self.assertEqual(follow_graph.follower_ids(self.carol.pk), frozenset())
+        self.assertEqual(User.objects.get(pk=self.alice.pk).following_count, 2)
+        status = self.client.get(reverse("follow_status"), {"users": "bob,carol,nobody"}).json()
+        self.assertEqual(status["following"], {"bob": True, "carol": False})
+
+    def test_mutual_and_suggestions(self):
+        follow_graph.follow(self.alice, [self.bob.pk, self.carol.pk])
+        follow_graph.follow(self.bob, [self.alice.pk, self.dave.pk, self.erin.pk])
+        follow_graph.follow(self.carol, [self.dave.pk, self.alice.pk, self.bob.pk])
+        self.assertEqual(follow_graph.mutual_ids(self.alice.pk), {self.bob.pk, self.carol.pk})
+        self.assertEqual(follow_graph.suggestions(self.alice.pk), [(self.dave.pk, 2), (self.erin.pk, 1)])
+        follow_graph.unfollow(self.alice, [self.carol.pk])
+        self.assertEqual(follow_graph.suggestions(self.alice.pk), [(self.dave.pk, 1), (self.erin.pk, 1)])
+
+
+@override_settings(TASKS_EAGER=True)
+class AuthCacheTests(TestCase):
+    """Every change to what a cached request user carries replaces their version token."""
+
+    def setUp(self):
+        caches[auth_cache.USER_CACHE_ALIAS].clear()
+        self.alice, self.bob = make_users("alice", "bob")
+
+    def load(self):
+        return auth_cache.load_user(ModelBackend(), self.alice.pk)
+
+    def is_cached(self):
+        key = f"auth_user:{self.alice.pk}:{auth_cache._version(self.alice.pk)}"
+        return caches[auth_cache.USER_CACHE_ALIAS].get(key) is not None
+
+    def assertInvalidates(self, change):
+        self.load()
+        self.assertTrue(self.is_cached())
+        change()
+        self.assertFalse(self.is_cached())
+
+    def test_save(self):
+        self.assertInvalidates(lambda: User.objects.get(pk=self.alice.pk).save())
+
+    def test_counter_bump(self):
+        book = Book.objects.create(title="Book")
+        self.assertInvalidates(
+            lambda: Review.objects.create(headline="H", body="B", rating=3, book=book, user=self.alice)
+        )
+        self.assertEqual(self.load().review_count, 1)
+
+    def test_follow(self):
+        self.assertInvalidates(lambda: self.alice.following.add(self.bob))
+        self.assertEqual(self.load().following_ids, {self.bob.pk})
+        self.assertInvalidates(lambda: self.bob.followers.remove(self.alice))
+        self.assertEqual(self.load().following_ids, frozenset())
+
+    def test_groups_and_permissions(self):
+        group = Group.objects.create(name="editors")
+        permission = Permission.objects.get(codename="change_book")
+        self.assertInvalidates(lambda: self.alice.groups.add(group))
+        group.permissions.add(permission)
+        self.assertInvalidates(group.user_set.clear)
+        self.assertInvalidates(lambda: group.user_set.add(self.alice))
+        self.assertInvalidates(lambda: self.alice.user_permissions.add(permission))
+        self.assertInvalidates(lambda: permission.user_set.remove(self.alice))
+
+    @override_settings(USER_CACHE_ENABLED=True)
+    def test_password_change_ends_other_sessions(self):
+        url = reverse("user_profile", args=[self.bob.username])
+        self.client.force_login(self.alice)
+        self.assertEqual(self.client.get(url).status_code, 200)
+        self.assertTrue(self.is_cached())
+        alice = User.objects.get(pk=self.alice.pk)
+        alice.set_password("changed-1")
+        alice.save()
+        self.assertEqual(self.client.get(url).status_code, 302)
+
+    def test_off_by_default(self):
+        self.client.force_login(self.alice)
+        self.client.get(reverse("user_profile", args=[self.bob.username]))
+        self.assertFalse(self.is_cached())
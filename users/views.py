@@ -3,16 +3,29 @@
 Includes lightweight docstrings and PEP8-friendly import ordering.
 """
 
+from django.conf import settings
+from django.db import transaction
 from django.contrib.auth.views import LoginView
-from django.contrib.auth.decorators import login_required
-from django.http import JsonResponse
+from django.contrib.auth.decorators import login_required, user_passes_test
+from django.http import JsonResponse, StreamingHttpResponse
+from django.views.decorators.http import require_GET, require_POST
 from django.shortcuts import get_object_or_404, redirect, render
+from django.template.loader import render_to_string
 from django.urls import reverse
 
+from reviews import conditional, stars
 from reviews.models import Review
+from reviews.pagination import keyset_page
 from users.models import User
 
-from . import forms
+from . import availability, follow_graph, forms
+from .bloom import availability_filter
+
+PROFILE_PAGE_SIZE = getattr(settings, "PROFILE_PAGE_SIZE", 20)
+STREAM_CHUNK_SIZE = getattr(settings, "PROFILE_STREAM_CHUNK_SIZE", 50)
+STREAM_MARKER = "<!--profile-reviews-stream-->"
+SUGGESTION_COUNT = getattr(settings, "FOLLOW_SUGGESTION_COUNT", 5)
+FOLLOW_API_MAX_USERS = getattr(settings, "FOLLOW_API_MAX_USERS", 200)
 
 class ProfileRedirectLoginView(LoginView):
     """Login view that redirects authenticated users to their profile.
@@ -48,17 +61,19 @@ def signup_page(request):
             )
     return render(request, "authentication/signup.html", {"form": form})
 
-def username_available(request):
+async def username_available(request):
     """AJAX endpoint to check if a username is available.
     Query param: ?username=foo
     Returns JSON: {"available": true/false}
     Always returns 200 to simplify client logic.
+    Async: served natively under ASGI; lookups go through the
+    case-folded index and a short-lived cache (see users.availability).
     """
     username = request.GET.get("username", "").strip()
-    available = bool(username) and not User.objects.filter(username__iexact=username).exists()
+    available = bool(username) and not await availability.ais_taken("username", username)
     return JsonResponse({"available": available, "username": username})
 
-def email_available(request):
+async def email_available(request):
     """AJAX endpoint to check if an email is available.
     Query param: ?email=foo@example.com
     Returns JSON: {"available": true/false}
@@ -68,20 +83,38 @@ def email_available(request):
     email = request.GET.get("email", "").strip()
     if not email:
         return JsonResponse({"available": False, "email": email})
-    available = not User.objects.filter(email__iexact=email).exists()
+    available = not await availability.ais_taken("email", email)
     return JsonResponse({"available": available, "email": email})
 
+@user_passes_test(lambda u: u.is_staff)
+def availability_metrics(request):
+    """Staff-only JSON metrics for the availability Bloom filter.
+
+    Reports item count, memory size and estimated false-positive rate, plus
+    how many checks were answered without a database query.
+    """
+    return JsonResponse(availability_filter.stats())
+
 @login_required
+@conditional.profile_page
 def user_profile(request, username):
     """Show a user's profile and reviews; allow follow/unfollow actions.
 
     When viewing your own profile, supports searching for other users by
     username or name parts and following/unfollowing them.
+
+    Reviews are shown one keyset page at a time (?before=<cursor>), or all
+    of them streamed in chunks with ?stream=1.
+
+    Other users' profiles answer 304 while nothing shown has changed
+    (see reviews.conditional).
     """
     profile_user = get_object_or_404(User, username=username)
-    is_following = request.user.following.filter(pk=profile_user.pk).exists()
+    following_ids = request.user.following_ids
+    is_following = profile_user.pk in following_ids
     user_search_results = []
     search_query = ''
+    suggested_users = []
     # Handle user search when viewing own profile (GET request with user_query)
     if request.user == profile_user and request.method == 'GET':
         search_query = request.GET.get('user_query', '').strip()
@@ -94,39 +127,168 @@ def user_profile(request, username):
                 Q(last_name__icontains=search_query)
             ).exclude(pk=request.user.pk).order_by('username')[:25]
             user_search_results = list(qs)
+        suggested_users = _users_in_order(
+            [user_id for user_id, _score in follow_graph.suggestions(request.user.pk, SUGGESTION_COUNT)]
+        )
     if request.method == "POST":
         # Per-user unfollow from own profile (list of people you follow)
         unfollow_username = request.POST.get('unfollow_username')
         follow_username = request.POST.get('follow_username')
         if unfollow_username and request.user == profile_user:
             target = User.objects.filter(username=unfollow_username).first()
-            if target and request.user.following.filter(pk=target.pk).exists():
-                request.user.following.remove(target)
+            if target:
+                follow_graph.unfollow(request.user, [target.pk])
             return redirect('user_profile', username=profile_user.username)
         if follow_username and request.user == profile_user:
             target = User.objects.filter(username=follow_username).first()
-            if target and target != request.user and not request.user.following.filter(pk=target.pk).exists():
-                request.user.following.add(target)
+            if target:
+                follow_graph.follow(request.user, [target.pk])
             return redirect('user_profile', username=profile_user.username)
 
         # Follow/unfollow the profile user (when viewing someone else's profile)
         if request.user != profile_user:
             if is_following:
-                request.user.following.remove(profile_user)
+                follow_graph.unfollow(request.user, [profile_user.pk])
             else:
-                request.user.following.add(profile_user)
+                follow_graph.follow(request.user, [profile_user.pk])
             return redirect('user_profile', username=profile_user.username)
-    reviews = Review.objects.filter(user=profile_user).select_related('book').order_by('-created')
-    following_ids = set(request.user.following.values_list('id', flat=True)) if request.user.is_authenticated else set()
-    return render(
-        request,
+    reviews = Review.objects.filter(user=profile_user).select_related('book')
+    context = {
+        "profile_user": profile_user,
+        "is_following": is_following,
+        "following_ids": following_ids,
+        "user_search_results": user_search_results,
+        "user_search_query": search_query,
+        "suggested_users": suggested_users,
+    }
+    if request.GET.get('stream') == '1':
+        return StreamingHttpResponse(_stream_profile(request, context, reviews))
+    before = request.GET.get('before')
+    page, next_cursor = keyset_page(reviews, before, PROFILE_PAGE_SIZE)
+    context.update({
+        "reviews": stars.annotate_stars(page),
+        "next_cursor": next_cursor,
+        "newest_review_id": page[0].id if page and not before else None,
+    })
+    return render(request, "users/profile.html", context)
+
+def _stream_profile(request, context, reviews):
+    """Yield the profile page with review cards rendered in chunks.
+
+    The page shell is rendered once around a marker; reviews are then read
+    with a server-side iterator so memory stays flat for prolific users.
+    """
+    page = render_to_string(
         "users/profile.html",
-        {
-            "profile_user": profile_user,
-            "is_following": is_following,
-            "reviews": reviews,
-            "following_ids": following_ids,
-            "user_search_results": user_search_results,
-            "user_search_query": search_query,
-        },
-    )
\ No newline at end of file
+        {**context, "streaming": True, "stream_marker": STREAM_MARKER},
+        request=request,
+    )
+    head, tail = page.split(STREAM_MARKER, 1)
+    yield head
+    chunk, newest_id = [], None
+    rows = reviews.order_by('-created', '-id').iterator(chunk_size=STREAM_CHUNK_SIZE)
+    for review in rows:
+        if newest_id is None:
+            newest_id = review.id
+        chunk.append(review)
+        if len(chunk) == STREAM_CHUNK_SIZE:
+            yield _render_review_chunk(request, context, chunk, newest_id)
+            chunk = []
+    if chunk:
+        yield _render_review_chunk(request, context, chunk, newest_id)
+    if newest_id is None:
+        yield "<li>No reviews yet.</li>"
+    yield tail
+
+def _render_review_chunk(request, context, reviews, newest_id):
+    return render_to_string(
+        "users/partials/profile_review_list.html",
+        {**context, "reviews": stars.annotate_stars(reviews), "newest_review_id": newest_id},
+        request=request,
+    )
+
+def _users_in_order(user_ids):
+    users = User.objects.in_bulk(user_ids)
+    return [users[user_id] for user_id in user_ids if user_id in users]
+
+def _usernames(values):
+    """Usernames from repeated params and/or comma-separated lists."""
+    names = []
+    for value in values:
+        names.extend(name.strip() for name in value.split(",") if name.strip())
+    return list(dict.fromkeys(names))[:FOLLOW_API_MAX_USERS]
+
+def _ids_by_username(usernames):
+    return dict(User.objects.filter(username__in=usernames).values_list("username", "pk"))
+
+def _user_summaries(user_ids, scores=None):
+    rows = User.objects.filter(pk__in=user_ids).values("pk", "username", "first_name", "last_name")
+    summaries = {
+        row["pk"]: {
+            "username": row["username"],
+            "full_name": f"{row['first_name']} {row['last_name']}",
+        }
+        for row in rows
+    }
+    result = []
+    for user_id in user_ids:
+        if user_id in summaries:
+            if scores:
+                summaries[user_id]["score"] = scores[user_id]
+            result.append(summaries[user_id])
+    return result
+
+@login_required
+@require_POST
+def follow_batch(request):
+    """AJAX endpoint to follow and/or unfollow many users in one transaction.
+    Form fields: follow=<username>[,<username>...], unfollow=... (repeatable)
+    Returns JSON: {"followed": [...], "unfollowed": [...], "following_count": n}
+    Unknown usernames are ignored.
+    """
+    follow_names = _usernames(request.POST.getlist("follow"))
+    unfollow_names = _usernames(request.POST.getlist("unfollow"))
+    ids = _ids_by_username(follow_names + unfollow_names)
+    names = {pk: username for username, pk in ids.items()}
+    with transaction.atomic():
+        removed = follow_graph.unfollow(request.user, [ids[n] for n in unfollow_names if n in ids])
+        added = follow_graph.follow(request.user, [ids[n] for n in follow_names if n in ids])
+    return JsonResponse({
+        "followed": sorted(names[pk] for pk in added),
+        "unfollowed": sorted(names[pk] for pk in removed),
+        "following_count": len(follow_graph.following_ids(request.user.pk)),
+    })
+
+@login_required
+@require_GET
+def follow_status(request):
+    """AJAX endpoint: which of the given users does the current user follow?
+    Query param: ?users=alice,bob (or repeated)
+    Returns JSON: {"following": {"alice": true, "bob": false}}
+    Unknown usernames are left out.
+    """
+    ids = _ids_by_username(_usernames(request.GET.getlist("users")))
+    followed = follow_graph.following_among(request.user.pk, ids.values())
+    return JsonResponse({"following": {username: pk in followed for username, pk in ids.items()}})
+
+@login_required
+@require_GET
+def follow_mutual(request):
+    """AJAX endpoint listing users the current user follows who follow back."""
+    mutual = sorted(follow_graph.mutual_ids(request.user.pk))
+    return JsonResponse({"mutual": _user_summaries(mutual)})
+
+@login_required
+@require_GET
+def follow_suggestions(request):
+    """AJAX endpoint with friends-of-friends suggestions.
+    Query param: ?limit=10 (max 50)
+    Returns JSON: {"suggestions": [{"username", "full_name", "score"}]}
+    where score is how many of your followees follow that user.
+    """
+    try:
+        limit = min(max(int(request.GET.get("limit", 10)), 1), 50)
+    except ValueError:
+        limit = 10
+    scored = dict(follow_graph.suggestions(request.user.pk, limit))
+    return JsonResponse({"suggestions": _user_summaries(list(scored), scored)})